@@ -0,0 +1,59 @@
+"""
+Micro-benchmark for the timestamp parsing and "posted_at" computation of the comment-cleaning loop.
+
+Compares the previous per-comment path (`get_strptime()` + `str(timedelta)[:7]`) with the batched fast path
+(`get_offsets()` + `format_posted_at()`), and makes sure both produce the exact same output.
+
+Usage (from the root directory): 'python -m benchmarks.bench_timestamps [AMOUNT_OF_TIMESTAMPS]'
+"""
+
+
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from pyvod.utils import get_strptime, get_offsets, format_posted_at
+
+
+def make_timestamps(amount: int, vod_datetime: datetime, seed: int = 1) -> list:
+    """ Creates `amount` sorted timestamps in the different formats Twitch uses, spread over a 12 hour VOD. """
+
+    rnd = random.Random(seed)
+    timestamps = []
+    for offset in sorted(rnd.uniform(-5, 12 * 3600) for _ in range(amount)):
+        _datetime = vod_datetime + timedelta(seconds=offset)
+        timestamp = _datetime.strftime("%Y-%m-%dT%H:%M:%S")
+        digits = rnd.choice((0, 3, 6, 9))
+        if digits:
+            timestamp += "." + ("{:06}".format(_datetime.microsecond) + "987")[:digits]
+        timestamps.append(timestamp + "Z")
+    return timestamps
+
+
+def old_path(timestamps: list, vod_datetime: datetime) -> list:
+    return [(get_strptime(datetime_string=timestamp) - vod_datetime).__str__()[:7] for timestamp in timestamps]
+
+
+def new_path(timestamps: list, vod_datetime: datetime) -> list:
+    return [format_posted_at(offset) for offset in get_offsets(timestamps, vod_datetime=vod_datetime)]
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    vod_datetime = get_strptime("2021-04-20T12:00:00.5Z")
+    timestamps = make_timestamps(amount, vod_datetime=vod_datetime)
+
+    if old_path(timestamps, vod_datetime) != new_path(timestamps, vod_datetime):
+        sys.exit("The outputs differ!")
+
+    old = min(timeit.repeat(lambda: old_path(timestamps, vod_datetime), number=1, repeat=3))
+    new = min(timeit.repeat(lambda: new_path(timestamps, vod_datetime), number=1, repeat=3))
+    print("{} timestamps (identical output)".format(amount))
+    print("get_strptime + str(timedelta)[:7]:   {:.3f}s ({:,.0f} / s)".format(old, amount / old))
+    print("get_offsets + format_posted_at:      {:.3f}s ({:,.0f} / s)".format(new, amount / new))
+    print("speedup: {:.1f}x".format(old / new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Micro-benchmark for writing the cleaned comments (the VOD_{id}_CHAT file of `VODChat.to_file()`).
+
+Compares the previous writer of `to_file()` (default buffering, one `str.format()` and one `write()` per comment)
+and the same writer with a 1 MiB buffer with the batched `ChatTextWriter`, makes sure all of them produce the exact
+same bytes, and times the CSV/TSV writers and a custom column layout as well.
+
+Usage (from the root directory): 'python -m benchmarks.bench_writers [AMOUNT_OF_COMMENTS] [DIRECTORY]'
+
+The files are written into a temporary directory inside DIRECTORY (e.g. a RAM disk such as /dev/shm, so the disk
+does not add noise), by default the system's temporary directory.
+"""
+
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from pyvod.vodcomment import VODSimpleComment
+from pyvod.utils import format_posted_at
+from pyvod.writers import DEFAULT_BUFFER_SIZE, ChatTextWriter, ChatCSVWriter, ChatTSVWriter
+
+
+def make_comments(amount: int, seed: int = 1) -> list:
+    """ Creates `amount` comments spread over a 4 hour VOD, with names and messages of varying length. """
+
+    rnd = random.Random(seed)
+    words = ("hello", "world", "PogChamp", "LUL", "gg", "Kappa", "what", "no way", "!uptime", "ÄÖÜ", "😂")
+    return [VODSimpleComment(timestamp="2021-04-20T{:02}:{:02}:{:02}.{:03}Z".format(12 + i * 4 // amount, i % 60,
+                                                                                   (i * 7) % 60, i % 1000),
+                             posted_at=format_posted_at(i * 4 * 3600 // amount),
+                             name="user{}".format(rnd.randrange(5000)) * rnd.choice((1, 1, 1, 4)),
+                             message=" ".join(rnd.choice(words) for _ in range(rnd.randint(1, 12))))
+            for i in range(amount)]
+
+
+def old_writer(path: str, comments: list, buffering: int = -1) -> None:
+    """ The previous writer of `VODChat.to_file()` (without the footer), with the default buffering of `open()`. """
+
+    with open(path, mode="w", encoding="utf-8", buffering=buffering) as file:
+        file.write("{:<30} {:<10} {:<30} {}\n".format("Created at", "Posted at", "User", "Message"))
+        write = file.write
+        for created_at, posted_at, commenter, message in comments:
+            write("{:<30} {:<10} {:<30} {}\n".format(created_at, posted_at, commenter, message))
+
+
+def new_writer(path: str, comments: list, writer_class=ChatTextWriter, **kwargs) -> None:
+    writer = writer_class(path, vod_id="1", basic_data=None, **kwargs)
+    writer.write_comments(comments)
+    writer.close(complete=False)  # without the footer
+
+
+def measure(function, path: str, *args, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        function(path, *args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    comments = make_comments(amount)
+
+    with tempfile.TemporaryDirectory(dir=sys.argv[2] if len(sys.argv) > 2 else None) as dirpath:
+        old_path, buffered_path = os.path.join(dirpath, "old.txt"), os.path.join(dirpath, "buffered.txt")
+        new_path = os.path.join(dirpath, "new.txt")
+        old = measure(old_writer, old_path, comments)
+        buffered = measure(old_writer, buffered_path, comments, buffering=DEFAULT_BUFFER_SIZE)
+        new = measure(new_writer, new_path, comments)
+        with open(new_path, mode="rb") as new_file:
+            expected = new_file.read()
+        for path in (old_path, buffered_path):
+            with open(path, mode="rb") as file:
+                if file.read() != expected:
+                    sys.exit("The outputs differ!")
+        size = os.path.getsize(new_path) / 1024 ** 2
+
+        print("{:,} comments, {:.1f} MiB (identical output)".format(amount, size))
+        for name, seconds in (("previous writer (format + write per comment):", old),
+                              ("previous writer with a 1 MiB buffer:", buffered),
+                              ("ChatTextWriter (batched, 1 MiB buffer):", new)):
+            print("{:<46} {:.3f}s ({:,.0f} / s, {:.1f} MiB/s)".format(name, seconds, amount / seconds, size / seconds))
+        print("speedup: {:.2f}x over the previous writer, {:.2f}x over the buffered one\n"
+              .format(old / new, buffered / new))
+
+        for name, writer_class, kwargs in (
+                ("ChatTextWriter, columns=(posted_at, name, message)", ChatTextWriter,
+                 dict(columns=("posted_at", ("name", 25), "message"))),
+                ("ChatCSVWriter", ChatCSVWriter, dict()),
+                ("ChatTSVWriter", ChatTSVWriter, dict())):
+            seconds = measure(new_writer, os.path.join(dirpath, "other"), comments, writer_class=writer_class, **kwargs)
+            print("{:<52} {:.3f}s ({:,.0f} / s)".format(name + ":", seconds, amount / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+A local stand-in for the Twitch v5 API, serving `videos/{id}`, `videos/{id}/comments` and `channels/{id}/videos`,
+for benchmarks and tests without network access (and without a Client-ID).
+
+The comments are either synthetic (generated on the fly, so even VODs with millions of comments take up no memory)
+or recorded, i.e. taken from a `VOD_{id}_RAW.json` file written by `VODChat.to_file()`.
+Either can also be served as the chat of a broadcast which is still live (`LiveChat`), e.g. for `VODChat.follow()`.
+
+Usage (from the root directory):
+
+    'python -m benchmarks.mock_twitch [--comments 100000] [--page-size 60] [--latency 0.05] [--live 20] [--vods 10]
+                                      [--port 8000]'
+
+and then point pyvod at it, either via `pyvod.set_api_base_url("http://127.0.0.1:8000/v5")`
+or the "twitch-api-base-url" env-variable. Every VOD ID serves the same chat, except for "0" (404 - not found).
+Every channel lists the same `--vods` VODs.
+"""
+
+
+import argparse
+import base64
+import collections
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+
+
+VOD_DATETIME = datetime(2021, 4, 20, 12, 0, 0)
+
+# the VOD IDs listed by `channels/{id}/videos`, the n-th VOD is FIRST_VOD_ID + n
+FIRST_VOD_ID = 1000000
+
+
+class SyntheticChat:
+    """ A synthetic chat of `amount` comments, spread evenly over a VOD of `length` seconds.
+
+        The comments are generated on request from their index, so the same comment always looks the same.
+
+        :param amount: the amount of comments
+        :param length: the length of the VOD in seconds
+        :param chatters: the amount of distinct users
+        :param seed: the seed of the random data
+    """
+
+    def __init__(self, amount: int, length: int = 4 * 3600, chatters: int = 5000, seed: int = 1):
+        self.amount = amount
+        self.length = length
+        self.chatters = max(1, chatters)
+        self.seed = seed
+
+    def __len__(self):
+        return self.amount
+
+    def offset(self, index: int) -> float:
+        """ :return: the `content_offset_seconds` of the comment, increasing with the index """
+        return (index + random.Random(self.seed * 1000003 + index).random()) * self.length / max(1, self.amount)
+
+    def index(self, offset: float) -> int:
+        """ :return: the index of the first comment posted at or after `offset` """
+
+        index = max(0, min(self.amount, int(offset * self.amount / self.length)))
+        while index > 0 and self.offset(index - 1) >= offset:
+            index -= 1
+        while index < self.amount and self.offset(index) < offset:
+            index += 1
+        return index
+
+    def comment(self, index: int) -> dict:
+        rnd = random.Random(self.seed * 1000003 + index)
+        offset = (index + rnd.random()) * self.length / max(1, self.amount)
+        created_at = VOD_DATETIME + timedelta(seconds=offset)
+        timestamp = created_at.strftime("%Y-%m-%dT%H:%M:%S")
+        digits = rnd.choice((0, 3, 6, 9))  # Twitch's timestamps come with a varying precision
+        if digits:
+            timestamp += "." + ("{:06}".format(created_at.microsecond) + "000")[:digits]
+        timestamp += "Z"
+        user = "user{}".format(rnd.randrange(self.chatters))
+        body = " ".join(rnd.choice(("hello", "world", "PogChamp", "LUL", "gg", "Kappa", "what", "no way", "!uptime"))
+                        for _ in range(rnd.randint(1, 12)))
+
+        return {
+            "_id": "{:08x}-0000-4000-8000-{:012x}".format(self.seed, index),
+            "created_at": timestamp,
+            "updated_at": timestamp,
+            "channel_id": "12826",
+            "content_type": "video",
+            "content_id": "979245105",
+            "content_offset_seconds": round(offset, 3),
+            "commenter": {"display_name": user.capitalize(), "_id": str(10000 + index % self.chatters), "name": user,
+                          "type": "user", "bio": None, "created_at": "2015-01-01T00:00:00Z",
+                          "updated_at": "2021-01-01T00:00:00Z", "logo": "https://static-cdn.jtvnw.net/logo.png"},
+            "source": "chat",
+            "state": "published",
+            "message": {"body": body, "fragments": [{"text": body}], "is_action": False,
+                        "user_badges": [{"_id": "subscriber", "version": "12"}], "user_color": "#1E90FF",
+                        "user_notice_params": {}},
+        }
+
+    def page(self, start: int, size: int) -> list:
+        return [self.comment(index) for index in range(start, min(start + size, self.amount))]
+
+
+class RecordedChat:
+    """ A recorded chat, i.e. the comments of a `VOD_{id}_RAW.json` file written by `VODChat.to_file()`.
+
+        :param path: the path of the .json file
+    """
+
+    def __init__(self, path: str):
+        with open(path, mode="r", encoding="utf-8") as file:
+            pages = json.load(file)
+        self.comments = [comment for page in pages.values() for comment in page["comments"]]
+        self.length = int(self.comments[-1]["content_offset_seconds"]) + 1 if self.comments else 0
+
+    def __len__(self):
+        return len(self.comments)
+
+    def offset(self, index: int) -> float:
+        return self.comments[index]["content_offset_seconds"]
+
+    def index(self, offset: float) -> int:
+        return next((i for i, comment in enumerate(self.comments) if comment["content_offset_seconds"] >= offset),
+                    len(self.comments))
+
+    def page(self, start: int, size: int) -> list:
+        return self.comments[start:start + size]
+
+
+class LiveChat:
+    """ The chat of a broadcast which is still live: of the comments of `chat`, only the ones posted so far are served,
+        starting with `initial` comments and `rate` more every second.
+
+        :param chat: the SyntheticChat or RecordedChat
+        :param rate: how many comments are posted per second
+        :param initial: how many comments have already been posted when the server starts
+    """
+
+    def __init__(self, chat, rate: float = 10.0, initial: int = 0):
+        self.chat = chat
+        self.rate = rate
+        self.initial = initial
+        self.length = chat.length
+        self.started = time.monotonic()
+
+    def __len__(self):
+        return min(len(self.chat), self.initial + int((time.monotonic() - self.started) * self.rate))
+
+    def offset(self, index: int) -> float:
+        return self.chat.offset(index)
+
+    def index(self, offset: float) -> int:
+        return min(self.chat.index(offset), len(self))
+
+    def page(self, start: int, size: int) -> list:
+        return self.chat.page(start, size)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MockTwitch/1.0"
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # otherwise every keep-alive response waits for the delayed ACK
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: dict, headers: dict = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Ratelimit-Limit", str(self.server.rate_limit))
+        self.send_header("Ratelimit-Remaining", str(self.server.rate_limit))
+        self.send_header("Ratelimit-Reset", str(int(time.time()) + 60))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _video(self, vod_id: str, status: str = "recorded") -> dict:
+        return {
+            "_id": "v{}".format(vod_id), "title": "Mock VOD {}".format(vod_id), "views": 1337,
+            "created_at": VOD_DATETIME.isoformat() + "Z", "game": "Just Chatting", "length": self.server.chat.length,
+            "status": status, "broadcast_type": "archive",
+            "channel": {"display_name": "MockChannel", "_id": "12826", "created_at": "2015-01-01T00:00:00Z",
+                        "views": 1000000, "followers": 50000, "broadcaster_type": "partner"},
+        }
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+
+        with server.lock:
+            fault = server.faults.popleft() if server.faults else None
+        if fault is not None:
+            status, headers = fault
+            return self._send(status, {"error": "Mock Error", "status": status, "message": "Mock error"}, headers)
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.strip("/").split("/")
+
+        if len(parts) >= 3 and parts[-3] == "channels" and parts[-1] == "videos":
+            # newest first, the newest one is still being broadcast if the chat is live
+            offset, limit = int(query.get("offset", ["0"])[0]), int(query.get("limit", ["10"])[0])
+            indexes = range(server.vods - 1 - offset, max(-1, server.vods - 1 - offset - limit), -1)
+            live = isinstance(server.chat, LiveChat)
+            return self._send(200, {"_total": server.vods, "videos": [
+                self._video(str(FIRST_VOD_ID + index),
+                            status="recording" if live and index == server.vods - 1 else "recorded")
+                for index in indexes]})
+
+        if len(parts) < 2 or "videos" not in parts:
+            return self._send(404, {"error": "Not Found", "status": 404, "message": "Not Found"})
+        vod_id = parts[parts.index("videos") + 1]
+        if vod_id == "0":
+            return self._send(404, {"error": "Not Found", "status": 404, "message": "Video not found"})
+
+        chat = server.chat
+        if parts[-1] == "comments":
+            cursor = query.get("cursor", [""])[0]
+            if cursor:
+                start = int(base64.b64decode(cursor).decode("ascii"))
+            elif "content_offset_seconds" in query:
+                # like the real API, a few comments before the offset are returned as well
+                start = max(0, chat.index(float(query["content_offset_seconds"][0])) - 3)
+            else:
+                start = 0
+            amount = len(chat)  # only once, as a LiveChat keeps on growing
+            body = {"comments": chat.page(start, max(0, min(server.page_size, amount - start))), "_prev": "cHJldg=="}
+            if start + server.page_size < amount:
+                body["_next"] = base64.b64encode(str(start + server.page_size).encode("ascii")).decode("ascii")
+            return self._send(200, body)
+
+        return self._send(200, self._video(vod_id))
+
+
+class MockTwitchServer(ThreadingMixIn, HTTPServer):
+    """ The mock Twitch API server, run on a background thread.
+
+        Usage:
+
+            with MockTwitchServer(SyntheticChat(100000)) as server:
+                pyvod.set_api_base_url(server.url)
+
+        :param chat: the SyntheticChat or RecordedChat to serve
+        :param page_size: the amount of comments per page
+        :param latency: the time in seconds every request takes (before sending the response)
+        :param rate_limit: the value of the `Ratelimit-*` headers, high by default so the client is not throttled
+        :param vods: the amount of VODs listed by `channels/{id}/videos`
+        :param host: the host to listen on
+        :param port: the port to listen on, 0 means any free port
+    """
+
+    daemon_threads = True
+
+    def __init__(self, chat, page_size: int = 60, latency: float = 0.0, rate_limit: int = 1000000,
+                 vods: int = 1, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.chat = chat
+        self.page_size = page_size
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.vods = vods
+        self.requests = 0
+        self.faults = collections.deque()  # (status code, headers) of the next requests which fail
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """ The base url to pass on to `pyvod.set_api_base_url()`. """
+        return "http://{}:{}/v5".format(*self.server_address[:2])
+
+    def fail_next(self, status: int, times: int = 1, retry_after: float = None) -> None:
+        """ Lets the next `times` requests fail with the status code `status` (e.g. 429 or 503),
+            optionally with a `Retry-After` header.
+        """
+
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+        with self.lock:
+            self.faults.extend((status, headers) for _ in range(times))
+
+    def start(self) -> "MockTwitchServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="A local stand-in for the Twitch v5 API.")
+    parser.add_argument("--comments", type=int, default=100000, help="the amount of synthetic comments")
+    parser.add_argument("--length", type=int, default=4 * 3600, help="the VOD length in seconds")
+    parser.add_argument("--recorded", type=str, default=None, help="serve the comments of a VOD_{id}_RAW.json file")
+    parser.add_argument("--page-size", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.0, help="the latency of every request in seconds")
+    parser.add_argument("--live", type=float, default=None,
+                        help="serve the chat as a live broadcast, with this many comments posted per second")
+    parser.add_argument("--vods", type=int, default=1, help="the amount of VODs listed per channel")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    chat = RecordedChat(args.recorded) if args.recorded else SyntheticChat(args.comments, length=args.length)
+    if args.live:
+        chat = LiveChat(chat, rate=args.live)
+    server = MockTwitchServer(chat, page_size=args.page_size, latency=args.latency, vods=args.vods,
+                              port=args.port)
+    print("Serving {} comments on {} (Ctrl+C to stop)".format(len(chat), server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+End-to-end benchmarks of the comment download against a local mock Twitch API (see `benchmarks.mock_twitch`).
+
+For every VOD size, every scenario is run in its own process (so the peak RSS is the one of the scenario only),
+and the pages/s, comments/s, peak RSS and - for the scenarios writing files - the write throughput are reported.
+
+Usage (from the root directory):
+
+    'python -m benchmarks.run_benchmarks [--comments 10000 100000 1000000] [--scenarios ...] [--latency 0.0]
+                                         [--page-size 60] [--json results.json]'
+"""
+
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_twitch import MockTwitchServer, SyntheticChat
+
+
+def _peak_rss():
+    """ :return: the peak resident set size of this process in bytes, or None if it can not be determined """
+
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, kilobytes on Linux
+
+
+def _size_of(dirpath: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(dirpath) if entry.is_file())
+
+
+def _get_comments(vodchat, dirpath: str) -> dict:
+    vodchat.get_comments()
+    return dict()
+
+
+def _get_comments_compact(vodchat, dirpath: str) -> dict:
+    vodchat.get_comments(compact=True, keep_raw=False)
+    return dict()
+
+
+def _get_comments_sharded(vodchat, dirpath: str) -> dict:
+    vodchat.get_comments(shards=4)
+    return dict()
+
+
+def _get_comments_pipelined(vodchat, dirpath: str) -> dict:
+    vodchat.get_comments(keep_raw=False, processes=max(2, os.cpu_count() or 1))
+    return dict()
+
+
+def _iter_comments(vodchat, dirpath: str) -> dict:
+    for _ in vodchat.iter_comments():
+        pass
+    return dict()
+
+
+def _to_file(vodchat, dirpath: str) -> dict:
+    vodchat.get_comments()
+    start = time.perf_counter()
+    vodchat.to_file(dirpath=dirpath)
+    return dict(write_seconds=time.perf_counter() - start, bytes_written=_size_of(dirpath))
+
+
+def _to_file_stream(vodchat, dirpath: str) -> dict:
+    start = time.perf_counter()
+    vodchat.to_file(dirpath=dirpath, stream=True)
+    return dict(write_seconds=time.perf_counter() - start, bytes_written=_size_of(dirpath))
+
+
+SCENARIOS = {
+    "get_comments": _get_comments,
+    "get_comments_compact": _get_comments_compact,
+    "get_comments_sharded": _get_comments_sharded,
+    "get_comments_pipelined": _get_comments_pipelined,
+    "iter_comments": _iter_comments,
+    "to_file": _to_file,
+    "to_file_stream": _to_file_stream,
+}
+
+
+def run_scenario(scenario: str, vod_id: str = "979245105") -> dict:
+    """ Runs a scenario in this process, against the API set via the "twitch-api-base-url" env-variable.
+
+        :return: the measurements
+    """
+
+    from pyvod import VOD
+
+    with tempfile.TemporaryDirectory() as dirpath:
+        start = time.perf_counter()
+        vodchat = VOD(vod_id=vod_id).get_vodchat()
+        result = SCENARIOS[scenario](vodchat, dirpath)
+        result["seconds"] = time.perf_counter() - start
+
+    result.update(pages=vodchat.pages_fetched, comments=vodchat.comments_fetched, peak_rss=_peak_rss())
+    return result
+
+
+def _run_in_process(scenario: str, base_url: str) -> dict:
+    env = dict(os.environ, **{"twitch-api-base-url": base_url})
+    process = subprocess.run([sys.executable, "-m", "benchmarks.run_benchmarks", "--worker", scenario],
+                             env=env, stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def _format_row(amount: int, scenario: str, result: dict) -> str:
+    seconds = result["seconds"]
+    peak_rss = "{:.1f} MiB".format(result["peak_rss"] / 1024 ** 2) if result["peak_rss"] else "n/a"
+    if "write_seconds" in result:
+        write = "{:.1f} MiB/s".format(result["bytes_written"] / 1024 ** 2 / result["write_seconds"])
+    else:
+        write = "-"
+    return "{:>9,} {:<22} {:>8.2f}s {:>10,.1f} {:>12,.0f} {:>12} {:>12}".format(
+        amount, scenario, seconds, result["pages"] / seconds, result["comments"] / seconds, peak_rss, write)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the comment download against a local mock Twitch API.")
+    parser.add_argument("--comments", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="the VOD sizes (amount of comments) to benchmark")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--page-size", type=int, default=60, help="the amount of comments per page")
+    parser.add_argument("--latency", type=float, default=0.0, help="the latency of every request in seconds")
+    parser.add_argument("--json", type=str, default=None, help="also save the results as JSON to this path")
+    parser.add_argument("--worker", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:  # we are the process of a single scenario, see _run_in_process()
+        print(json.dumps(run_scenario(args.worker)))
+        return
+
+    print("{:>9} {:<22} {:>9} {:>10} {:>12} {:>12} {:>12}".format(
+        "comments", "scenario", "time", "pages/s", "comments/s", "peak RSS", "write"))
+
+    results = list()
+    for amount in args.comments:
+        chat = SyntheticChat(amount)
+        with MockTwitchServer(chat, page_size=args.page_size, latency=args.latency) as server:
+            for scenario in args.scenarios:
+                result = _run_in_process(scenario, base_url=server.url)
+                if result["comments"] != amount:
+                    sys.exit("{} got {} comments instead of {}!".format(scenario, result["comments"], amount))
+                print(_format_row(amount, scenario, result), flush=True)
+                results.append(dict(result, amount=amount, scenario=scenario))
+
+    if args.json:
+        with open(args.json, mode="w", encoding="utf-8") as file:
+            json.dump(dict(page_size=args.page_size, latency=args.latency, results=results), file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,16 @@ MIT License. See `__license__` for more information.
 """
 
 
-from .vod import VOD
+from .vod import VOD, set_api_base_url
+from .asyncvod import AsyncVOD, AsyncVODChat, set_concurrency_limit
+from .client import TwitchClient, TokenBucket
+from .cache import ResponseCache
+from .archive import SQLiteArchive, ArchivedComment
+from .analytics import ChatAnalytics, Burst
+from .reader import ChatReader
+from .workqueue import WorkQueue, Job
+from .sync import ChannelSync, SyncResult
+from .metrics import Metrics, enable_metrics, disable_metrics, get_metrics
 from .exceptions import (
     TwitchApiException,
     DirectoryDoesNotExistError,
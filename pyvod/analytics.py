@@ -0,0 +1,278 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+"""
+
+
+import math
+from array import array
+from collections import Counter
+from itertools import accumulate
+from typing import Iterable, List, NamedTuple, Union
+
+import pathlib
+
+from .vodchat import VODChat
+from .commentstore import CommentStore
+from .utils import parse_offset, format_posted_at
+
+
+def _import_numpy():
+    """ Imports numpy, if it is installed.
+
+        :return: the numpy module, or None
+    """
+
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class Burst(NamedTuple):
+    """ A burst of chat activity (e.g. a highlight), as found by `ChatAnalytics.bursts()`.
+
+        - `start` / `end`: the time range of the burst in seconds into the VOD (end exclusive)
+        - `messages`: the amount of comments posted during the burst
+        - `peak`: the highest amount of comments posted in a single `window` during the burst
+        - `score`: how many standard deviations the peak is above the average
+    """
+
+    start: int
+    end: int
+    messages: int
+    peak: int
+    score: float
+
+    def __repr__(self):
+        return "<Burst start={!r} end={!r} messages={!r} peak={!r} score={:.2f}>"\
+            .format(format_posted_at(self.start), format_posted_at(self.end), self.messages, self.peak, self.score)
+
+
+def _mean_std(amount: int, total: int, total_of_squares: int) -> tuple:
+    """ :return: the average and the (population) standard deviation of `amount` integers,
+                 given their sum and the sum of their squares
+    """
+
+    return total / amount, math.sqrt((amount * total_of_squares - total * total) / (amount * amount))
+
+
+class ChatAnalytics:
+    """ Computes statistics of the chat of a VOD in a single pass over the comments, as they arrive:
+        the message rate over time, the (top) chatters and bursts of chat activity.
+
+        The memory usage does not depend on the amount of comments, only on the length of the VOD
+        (one counter per second) and the amount of distinct chatters.
+
+        If numpy is installed, the comments are counted in vectorized batches.
+
+        Usage:
+
+            analytics = ChatAnalytics.from_vodchat(vod.get_vodchat())
+            analytics.per_minute()
+            analytics.top_chatters(10)
+            analytics.bursts()
+
+        :param use_numpy: whether or not to use numpy. Defaults to using it if it is installed
+        :param batch_size: how many comments are collected before they are counted
+    """
+
+    def __init__(self, use_numpy: bool = None, batch_size: int = 65536):
+        numpy = _import_numpy() if use_numpy is not False else None
+        if use_numpy and numpy is None:
+            raise ImportError("ChatAnalytics(use_numpy=True) requires the 'numpy' package: pip install numpy")
+        self._numpy = numpy
+        self.batch_size = max(1, batch_size)
+
+        self.total = 0
+        self.chatters = Counter()  # user name -> amount of comments
+
+        self._counts = numpy.zeros(0, dtype=numpy.int64) if numpy else array("q")  # comments per second
+        self._pending = array("q")  # the offsets which have not yet been counted
+
+    def __repr__(self):
+        return "<ChatAnalytics total={0.total!r} unique_chatters={0.unique_chatters!r} duration={0.duration!r}>"\
+            .format(self)
+
+    @classmethod
+    def from_vodchat(cls, vodchat: VODChat, shards: int = 1, checkpoint: Union[pathlib.Path, str] = None,
+                     checkpoint_interval: int = 50, start: Union[float, str] = None, end: Union[float, str] = None,
+                     **kwargs) -> "ChatAnalytics":
+        """ Downloads the comments of a VOD and analyzes them page by page, without storing them.
+
+            :param vodchat: the VODChat of the VOD
+            :param shards: see `VODChat.get_comments()`
+            :param checkpoint: see `VODChat.get_comments()`
+            :param checkpoint_interval: see `VODChat.get_comments()`
+            :param start: see `VODChat.get_comments()`
+            :param end: see `VODChat.get_comments()`
+            :param kwargs: passed on to `ChatAnalytics()`
+            :return: the ChatAnalytics of the VOD
+        """
+
+        analytics = cls(**kwargs)
+        pages = vodchat._iter_pages_with(vodchat._page_columns, shards=shards, keep_raw=False, lean=True,
+                                         checkpoint=vodchat._make_checkpoint(checkpoint, interval=checkpoint_interval),
+                                         **vodchat._parse_window(start, end))
+        for _json_body, (timestamps, offsets, names, messages) in pages:
+            analytics.add(offsets, names)
+        analytics.flush()
+        return analytics
+
+    def add(self, offsets: Iterable[int], names: Iterable[str]) -> None:
+        """ Adds a batch of comments, column by column.
+
+            :param offsets: the `posted_at` times of the comments in seconds
+            :param names: the user names of the comments
+        """
+
+        before = len(self._pending)
+        self._pending.extend(offsets)
+        self.total += len(self._pending) - before
+        self.chatters.update(names)
+
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def add_comments(self, comments: Union[Iterable, CommentStore]) -> None:
+        """ Adds already downloaded comments, e.g. `vodchat.vod_comments`.
+
+            Prefer a CommentStore (`get_comments(compact=True)`) for VODs longer than 10 hours,
+            as the `posted_at` of a VODSimpleComment is cut off to the tens of seconds from there on.
+
+            :param comments: the VODSimpleComment instances, or a CommentStore
+        """
+
+        if isinstance(comments, CommentStore):
+            self.add(comments.offsets, (comments._names[code] for code in comments._name_codes))
+        else:
+            offsets, names = array("q"), list()
+            for comment in comments:
+                offsets.append(int(parse_offset(comment.posted_at)))
+                names.append(comment.name)
+                if len(offsets) >= self.batch_size:
+                    self.add(offsets, names)
+                    offsets, names = array("q"), list()
+            self.add(offsets, names)
+        self.flush()
+
+    def flush(self) -> None:
+        """ Counts the comments added since the last flush. Called automatically by the result methods. """
+
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, array("q")
+
+        if self._numpy is not None:
+            numpy = self._numpy
+            counts = numpy.bincount(numpy.maximum(numpy.frombuffer(pending, dtype=numpy.int64), 0))
+            if len(counts) > len(self._counts):
+                self._counts = numpy.concatenate([self._counts,
+                                                  numpy.zeros(len(counts) - len(self._counts), dtype=numpy.int64)])
+            self._counts[:len(counts)] += counts
+        else:
+            counts = self._counts
+            last = max(max(pending), 0)
+            if last >= len(counts):
+                counts.extend(array("q", bytes(8 * (last + 1 - len(counts)))))
+            for offset in pending:
+                counts[offset if offset > 0 else 0] += 1
+
+    @property
+    def unique_chatters(self) -> int:
+        """ The amount of distinct users who wrote a comment. """
+        return len(self.chatters)
+
+    @property
+    def duration(self) -> int:
+        """ The time (in seconds) from the start of the VOD up to the last comment. """
+
+        self.flush()
+        return len(self._counts)
+
+    def top_chatters(self, n: int = 10) -> List[tuple]:
+        """ :return: the `n` users with the most comments as (name, amount of comments) tuples """
+        return self.chatters.most_common(n)
+
+    def rate(self, bucket: int = 1) -> list:
+        """ The message-rate histogram, i.e. how many comments have been posted in every `bucket` seconds of the VOD.
+
+            :param bucket: the size of the buckets in seconds
+            :return: the amount of comments per bucket, the first bucket starting at 0:00:00
+        """
+
+        self.flush()
+        bucket = max(1, int(bucket))
+
+        if self._numpy is not None:
+            numpy = self._numpy
+            padded = numpy.zeros(math.ceil(len(self._counts) / bucket) * bucket, dtype=numpy.int64)
+            padded[:len(self._counts)] = self._counts
+            return padded.reshape(-1, bucket).sum(axis=1).tolist()
+
+        counts = self._counts
+        return [sum(counts[i:i + bucket]) for i in range(0, len(counts), bucket)]
+
+    def per_second(self) -> list:
+        """ :return: the amount of comments posted in every second of the VOD """
+        return self.rate(bucket=1)
+
+    def per_minute(self) -> list:
+        """ :return: the amount of comments posted in every minute of the VOD """
+        return self.rate(bucket=60)
+
+    def bursts(self, window: int = 30, threshold: float = 3.0) -> List[Burst]:
+        """ Finds bursts of chat activity, i.e. the moments in which the chat got a lot more active than usual.
+
+            For every second, the comments posted in the following `window` seconds are counted. Every stretch of time
+            in which this count is more than `threshold` standard deviations above its average is a burst.
+
+            :param window: the size of the sliding window in seconds
+            :param threshold: how many standard deviations above the average a window has to be
+            :return: the bursts, in order of time
+        """
+
+        self.flush()
+        window = max(1, int(window))
+        if len(self._counts) < window:
+            return list()
+
+        # the average and the standard deviation are computed from the exact integer sums (of the counts and of their
+        # squares), with the same float operations on both paths, so numpy and pure Python give identical results
+        if self._numpy is not None:
+            numpy = self._numpy
+            cumulative = numpy.concatenate([[0], numpy.cumsum(self._counts)])
+            sums = cumulative[window:] - cumulative[:-window]
+            mean, std = _mean_std(len(sums), int(sums.sum()), int((sums * sums).sum()))
+            if std == 0:
+                return list()
+            flagged = numpy.flatnonzero(sums > mean + threshold * std).tolist()
+            sums = sums.tolist()
+            cumulative = cumulative.tolist()
+        else:
+            cumulative = [0] + list(accumulate(self._counts))
+            sums = [cumulative[i + window] - cumulative[i] for i in range(len(cumulative) - window)]
+            mean, std = _mean_std(len(sums), sum(sums), sum(s * s for s in sums))
+            if std == 0:
+                return list()
+            limit = mean + threshold * std
+            flagged = [i for i, s in enumerate(sums) if s > limit]
+
+        # merge the flagged windows which overlap into one burst each
+        bursts = list()
+        first = last = None
+        for i in flagged + [None]:
+            if first is not None and (i is None or i > last + window):
+                end = min(last + window, len(self._counts))
+                peak = max(sums[first:last + 1])
+                bursts.append(Burst(start=first, end=end, messages=cumulative[end] - cumulative[first],
+                                    peak=peak, score=(peak - mean) / std))
+                first = None
+            if i is not None:
+                if first is None:
+                    first = i
+                last = i
+
+        return bursts
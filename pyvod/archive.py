@@ -0,0 +1,291 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+"""
+
+
+import pathlib
+import time
+from typing import Iterable, NamedTuple, Union
+
+from .vod import BasicData
+from .vodchat import VODChat
+from .utils import get_strptime, format_posted_at
+
+
+class ArchivedComment(NamedTuple):
+    """ A comment as stored in the `SQLiteArchive`, i.e. a VODSimpleComment together with the VOD ID it belongs to.
+
+        `posted_at` is formatted as hours:minutes:seconds, just like the one of a VODSimpleComment.
+    """
+
+    vod_id: str
+    timestamp: str
+    posted_at: str
+    name: str
+    message: str
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vods (
+    vod_id TEXT PRIMARY KEY,
+    title TEXT,
+    views INTEGER,
+    created_at TEXT,
+    game TEXT,
+    vod_length REAL,
+    channel_name TEXT,
+    channel_id TEXT,
+    channel_date TEXT,
+    channel_views INTEGER,
+    channel_followers INTEGER,
+    channel_type TEXT,
+    comments INTEGER,
+    archived_at REAL
+);
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY,
+    vod_id TEXT NOT NULL,
+    posted_at INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    name TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS comments_vod_posted_at ON comments (vod_id, posted_at);
+CREATE INDEX IF NOT EXISTS comments_name ON comments (name);
+"""
+
+# the full-text index only stores the index itself, the messages are read from the "comments" table
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5 (message, content='comments', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS comments_fts_insert AFTER INSERT ON comments BEGIN
+    INSERT INTO comments_fts (rowid, message) VALUES (new.id, new.message);
+END;
+CREATE TRIGGER IF NOT EXISTS comments_fts_delete AFTER DELETE ON comments BEGIN
+    INSERT INTO comments_fts (comments_fts, rowid, message) VALUES ('delete', old.id, old.message);
+END;
+"""
+
+
+class SQLiteArchive:
+    """ A SQLite database archiving the comments (and the VOD/channel information) of any amount of VODs,
+        so they can be searched without downloading or reading through the output files again.
+
+        The comments are indexed by VOD and time (`posted_at`) as well as by user name.
+        If SQLite supports it (FTS5), the messages are additionally full-text indexed for `search()`.
+
+        Usage:
+
+            with SQLiteArchive("archive.db") as archive:
+                archive.add_vodchat(vod.get_vodchat())
+                archive.search("pog")
+
+        :param path: the path of the database file (created if needed)
+        :param batch_size: how many comments are inserted at once
+    """
+
+    def __init__(self, path: Union[pathlib.Path, str], batch_size: int = 10000):
+        self.path = pathlib.Path(path)
+        self.batch_size = max(1, batch_size)
+
+        import sqlite3  # only imported once a archive is opened, to keep importing pyvod fast
+
+        self._connection = sqlite3.connect(str(self.path))
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+        try:
+            with self._connection:
+                self._connection.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:  # SQLite has been compiled without FTS5, so we fall back to LIKE
+            self.fts = False
+
+    def __repr__(self):
+        return "<SQLiteArchive path={0.path!r} fts={0.fts!r}>".format(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        """ Closes the database connection. """
+        self._connection.close()
+
+    def add_vod(self, vod_id: str, basic_data: BasicData, amt_of_comments: int = None) -> None:
+        """ Adds (or updates) the information about a VOD and its channel.
+
+            :param vod_id: the VOD ID
+            :param basic_data: the basic information of the VOD, e.g. `VOD._basic_data`
+            :param amt_of_comments: the amount of comments archived for the VOD
+        """
+
+        with self._connection:
+            self._replace_vod(vod_id, basic_data=basic_data, amt_of_comments=amt_of_comments)
+
+    def _replace_vod(self, vod_id: str, basic_data: BasicData, amt_of_comments: int = None) -> None:
+        self._connection.execute("INSERT OR REPLACE INTO vods VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 (str(vod_id),) + tuple(basic_data) + (amt_of_comments, time.time()))
+
+    def add_comments(self, vod_id: str, rows: Iterable[tuple]) -> int:
+        """ Replaces the archived comments of a VOD, in one transaction: if `rows` fails partway (e.g. a failed
+            download), the previously archived comments are kept. The comments are inserted in batches of `batch_size`.
+
+            :param vod_id: the VOD ID
+            :param rows: the comments as (timestamp, posted_at, name, message) tuples,
+                         with posted_at in seconds since the start of the VOD
+            :return: the amount of comments inserted
+        """
+
+        with self._connection:
+            return self._replace_comments(vod_id, rows=rows)
+
+    def _replace_comments(self, vod_id: str, rows: Iterable[tuple]) -> int:
+        """ `add_comments()`, without committing (or rolling back) the transaction. """
+
+        vod_id = str(vod_id)
+        self._connection.execute("DELETE FROM comments WHERE vod_id = ?", (vod_id,))
+
+        amount = 0
+        batch = list()
+        for timestamp, posted_at, name, message in rows:
+            batch.append((vod_id, posted_at, timestamp, name, message))
+            if len(batch) >= self.batch_size:
+                amount += self._insert(batch)
+                batch = list()
+        if batch:
+            amount += self._insert(batch)
+
+        return amount
+
+    def _insert(self, batch: list) -> int:
+        self._connection.executemany("INSERT INTO comments (vod_id, posted_at, timestamp, name, message) "
+                                     "VALUES (?, ?, ?, ?, ?)", batch)
+        return len(batch)
+
+    def add_vodchat(self, vodchat: VODChat, shards: int = 1, checkpoint: Union[pathlib.Path, str] = None,
+                    checkpoint_interval: int = 50) -> int:
+        """ Archives the comments of a VOD, together with the information about the VOD and its channel.
+
+            If the raw comments have already been downloaded (`get_comments()` with `keep_raw`), these are archived.
+            Otherwise the comments are downloaded and inserted page by page, as they arrive,
+            without keeping them in memory.
+            The comments and the VOD information are replaced in one transaction, so if the download fails,
+            the previously archived comments of the VOD are kept.
+
+            :param vodchat: the VODChat of the VOD
+            :param shards: see `VODChat.get_comments()`, only used if the comments need to be downloaded
+            :param checkpoint: see `VODChat.get_comments()`, only used if the comments need to be downloaded
+            :param checkpoint_interval: see `VODChat.get_comments()`
+            :return: the amount of comments archived
+        """
+
+        if vodchat.raw_comments:
+            _vod_datetime = get_strptime(datetime_string=vodchat._basic_data.created_at)
+            pages = ((_json_body, vodchat._page_columns(_json_body, vod_datetime=_vod_datetime))
+                     for _json_body in vodchat.raw_comments.values())
+        else:
+            pages = vodchat._iter_pages_with(vodchat._page_columns, shards=shards, keep_raw=False, lean=True,
+                                             checkpoint=vodchat._make_checkpoint(checkpoint,
+                                                                                 interval=checkpoint_interval))
+
+        with self._connection:
+            amount = self._replace_comments(vodchat.vod_id, rows=(row for _json_body, columns in pages
+                                                                  for row in zip(*columns)))
+            self._replace_vod(vodchat.vod_id, basic_data=vodchat._basic_data, amt_of_comments=amount)
+
+        return amount
+
+    def vods(self) -> dict:
+        """ :return: the information of every archived VOD as a dict of VOD ID -> BasicData """
+
+        rows = self._connection.execute("SELECT vod_id, {} FROM vods ORDER BY vod_id"
+                                        .format(", ".join(BasicData._fields)))
+        return {row[0]: BasicData(*row[1:]) for row in rows}
+
+    def count(self, vod_id: str = None) -> int:
+        """ :return: the amount of archived comments, either of one VOD or of all VODs """
+
+        if vod_id is None:
+            return self._connection.execute("SELECT COUNT(*) FROM comments").fetchone()[0]
+        return self._connection.execute("SELECT COUNT(*) FROM comments WHERE vod_id = ?", (str(vod_id),)).fetchone()[0]
+
+    @staticmethod
+    def _where(vod_id: str = None, name: str = None, start: int = None, end: int = None) -> tuple:
+        """ Builds the WHERE conditions (and their parameters) shared by `get_comments()` and `search()`. """
+
+        conditions, params = list(), list()
+        if vod_id is not None:
+            conditions.append("comments.vod_id = ?")
+            params.append(str(vod_id))
+        if name is not None:
+            conditions.append("comments.name = ?")
+            params.append(name)
+        if start is not None:
+            conditions.append("comments.posted_at >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("comments.posted_at < ?")
+            params.append(end)
+        return conditions, params
+
+    def _select(self, conditions: list, params: list, limit: int = None, joins: str = "") -> list:
+        query = "SELECT comments.vod_id, comments.timestamp, comments.posted_at, comments.name, comments.message " \
+                "FROM comments{}".format(joins)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY comments.vod_id, comments.posted_at, comments.id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params = params + [limit]
+
+        return [ArchivedComment(vod_id, timestamp, format_posted_at(posted_at), name, message)
+                for vod_id, timestamp, posted_at, name, message in self._connection.execute(query, params)]
+
+    def get_comments(self, vod_id: str = None, start: int = None, end: int = None, name: str = None,
+                     limit: int = None) -> list:
+        """ Gets the archived comments, e.g. the comments of a VOD in a given time range, or all comments of a user.
+
+            :param vod_id: only get the comments of this VOD
+            :param start: only get the comments posted at or after `start` seconds into the VOD
+            :param end: only get the comments posted before `end` seconds into the VOD
+            :param name: only get the comments of this user
+            :param limit: the maximum amount of comments to get
+            :return: the comments as ArchivedComment instances, ordered by VOD and time
+        """
+
+        conditions, params = self._where(vod_id=vod_id, name=name, start=start, end=end)
+        return self._select(conditions, params, limit=limit)
+
+    def search(self, query: str, vod_id: str = None, name: str = None, start: int = None, end: int = None,
+               limit: int = 100) -> list:
+        """ Searches the messages of the archived comments, across all VODs or only in one of them.
+
+            With FTS5 available, `query` is a FTS5 query, i.e. words (all of them have to be in the message),
+            "a phrase", prefixes* and OR / NOT. Otherwise, it is searched for as a (case-insensitive) substring.
+
+            :param query: what to search for
+            :param vod_id: only search the comments of this VOD
+            :param name: only search the comments of this user
+            :param start: only search the comments posted at or after `start` seconds into the VOD
+            :param end: only search the comments posted before `end` seconds into the VOD
+            :param limit: the maximum amount of comments to get
+            :return: the matching comments as ArchivedComment instances, ordered by VOD and time
+            :raise ValueError: if `query` is not a valid FTS5 query
+        """
+
+        conditions, params = self._where(vod_id=vod_id, name=name, start=start, end=end)
+        if self.fts:
+            import sqlite3
+
+            try:
+                return self._select(["comments_fts MATCH ?"] + conditions, [query] + params, limit=limit,
+                                    joins=" JOIN comments_fts ON comments_fts.rowid = comments.id")
+            except sqlite3.OperationalError as e:
+                raise ValueError("Invalid search query '{}': {}".format(query, e)) from e
+        return self._select(["comments.message LIKE ?"] + conditions, ["%{}%".format(query)] + params, limit=limit)
@@ -0,0 +1,286 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+"""
+
+
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, AsyncGenerator, Iterable, List, Union
+
+from . import vod as _vod
+from .vod import VOD
+from .vodchat import VODChat
+from .commentstore import CommentStore
+from .client import TwitchClient
+from .utils import get_strptime
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+# the global cap on how many requests are in flight at the same time, across all AsyncVOD and AsyncVODChat instances
+_concurrency_limit = 10
+_executor = None
+_semaphores = weakref.WeakKeyDictionary()  # one semaphore per event loop
+_lock = threading.Lock()
+
+
+def set_concurrency_limit(limit: int) -> None:
+    """ Sets the global cap on how many requests are in flight at the same time.
+
+        Should be called before any requests are made. Make sure the `pool_size` of the used `TwitchClient`
+        is at least as big, otherwise the requests will wait for a free connection.
+
+        :param limit: the maximum amount of concurrent requests
+    """
+
+    global _concurrency_limit, _executor
+    with _lock:
+        _concurrency_limit = limit
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+        _semaphores.clear()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_concurrency_limit)
+        return _executor
+
+
+def _get_semaphore() -> "asyncio.Semaphore":
+    import asyncio  # only imported once needed, as it takes a while to import
+
+    loop = asyncio.get_event_loop()
+    with _lock:
+        semaphore = _semaphores.get(loop)
+        if semaphore is None:
+            semaphore = _semaphores[loop] = asyncio.Semaphore(_concurrency_limit)
+        return semaphore
+
+
+async def _get_json(client: TwitchClient, url: str, headers: dict, params: dict = None,
+                    cache_key: tuple = None) -> dict:
+    """ Runs `TwitchClient.get_json()` without blocking the event loop, respecting the global concurrency cap. """
+
+    import asyncio
+
+    async with _get_semaphore():
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            _get_executor(),
+            functools.partial(client.get_json, url=url, headers=headers, params=params, cache_key=cache_key)
+        )
+
+
+class AsyncVOD(VOD):
+    """ The asyncio counterpart to `VOD`.
+
+        Creating an instance does not make any requests, the basic information about the VOD is fetched via
+        `await vod.fetch()` (or all at once via `await AsyncVOD.create(vod_id)`).
+        The class attributes are the same as the ones of `VOD`.
+
+        Many VODs can be driven by one event loop, e.g. via `asyncio.gather()`. How many requests are in flight
+        at the same time is capped globally, see `set_concurrency_limit()`.
+
+        :param vod_id: the VOD ID to fetch the information for
+        :param client: the `TwitchClient` used for the requests. Defaults to the shared client (see `get_client()`)
+    """
+
+    def __repr__(self):
+        if self._data is None:
+            return "<AsyncVOD vod_id={0.vod_id!r} (not fetched)>".format(self)
+        return super().__repr__().replace("<VOD", "<AsyncVOD", 1)
+
+    @property
+    def _basic_data(self) -> _vod.BasicData:
+        if self._data is None:
+            raise RuntimeError("The VOD has not been fetched yet. Call `await vod.fetch()` first.")
+        return self._data
+
+    @classmethod
+    async def create(cls, vod_id, client: TwitchClient = None) -> "AsyncVOD":
+        """ Creates a AsyncVOD and fetches its basic information.
+
+            :param vod_id: the VOD ID to fetch the information for
+            :param client: the `TwitchClient` used for the requests
+            :return: the fetched AsyncVOD
+        """
+
+        return await cls(vod_id=vod_id, client=client).fetch()
+
+    @classmethod
+    async def prefetch(cls, vod_ids: Iterable, client: TwitchClient = None) -> List["AsyncVOD"]:
+        """ The async counterpart to `VOD.prefetch()`: creates a AsyncVOD for every VOD ID
+            and fetches their basic information concurrently.
+
+            :param vod_ids: the VOD IDs
+            :param client: the `TwitchClient` used for the requests
+            :return: the fetched AsyncVODs, in the order of `vod_ids`
+            :raise TwitchApiException: if the Twitch API does not respond with status code 200 for any of the VODs
+        """
+
+        import asyncio
+
+        return list(await asyncio.gather(*(cls.create(vod_id=vod_id, client=client) for vod_id in vod_ids)))
+
+    async def fetch(self) -> "AsyncVOD":
+        """ Fetches the basic information in regards to the VOD and the channel associated with the VOD.
+
+            :return: the AsyncVOD itself
+            :raise TwitchApiException: if the Twitch API does not respond with status code 200
+        """
+
+        headers = _vod._get_headers()
+        response_body = await _get_json(self._client, url=_vod.vod_url.format(vod_id=self.vod_id),
+                                        headers=headers, cache_key=("videos", self.vod_id, ""))
+        self._set_basic_data(_vod._parse_basic_data(response_body))
+
+        return self
+
+    def get_vodchat(self) -> "AsyncVODChat":
+        """ Gets the AsyncVODChat associated with the `vod_id`. The AsyncVOD has to be fetched first.
+
+            :return: the AsyncVODChat
+        """
+
+        return AsyncVODChat(vod_id=self.vod_id, _basic_vod_data=self._basic_data, _headers=_vod._get_headers(),
+                            _client=self._client)
+
+
+class AsyncVODChat(VODChat):
+    """ The asyncio counterpart to `VODChat`.
+
+        The comments can either be iterated as they arrive via `async for comment in vodchat`,
+        or all be fetched at once via `await vodchat.get_comments()`.
+        The `raw_comments` and `vod_comments` are filled the same way as with `VODChat`,
+        so `to_file()` can be used afterwards as well.
+
+        The synchronous methods of `VODChat` (e.g. `to_file(stream=True)`, `follow()`, or passing it to
+        `ChatAnalytics.from_vodchat()`) work the same as well, but block the event loop while downloading.
+
+        There should be no need to create a instance of this class manually.
+
+        :param vod_id: the VOD ID to fetch the information for
+    """
+
+    def __repr__(self):
+        return super().__repr__().replace("<VODChat", "<AsyncVODChat", 1)
+
+    def __aiter__(self) -> AsyncGenerator:
+        return self.iter_comments()
+
+    async def _arequest_page(self, params: dict) -> dict:
+        """ The async counterpart to `VODChat._request_page()`. """
+
+        return await _get_json(self._client, url=self.url, headers=self._headers, params=params,
+                               cache_key=self._cache_key(params) if self._cached else None)
+
+    async def _aiter_pages(self, start: float = None, end: float = None) -> AsyncGenerator:
+        """ The async counterpart to `VODChat._iter_pages()`. """
+
+        params = {"content_offset_seconds": start} if start else {"cursor": ""}
+        while True:
+            _json_body = await self._arequest_page(params=params)
+
+            _next = _json_body.get("_next", 0)  # get the key, if not found default to 0
+
+            if start or end is not None:
+                _json_body, outside_window = self._filter_window(_json_body, start=start, end=end)
+                if outside_window:
+                    _next = 0  # everything after this page is outside of the window
+                if not _json_body["comments"] and _next != 0:
+                    # nothing of this page is inside the window, but the following pages might be
+                    params = {"cursor": _next}
+                    continue
+
+            yield _json_body
+
+            if _next == 0:  # if there are no more chat comments to fetch, we are done
+                break
+
+            params = {"cursor": _next}
+
+    async def _aextract_comments(self, keep_raw: bool = True, start: float = None,
+                                 end: float = None) -> AsyncGenerator:
+        """ The async counterpart to `VODChat._extract_comments()`.
+
+            :param keep_raw: whether or not the raw JSON should be stored in the `raw_comments`
+            :param start: only get the comments posted at or after `start` seconds into the VOD
+            :param end: only get the comments posted before `end` seconds into the VOD
+            :return: AsyncGenerator: yields the request responses .json()
+        """
+
+        counter = 1
+        async for _json_body in self._aiter_pages(start=start, end=end):
+            self._record_page(counter=counter, _json_body=_json_body, keep_raw=keep_raw)
+            counter += 1
+
+            yield _json_body
+
+    async def _aiter_pages_with(self, clean, keep_raw: bool = True, start: float = None,
+                                end: float = None) -> AsyncGenerator:
+        """ The async counterpart to `VODChat._iter_pages_with()`.
+
+            :return: AsyncGenerator: yields the request response .json() together with its cleaned page
+        """
+
+        # time when the livestream happened as a datetime.datetime object
+        _vod_datetime = get_strptime(datetime_string=self._basic_data.created_at)
+
+        async for _json_body in self._aextract_comments(keep_raw=keep_raw, start=start, end=end):
+            if self._no_first_comments_response:  # if True, no comment data is available
+                return
+            yield _json_body, clean(_json_body, vod_datetime=_vod_datetime)
+
+    async def iter_comments(self, keep_raw: bool = False, start: Union[float, str] = None,
+                            end: Union[float, str] = None) -> AsyncGenerator:
+        """ The async counterpart to `VODChat.iter_comments()`. Sharded, checkpointed and pipelined downloads
+            are not supported, use the synchronous `VODChat` for those.
+
+            :param keep_raw: whether or not the raw JSON should be stored in the `raw_comments`
+            :param start: only get the comments posted from this point in the VOD on, see `VODChat.get_comments()`
+            :param end: only get the comments posted before this point in the VOD, see `VODChat.get_comments()`
+            :return: AsyncGenerator: yields VODSimpleComment instances
+        """
+
+        async for _json_body, comments in self._aiter_pages_with(self._clean_page, keep_raw=keep_raw,
+                                                                 **self._parse_window(start, end)):
+            for comment in comments:
+                yield comment
+
+    async def get_comments(self, compact: bool = False, keep_raw: bool = True, start: Union[float, str] = None,
+                           end: Union[float, str] = None) -> Union[list, CommentStore]:
+        """ The async counterpart to `VODChat.get_comments()`. Sharded, checkpointed and pipelined downloads
+            are not supported, use the synchronous `VODChat` for those.
+
+            :param compact: whether or not the comments should be stored in a compact `CommentStore`,
+                            see `VODChat.get_comments()`
+            :param keep_raw: whether or not the raw JSON should be stored in the `raw_comments`
+            :param start: only get the comments posted from this point in the VOD on, see `VODChat.get_comments()`
+            :param end: only get the comments posted before this point in the VOD, see `VODChat.get_comments()`
+            :return: the extracted comments from the raw data (VODSimpleComment instances),
+                     or None if the VOD has no comments
+        """
+
+        window = self._parse_window(start, end)
+        if compact:
+            self.vod_comments = CommentStore()
+            async for _json_body, columns in self._aiter_pages_with(self._page_columns, keep_raw=keep_raw, **window):
+                self.vod_comments.extend(*columns)
+        else:
+            self.vod_comments = list()
+            async for _json_body, comments in self._aiter_pages_with(self._clean_page, keep_raw=keep_raw, **window):
+                self.vod_comments.extend(comments)
+
+        if self._no_first_comments_response:
+            self.vod_comments = None
+
+        return self.comments
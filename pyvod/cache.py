@@ -0,0 +1,170 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+"""
+
+
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+from typing import Union
+
+
+class ResponseCache:
+    """ A opt-in on-disk cache for the responses of the Twitch API, used by the `TwitchClient` (see `cache`).
+
+        Every response is stored in its own file, keyed by (endpoint, vod_id, cursor).
+        Entries expire after a time-to-live depending on the endpoint: a short one for the VOD information
+        ("videos"), as the views and followers change, and a long one for the comment pages ("comments"),
+        as the comments of a finished VOD do not change anymore.
+        The last page of comments (without a `_next` cursor) is never cached, as it keeps on growing
+        while the VOD is still being broadcast.
+        If the cache grows larger than `max_size`, the least recently used entries are evicted.
+
+        :param dirpath: the path pointing to a directory in which the cached responses are saved (created if needed)
+        :param max_size: the maximum size of the cache in bytes
+        :param metadata_ttl: the time-to-live in seconds of the VOD information
+        :param comments_ttl: the time-to-live in seconds of the comment pages
+    """
+
+    def __init__(self, dirpath: Union[pathlib.Path, str], max_size: int = 1024 ** 3, metadata_ttl: float = 3600,
+                 comments_ttl: float = 30 * 24 * 3600):
+        self.path = pathlib.Path(dirpath)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.ttls = {"videos": metadata_ttl, "comments": comments_ttl}
+
+        self._lock = threading.Lock()
+
+        # file name -> (last used, size), the modification time of the files is used as the "last used" time
+        self._index = dict()
+        self._size = 0
+        for entry in os.scandir(str(self.path)):
+            if entry.name.endswith(".json") and entry.is_file():
+                stat = entry.stat()
+                self._index[entry.name] = (stat.st_mtime, stat.st_size)
+                self._size += stat.st_size
+
+    def __repr__(self):
+        return "<ResponseCache path={0.path!r} entries={1} size={0.size!r} max_size={0.max_size!r}>"\
+            .format(self, len(self._index))
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def size(self) -> int:
+        """ The size of the cache in bytes. """
+        return self._size
+
+    @staticmethod
+    def _file_name(key: tuple) -> str:
+        return hashlib.sha1(json.dumps(list(key)).encode("utf-8")).hexdigest() + ".json"
+
+    def get(self, key: tuple) -> Union[dict, None]:
+        """ Gets a cached response.
+
+            :param key: the key of the response, i.e. (endpoint, vod_id, cursor)
+            :return: the cached response .json(), or None if there is no (unexpired) cached response
+        """
+
+        file_name = self._file_name(key)
+        file_path = self.path / file_name
+        try:
+            with file_path.open(mode="r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("key") != list(key) or time.time() - entry["created"] > self.ttls.get(key[0], 0):
+            self._remove(file_name)
+            return None
+
+        # mark the entry as recently used
+        now = time.time()
+        try:
+            os.utime(str(file_path), (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            if file_name in self._index:
+                self._index[file_name] = (now, self._index[file_name][1])
+
+        return entry["body"]
+
+    def put(self, key: tuple, body: dict) -> None:
+        """ Caches a response, evicting the least recently used entries if the cache grows too large.
+            The last page of comments is not cached (see above).
+
+            :param key: the key of the response, i.e. (endpoint, vod_id, cursor)
+            :param body: the response .json()
+        """
+
+        if key[0] == "comments" and not body.get("_next"):
+            return
+
+        file_name = self._file_name(key)
+        data = json.dumps({"key": list(key), "created": time.time(), "body": body}, separators=(",", ":"))
+        data = data.encode("utf-8")
+
+        # write to a temporary file first, so other processes never read a half-written entry
+        tmp_path = self.path / "{}.{}.tmp".format(file_name, threading.get_ident())
+        with tmp_path.open(mode="wb") as file:
+            file.write(data)
+        os.replace(str(tmp_path), str(self.path / file_name))
+
+        with self._lock:
+            _, old_size = self._index.get(file_name, (0, 0))
+            self._index[file_name] = (time.time(), len(data))
+            self._size += len(data) - old_size
+            evict = self._evict()
+
+        for evicted in evict:
+            try:
+                (self.path / evicted).unlink()
+            except OSError:
+                pass
+
+    def _evict(self) -> list:
+        """ Removes the least recently used entries from the index until the cache fits into `max_size` again.
+
+            :return: the file names to delete
+        """
+
+        if self._size <= self.max_size:
+            return list()
+
+        # evict a bit more than needed, so we don't have to sort the index again on every following put()
+        target = self.max_size * 0.9
+        evict = list()
+        for file_name, (_, size) in sorted(self._index.items(), key=lambda item: item[1][0]):
+            if self._size <= target:
+                break
+            del self._index[file_name]
+            self._size -= size
+            evict.append(file_name)
+        return evict
+
+    def _remove(self, file_name: str) -> None:
+        with self._lock:
+            _, size = self._index.pop(file_name, (0, 0))
+            self._size -= size
+        try:
+            (self.path / file_name).unlink()
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        """ Removes every cached response. """
+
+        with self._lock:
+            file_names, self._index, self._size = list(self._index), dict(), 0
+        for file_name in file_names:
+            try:
+                (self.path / file_name).unlink()
+            except OSError:
+                pass
@@ -0,0 +1,112 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+"""
+
+
+import json
+import os
+import pathlib
+from typing import Union
+
+from .utils import validate_path
+
+
+class Checkpoint:
+    """ An on-disk checkpoint of a (partial) comment download, so a failed or killed download can be resumed.
+
+        The raw pages fetched so far are appended to the file `VOD_{vod_id}_CHECKPOINT.jsonl` (one page per line)
+        every `interval` pages. As every page contains the `_next` cursor, the last page written tells us exactly
+        where to continue, so a resumed download has no duplicates.
+
+        :param vod_id: the VOD ID
+        :param dirpath: the path pointing to a directory in which the checkpoint file is saved
+        :param interval: after how many fetched pages the checkpoint is written to disk
+
+        :raises DirectoryDoesNotExistError | DirectoryIsAFileError: if either the path does not exist,
+                                                                    or the path points to a file
+    """
+
+    def __init__(self, vod_id: str, dirpath: Union[pathlib.Path, str], interval: int = 50):
+        self.vod_id = str(vod_id)
+        self.interval = max(1, interval)
+        self.path = validate_path(provided_path=dirpath) / "VOD_{}_CHECKPOINT.jsonl".format(self.vod_id)
+
+        self._pending = list()  # the encoded pages which have not yet been written to disk
+
+    def __repr__(self):
+        return "<Checkpoint vod_id={0.vod_id!r} path={0.path!r} interval={0.interval!r}>".format(self)
+
+    def load(self) -> list:
+        """ Loads the pages of a previous download, if there is a checkpoint file.
+
+            A incomplete last line (e.g. if the process has been killed while writing) is discarded.
+
+            :return: the pages fetched so far, in order
+        """
+
+        if not self.path.exists():
+            return list()
+
+        pages = list()
+        with self.path.open(mode="rb") as file:
+            header = file.readline()
+            try:
+                valid = header.endswith(b"\n") and json.loads(header.decode("utf-8"))["vod_id"] == self.vod_id
+            except (ValueError, KeyError, TypeError):
+                valid = False
+            valid_size = len(header)
+
+            if valid:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        pages.append(json.loads(line.decode("utf-8")))
+                    except ValueError:
+                        break
+                    valid_size += len(line)
+
+        if not valid:  # not a (valid) checkpoint, so we start over
+            self.path.unlink()
+            return list()
+
+        # cut off anything after the last complete page, so we can append to the file again
+        if valid_size != self.path.stat().st_size:
+            with self.path.open(mode="r+b") as file:
+                file.truncate(valid_size)
+
+        return pages
+
+    def add(self, _json_body: dict) -> None:
+        """ Adds a fetched page to the checkpoint. Writes the checkpoint to disk every `interval` pages.
+
+            :param _json_body: the request response .json()
+        """
+
+        self._pending.append(json.dumps(_json_body, separators=(",", ":")))
+        if len(self._pending) >= self.interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """ Writes the pages added since the last flush to disk. """
+
+        if not self._pending and self.path.exists():
+            return
+
+        new_file = not self.path.exists()
+        with self.path.open(mode="a", encoding="utf-8") as file:
+            if new_file:
+                file.write(json.dumps({"vod_id": self.vod_id}) + "\n")
+            file.write("".join(line + "\n" for line in self._pending))
+            file.flush()
+            os.fsync(file.fileno())
+        self._pending = list()
+
+    def remove(self) -> None:
+        """ Removes the checkpoint file, e.g. once the download is complete. """
+
+        self._pending = list()
+        if self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,445 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+
+The command line interface, see 'python -m pyvod --help'.
+"""
+
+
+import argparse
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from .vod import VOD
+from .client import TwitchClient
+from .cache import ResponseCache
+from .metrics import enable_metrics
+from .workqueue import WorkQueue, default_worker_id
+from .sync import ChannelSync
+from .writers import CHAT_WRITERS, COMPRESSIONS, RAW_WRITERS
+from .utils import validate_path
+
+
+def _parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Get the chat comments from a Twitch.tv VOD! "
+                                                 "Usage: 'python -m pyvod -vod VOD_ID -dir PATH_TO_SAVE_FILES_INTO'")
+    parser.add_argument("-vod", "-v", type=str, nargs="+", action="append", default=[],
+                        help="the VOD ID (Video ID) from the VOD. Can be given multiple times, "
+                             "e.g. '-vod 111 222 -vod 333'")
+    parser.add_argument("-file", type=str, default=None,
+                        help="a file containing VOD IDs (one per line, lines starting with '#' are ignored). "
+                             "Use '-' to read the VOD IDs from stdin")
+    parser.add_argument("-dir", "-d", type=str, default=None, help="the directory path where the output is to be saved."
+                                                                   " If not provided, defaults to the "
+                                                                   "current working directory ")
+    parser.add_argument("-workers", "-w", type=int, default=1,
+                        help="how many VODs are downloaded at the same time (default 1)")
+    parser.add_argument("-summary", type=str, default=None,
+                        help="the file path where the summary report (JSON) of the run is saved. "
+                             "Defaults to 'pyvod_summary.json' inside the output directory")
+    parser.add_argument("-metrics", type=str, default=None,
+                        help="the file path where the metrics of the run (request latencies, retries, time per stage) "
+                             "are saved. In the Prometheus text format if the path ends with '.prom', otherwise JSON")
+    parser.add_argument("-progress-interval", type=float, default=5.0,
+                        help="how often (in seconds) the progress is reported, 0 to disable (default 5)")
+    parser.add_argument("-stream", "-s", action="store_true", help="write the comments into the files while they "
+                                                                   "are downloaded, instead of keeping them all in "
+                                                                   "memory until the download is done")
+    parser.add_argument("-format", "-f", type=str, default="json", choices=["json", "jsonl"],
+                        help="the format of the raw data: 'json' (one indented JSON object, default) "
+                             "or 'jsonl' (JSON Lines, one raw comment per line)")
+    parser.add_argument("-chat-format", type=str, default="txt", choices=["txt", "csv", "tsv"],
+                        help="the format of the cleaned comments: 'txt' (the VOD_{id}_CHAT.txt file with the "
+                             "VOD/channel information, default), 'csv' or 'tsv' (the comments only)")
+    parser.add_argument("-columns", type=str, nargs="+", default=None,
+                        choices=["timestamp", "posted_at", "name", "message"],
+                        help="the columns of the cleaned comments, in order (default: all of them)")
+    parser.add_argument("-compression", "-c", type=str, default=None, choices=["gzip", "zstd"],
+                        help="compress the output files with gzip or zstd ('zstd' requires the zstandard package)")
+    parser.add_argument("-checkpoint", "-cp", type=str, default=None,
+                        help="the directory path where a checkpoint of the download is saved. If the download fails, "
+                             "rerunning the same command continues where the last download stopped")
+    parser.add_argument("-checkpoint-interval", type=int, default=50,
+                        help="after how many fetched pages the checkpoint is saved (default 50)")
+    parser.add_argument("-cache", type=str, default=None,
+                        help="the directory path where the API responses are cached, so re-running the same VOD "
+                             "does not download everything again")
+    parser.add_argument("-processes", "-p", type=int, default=None,
+                        help="decode and clean the comments on this many worker processes, while the pages are "
+                             "fetched ahead (a pipelined download for very large VODs). Can not be used with -checkpoint")
+    parser.add_argument("-follow", type=float, nargs="?", const=30.0, default=None, metavar="INTERVAL",
+                        help="follow a broadcast which is still live: keep on polling for new comments every INTERVAL "
+                             "seconds (default 30) and append them to the files, until stopped via Ctrl+C")
+    parser.add_argument("-follow-timeout", type=float, default=None,
+                        help="stop following once no new comments have been posted for this many seconds")
+    parser.add_argument("-queue", "-q", type=str, default=None,
+                        help="the path of a work queue (a SQLite file, e.g. on a shared filesystem). The given VOD IDs "
+                             "are added to the queue, then the VODs are claimed from it until it is drained. Run the "
+                             "same command on several machines to share the work, without downloading a VOD twice")
+    parser.add_argument("-channel", type=str, nargs="+", default=None, metavar="CHANNEL_ID",
+                        help="sync the VODs of these channels (by channel ID) into the output directory: only the VODs "
+                             "which are new or incomplete since the last sync are downloaded")
+    parser.add_argument("-lease", type=float, default=300.0,
+                        help="for how many seconds a claimed VOD belongs to a worker which stopped responding, "
+                             "before it is claimed by another worker (default 300)")
+    parser.add_argument("-retry-delay", type=float, default=30.0,
+                        help="for how many seconds a failed VOD of the work queue waits before it is tried again, "
+                             "doubled with every further attempt (default 30)")
+
+    args = parser.parse_args(argv)
+    if args.processes and args.checkpoint:
+        parser.error("-processes can not be used together with -checkpoint")
+    if args.follow is not None and args.follow <= 0:
+        parser.error("-follow INTERVAL has to be greater than 0")
+    if args.follow is not None and (args.processes or args.checkpoint):
+        parser.error("-follow can not be used together with -processes or -checkpoint")
+    if args.follow is not None and args.queue:
+        parser.error("-follow can not be used together with -queue")
+    if args.channel and (args.queue or args.follow is not None or args.checkpoint):
+        parser.error("-channel can not be used together with -queue, -follow or -checkpoint")
+    return args
+
+
+def read_vod_ids(vod_args: List[List[str]], file: str = None) -> List[str]:
+    """ Collects the VOD IDs from the command line arguments and the given file (or stdin, if `file` is '-').
+
+        :param vod_args: the values of the (repeatable) `-vod` argument
+        :param file: the path of a file containing VOD IDs, one per line
+        :return: the unique VOD IDs, in the order they were given
+    """
+
+    vod_ids = [vod_id for values in vod_args for vod_id in values]
+
+    if file:
+        lines = sys.stdin.read().splitlines() if file == "-" else pathlib.Path(file).read_text().splitlines()
+        vod_ids.extend(line.strip() for line in lines if line.strip() and not line.strip().startswith("#"))
+
+    return list(dict.fromkeys(vod_id.strip() for vod_id in vod_ids if vod_id.strip()))
+
+
+class _Progress:
+    """ Keeps track of the running downloads and reports the progress every `interval` seconds. """
+
+    def __init__(self, total: int, interval: float):
+        self.total = total
+        self.interval = interval
+        self.start = time.monotonic()
+
+        self.done = 0
+        self._finished_pages = 0
+        self._finished_comments = 0
+        self._running = dict()  # vod_id -> VODChat
+        self._stopping = False  # see `stop_following()`
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        if self.interval > 0:
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+
+    def print(self, message: str) -> None:
+        with self._lock:
+            print(message, flush=True)
+
+    def started(self, vod_id: str, vodchat) -> None:
+        with self._lock:
+            self._running[vod_id] = vodchat
+            if self._stopping:
+                vodchat.stop_following()
+
+    def stop_following(self) -> None:
+        """ Stops following the live broadcasts of the running (and starting) downloads. """
+
+        with self._lock:
+            self._stopping = True
+            for vodchat in self._running.values():
+                vodchat.stop_following()
+
+    def finished(self, vod_id: str) -> None:
+        with self._lock:
+            vodchat = self._running.pop(vod_id, None)
+            if vodchat is not None:
+                self._finished_pages += vodchat.pages_fetched
+                self._finished_comments += vodchat.comments_fetched
+            self.done += 1
+
+    def totals(self) -> tuple:
+        """ :return: the total amount of pages and comments fetched so far """
+
+        with self._lock:
+            pages = self._finished_pages + sum(vodchat.pages_fetched for vodchat in self._running.values())
+            comments = self._finished_comments + sum(vodchat.comments_fetched for vodchat in self._running.values())
+        return pages, comments
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            pages, comments = self.totals()
+            elapsed = max(time.monotonic() - self.start, 1e-9)
+            with self._lock:
+                for vod_id, vodchat in self._running.items():
+                    print("  [{}] {} comments, {} pages".format(vod_id, vodchat.comments_fetched,
+                                                                vodchat.pages_fetched))
+                print("Progress: {}/{} VODs done, {:.1f} comments/s, {:.2f} pages/s"
+                      .format(self.done, self.total, comments / elapsed, pages / elapsed), flush=True)
+
+
+def _download(vod_id: str, args: argparse.Namespace, client: TwitchClient, fp: pathlib.Path,
+              checkpoint: pathlib.Path, progress: _Progress) -> dict:
+    """ Downloads (and saves) the comments of a single VOD.
+
+        :return: the result of the download for the summary report
+    """
+
+    result = {"vod_id": vod_id, "status": "ok", "comments": 0, "pages": 0, "seconds": 0.0, "error": None}
+    start = time.monotonic()
+    vodchat = None
+    try:
+        if checkpoint and (checkpoint / "VOD_{}_CHECKPOINT.jsonl".format(vod_id)).exists():
+            progress.print("[{}] Found a checkpoint, continuing the previous download.".format(vod_id))
+
+        # get a VOD and the VODChat associated with the VOD
+        vod = VOD(vod_id=vod_id, client=client)
+        vodchat = vod.get_vodchat()
+        progress.started(vod_id, vodchat)
+        # the title is only printed once the download is done, as the VOD information is still being fetched
+        # in the background while the first comments are requested
+        progress.print("[{}] Getting VOD comments...".format(vod_id))
+
+        if args.stream or args.follow is not None:
+            # download the comments and write them into the file(s) page by page, as they arrive
+            amt_comments = vodchat.to_file(dirpath=fp, save_json=True, stream=True, chat_format=args.chat_format,
+                                           columns=args.columns, raw_format=args.format, compression=args.compression,
+                                           checkpoint=checkpoint, checkpoint_interval=args.checkpoint_interval,
+                                           processes=args.processes, follow=args.follow is not None,
+                                           interval=args.follow if args.follow is not None else 30.0,
+                                           timeout=args.follow_timeout)
+        else:
+            # get the comments associated with the VODChat (returns None if none found)
+            comments = vodchat.get_comments(checkpoint=checkpoint, checkpoint_interval=args.checkpoint_interval,
+                                            processes=args.processes)
+            amt_comments = len(comments) if comments else 0
+            if amt_comments:
+                # write the output to the file(s)
+                vodchat.to_file(dirpath=fp, save_json=True, chat_format=args.chat_format, columns=args.columns,
+                                raw_format=args.format, compression=args.compression)
+
+        result["comments"] = amt_comments
+        if not amt_comments:
+            result["status"] = "no comments"
+            progress.print("[{}] No comments for this VOD available.".format(vod_id))
+        else:
+            progress.print("[{}] Comments extracted for '{}' ({}): {}".format(vod_id, vod.vod_title, vod.channel,
+                                                                        amt_comments))
+    except Exception as e:  # one failing VOD should not stop the whole batch
+        result["status"] = "failed"
+        result["error"] = "{}: {}".format(type(e).__name__, e)
+        progress.print("[{}] Failed: {}".format(vod_id, result["error"]))
+    finally:
+        if vodchat is not None:
+            result["pages"] = vodchat.pages_fetched
+        result["seconds"] = round(time.monotonic() - start, 3)
+        progress.finished(vod_id)
+
+    return result
+
+
+def _drain_queue(queue: WorkQueue, stop: threading.Event, args: argparse.Namespace, client: TwitchClient,
+                 fp: pathlib.Path, checkpoint: pathlib.Path, progress: _Progress) -> List[dict]:
+    """ Claims and downloads VODs from the work queue, until there are none left (queued or running elsewhere).
+
+        :return: the results of the downloads for the summary report
+    """
+
+    worker = default_worker_id()
+    siblings = worker.rsplit("-", 1)[0] + "-"  # the workers of this process, see `default_worker_id()`
+    results = list()
+    while not stop.is_set():
+        job = queue.claim(worker=worker)
+        if job is None:
+            # the VODs still running on other machines/processes are claimed once their leases run out
+            # (i.e. the worker died), the ones of the other threads of this process are finished by them
+            wait = queue.next_claim(ignore_workers=siblings)
+            if wait is None:
+                break
+            stop.wait(min(wait, 10.0) + 0.01)
+            continue
+
+        if job.attempts > 1:
+            progress.print("[{}] Claimed again (attempt {}).".format(job.vod_id, job.attempts))
+        with queue.keep_alive(job) as keep_alive:
+            result = _download(job.vod_id, args=args, client=client, fp=fp, checkpoint=checkpoint, progress=progress)
+        if result["status"] == "failed":
+            queue.fail(job, error=result["error"])
+        elif not queue.complete(job, comments=result["comments"]) or keep_alive.lost:
+            progress.print("[{}] The lease ran out during the download, the VOD has been claimed by another worker."
+                           .format(job.vod_id))
+        results.append(result)
+
+    return results
+
+
+def _sync_channels(args: argparse.Namespace) -> int:
+    """ Syncs the VODs of the channels given via `-channel` into the output directory.
+
+        :return: the exit code, 0 if every VOD has been downloaded, 1 if at least one failed
+    """
+
+    fp = validate_path(provided_path=args.dir) if args.dir else pathlib.Path(os.getcwd())
+    metrics = enable_metrics() if args.metrics else None
+    client = TwitchClient(cache=ResponseCache(dirpath=args.cache) if args.cache else None)
+
+    failed = 0
+    for channel_id in args.channel:
+        sync = ChannelSync(channel_id=channel_id, dirpath=fp, raw_format=args.format, compression=args.compression,
+                           chat_format=args.chat_format, client=client)
+        print("Syncing the VODs of channel {} into {}...".format(channel_id, fp))
+        result = sync.sync(processes=args.processes, columns=args.columns)
+        print("Channel {}: {} VOD(s) listed, {} already archived, {} downloaded, {} failed."
+              .format(channel_id, result.listed, result.skipped, len(result.downloaded), len(result.failed)))
+        for vod_id, error in result.failed.items():
+            print("- {}: {}".format(vod_id, error))
+        failed += len(result.failed)
+        print("- {} for the manifest.".format(sync.manifest_path))
+
+    if metrics is not None:
+        metrics.save(args.metrics)
+        print("- {} for the metrics.".format(args.metrics))
+
+    return 1 if failed else 0
+
+
+def main(argv: List[str] = None) -> int:
+    """ Runs the command line interface.
+
+        :param argv: the command line arguments, defaults to `sys.argv[1:]`
+        :return: the exit code, 0 if every VOD has been downloaded, 1 if at least one failed, 130 if interrupted
+    """
+
+    args = _parse_args(argv)
+
+    if args.channel:
+        return _sync_channels(args)
+
+    vod_ids = read_vod_ids(vod_args=args.vod, file=args.file)
+    if not vod_ids and not args.queue:
+        print("Please rerun and specify a VOD ID via 'python -m pyvod -vod VOD_ID'.")
+        return -1
+
+    fp = args.dir
+    fp = validate_path(provided_path=fp) if fp else pathlib.Path(os.getcwd())
+    checkpoint = validate_path(provided_path=args.checkpoint) if args.checkpoint else None
+
+    metrics = enable_metrics() if args.metrics else None
+
+    queue = WorkQueue(args.queue, lease=args.lease, retry_delay=args.retry_delay) if args.queue else None
+    if queue is not None:
+        added = queue.add(vod_ids)
+        counts = queue.counts()
+        total = counts["queued"] + counts["running"]
+        print("Added {} VOD(s) to the queue {} ({} queued, {} running, {} done, {} failed)."
+              .format(added, queue.path, counts["queued"], counts["running"], counts["done"], counts["failed"]))
+    else:
+        total = len(vod_ids)
+
+    workers = max(1, min(args.workers, total)) if total else 1
+    client = TwitchClient(pool_size=max(10, workers),
+                          cache=ResponseCache(dirpath=args.cache) if args.cache else None)
+
+    print("Getting VOD comments for {} VOD(s) with {} worker(s)...".format(total, workers))
+    print("Will write the output into the following directory: {}".format(fp))
+    print("\nDepending on how many comments the VODs have, it might take a while.\n")
+
+    stop = threading.Event()
+    with _Progress(total=total, interval=args.progress_interval) as progress, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        if queue is not None:
+            futures = [executor.submit(_drain_queue, queue, stop=stop, args=args, client=client, fp=fp,
+                                       checkpoint=checkpoint, progress=progress) for _ in range(workers)]
+        else:
+            futures = [executor.submit(_download, vod_id, args=args, client=client, fp=fp, checkpoint=checkpoint,
+                                       progress=progress) for vod_id in vod_ids]
+        interrupted = False
+        try:
+            results = [future.result() for future in futures]
+            if queue is not None:
+                results = [result for worker_results in results for result in worker_results]
+        except KeyboardInterrupt:
+            # the running downloads finish (and finalize their files), the ones which have not started yet are
+            # cancelled here, as leaving the executor waits for every pending download (`cancel_futures` is 3.9+).
+            # Following a broadcast is usually stopped this way, otherwise the batch counts as interrupted
+            interrupted = args.follow is None
+            stop.set()  # no new VODs are claimed from the queue
+            if interrupted:
+                progress.print("\nInterrupted, waiting for the running download(s) to finish...")
+            else:
+                progress.print("\nStopping to follow the broadcast(s)...")
+                progress.stop_following()
+            for future in futures:
+                future.cancel()
+            results = list()
+            for index, future in enumerate(futures):
+                if not future.cancelled():
+                    results.extend(future.result() if queue is not None else [future.result()])
+                elif queue is None:
+                    results.append({"vod_id": vod_ids[index], "status": "cancelled", "comments": 0, "pages": 0,
+                                    "seconds": 0.0, "error": None})
+        pages, comments = progress.totals()
+        elapsed = time.monotonic() - progress.start
+
+    failed = [result for result in results if result["status"] == "failed"]
+    cancelled = sum(result["status"] == "cancelled" for result in results)
+    summary = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(time.time() - elapsed)),
+        "seconds": round(elapsed, 3),
+        "interrupted": interrupted,
+        "vods": len(results),
+        "failed": len(failed),
+        "cancelled": cancelled,
+        "comments": comments,
+        "pages": pages,
+        "comments_per_second": round(comments / elapsed, 2) if elapsed else 0,
+        "pages_per_second": round(pages / elapsed, 2) if elapsed else 0,
+        "results": results,
+    }
+    summary_path = pathlib.Path(args.summary) if args.summary else fp / "pyvod_summary.json"
+    with summary_path.open(mode="w", encoding="utf-8") as file:
+        json.dump(summary, file, indent=4)
+
+    print("\n{}: {} VOD(s), {} failed{}, {} comments in {:.1f}s ({:.1f} comments/s, {:.2f} pages/s)."
+          .format("Interrupted" if interrupted else "Done", len(results), len(failed),
+                  ", {} cancelled".format(cancelled) if cancelled else "", comments, elapsed,
+                  summary["comments_per_second"], summary["pages_per_second"]))
+    for result in failed:
+        print("- {}: {}".format(result["vod_id"], result["error"]))
+    print("See the following files in the mentioned directory: ")
+    extension = COMPRESSIONS[args.compression]
+    print("- VOD_{{id}}_CHAT.{}{} for the extracted comments{}.".format(
+        CHAT_WRITERS[args.chat_format][1], extension,
+        " (and additional channel information)" if args.chat_format == "txt" else ""))
+    print("- VOD_{{id}}_RAW.{}{} for the raw data.".format(RAW_WRITERS[args.format][1], extension))
+    print("- {} for the summary report.".format(summary_path))
+    if metrics is not None:
+        metrics.save(args.metrics)
+        print("- {} for the metrics.".format(args.metrics))
+    if queue is not None:
+        counts = queue.counts()
+        print("Queue {}: {} queued, {} running, {} done, {} failed."
+              .format(queue.path, counts["queued"], counts["running"], counts["done"], counts["failed"]))
+        queue.close()
+
+    if interrupted:
+        return 130  # like a shell does for SIGINT
+    return 1 if failed else 0
@@ -0,0 +1,265 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+"""
+
+
+import random
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from .exceptions import TwitchApiException
+from .cache import ResponseCache
+from . import metrics as _metrics
+from . import decoder
+
+if TYPE_CHECKING:
+    import requests
+
+
+# status codes which are worth retrying, as they are (usually) only temporary
+RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+
+class TokenBucket:
+    """ A simple thread-safe token bucket, which limits how many requests can be made in a given time frame.
+
+        The bucket is kept in sync with the rate-limit headers Twitch sends along with every response
+        (`Ratelimit-Limit`, `Ratelimit-Remaining` and `Ratelimit-Reset`), so we slow down before we get throttled.
+
+        :param capacity: the maximum amount of tokens (requests) the bucket can hold
+        :param refill_period: the time in seconds it takes to completely refill an empty bucket
+    """
+
+    def __init__(self, capacity: int = 800, refill_period: float = 60.0):
+        self.capacity = capacity
+        self.refill_period = refill_period
+
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._reset_at = None  # time.time() based point in time at which a depleted bucket is full again
+
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._last_refill) * self.capacity / self.refill_period)
+        self._last_refill = now
+
+    def acquire(self) -> None:
+        """ Takes a token out of the bucket, blocking until one is available. """
+
+        while True:
+            with self._lock:
+                if self._reset_at is not None:
+                    wait = self._reset_at - time.time()
+                    if wait <= 0:
+                        self._reset_at = None
+                        self._tokens = max(self._tokens, 1.0)
+                        self._last_refill = time.monotonic()
+                else:
+                    self._refill()
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) * self.refill_period / self.capacity
+
+            if wait > 0:
+                time.sleep(wait)
+
+    def update(self, headers) -> None:
+        """ Syncs the bucket with the rate-limit headers of a response.
+
+            :param headers: the response headers
+        """
+
+        try:
+            limit = int(headers["Ratelimit-Limit"])
+            remaining = int(headers["Ratelimit-Remaining"])
+        except (KeyError, ValueError):
+            return
+        reset = headers.get("Ratelimit-Reset")
+
+        with self._lock:
+            self.capacity = limit
+            self._refill()
+            self._tokens = min(self._tokens, float(remaining))
+            if remaining <= 0 and reset:
+                try:
+                    self._reset_at = float(reset)
+                except ValueError:
+                    pass
+
+
+class TwitchClient:
+    """ The HTTP client used for every request against the Twitch API.
+
+        Uses a pooled `requests.Session` (keep-alive, so no new TLS handshake per request),
+        retries transient errors (429, 5xx and connection errors) with exponential backoff and jitter,
+        and rate-limits itself via a `TokenBucket`.
+
+        A client can safely be shared between threads, e.g. for sharded downloads or multiple VODs.
+
+        :param pool_size: the maximum amount of connections kept alive in the pool
+        :param max_retries: how often a failed request is retried before giving up
+        :param backoff_factor: the base delay in seconds for the exponential backoff (`backoff_factor * 2 ** retry`)
+        :param max_backoff: the maximum delay in seconds between two retries
+        :param timeout: the timeout in seconds for a single request
+        :param rate_limiter: the `TokenBucket` to use. Pass `None` to create a default one
+        :param cache: the (opt-in) `ResponseCache` for the responses
+    """
+
+    def __init__(self, pool_size: int = 10, max_retries: int = 5, backoff_factor: float = 0.5,
+                 max_backoff: float = 60.0, timeout: float = 30.0, rate_limiter: TokenBucket = None,
+                 cache: ResponseCache = None):
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter if rate_limiter else TokenBucket()
+        self.cache = cache
+
+        # requests is only imported once the first client is created, as it takes a while to import
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def __repr__(self):
+        return "<TwitchClient pool_size={0.pool_size!r} max_retries={0.max_retries!r}>".format(self)
+
+    def _backoff(self, retry: int, response: "requests.Response" = None) -> float:
+        """ Gets the time to wait before the next retry. Respects the `Retry-After` header if present. """
+
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                return min(self.max_backoff, float(response.headers["Retry-After"]))
+            except ValueError:
+                pass
+        # exponential backoff with "full jitter"
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** retry))
+
+    def get(self, url: str, headers: dict = None, params: dict = None) -> "requests.Response":
+        """ Makes a GET request, retrying transient errors.
+
+            :param url: the url to request
+            :param headers: the request headers
+            :param params: the request parameters
+            :return: the last response, which either is not retryable or the retries have been used up
+            :raise requests.RequestException: if the connection still fails after all retries
+        """
+
+        import requests
+
+        retry = 0
+        while True:
+            self.rate_limiter.acquire()
+            metrics = _metrics.active
+            try:
+                if metrics is None:
+                    response = self.session.get(url=url, headers=headers, params=params, timeout=self.timeout)
+                else:
+                    with metrics.stage("request"):
+                        start = time.perf_counter()
+                        response = self.session.get(url=url, headers=headers, params=params, timeout=self.timeout)
+                    metrics.record_request(url, status=response.status_code, seconds=time.perf_counter() - start,
+                                           nbytes=len(response.content))
+            except (requests.ConnectionError, requests.Timeout):
+                if retry >= self.max_retries:
+                    raise
+                if metrics is not None:
+                    metrics.record_retry(url, retry=retry + 1)
+                time.sleep(self._backoff(retry))
+                retry += 1
+                continue
+
+            self.rate_limiter.update(response.headers)
+
+            if response.status_code in RETRY_STATUS_CODES and retry < self.max_retries:
+                if metrics is not None:
+                    metrics.record_retry(url, retry=retry + 1, status=response.status_code)
+                time.sleep(self._backoff(retry, response))
+                retry += 1
+                continue
+
+            return response
+
+    def get_json(self, url: str, headers: dict = None, params: dict = None, cache_key: tuple = None,
+                 lean: bool = False) -> dict:
+        """ Makes a GET request and returns the response .json(), decoded by the decoder set via
+            `pyvod.decoder.set_json_decoder()` (the fastest one installed by default).
+
+            :param url: the url to request
+            :param headers: the request headers
+            :param params: the request parameters
+            :param cache_key: the key (endpoint, vod_id, cursor) of the response in the `cache`, if it should be cached
+            :param lean: whether or not the response is a page of comments of which only the fields needed for the
+                         VODSimpleComment have to be decoded (see `pyvod.decoder.loads_lean()`).
+                         Cached responses are always whole pages
+            :return: the request response .json()
+            :raise TwitchApiException: if the Twitch API does not respond with status code 200
+        """
+
+        if self.cache is not None and cache_key is not None:
+            body = self.cache.get(cache_key)
+            if body is None:
+                body = self.get_json(url=url, headers=headers, params=params)  # the cache always keeps whole pages
+                self.cache.put(cache_key, body)
+            return body
+
+        content = self.get_content(url=url, headers=headers, params=params)
+
+        with _metrics.stage("decode"):
+            return decoder.loads_lean(content) if lean else decoder.loads(content)
+
+    def get_content(self, url: str, headers: dict = None, params: dict = None) -> bytes:
+        """ Makes a GET request and returns the response body as it is, i.e. without decoding the JSON.
+
+            :param url: the url to request
+            :param headers: the request headers
+            :param params: the request parameters
+            :return: the response body
+            :raise TwitchApiException: if the Twitch API does not respond with status code 200
+        """
+
+        response = self.get(url=url, headers=headers, params=params)
+
+        if response.status_code != 200:
+            try:
+                msg_from_twitch = response.json()["message"]
+            except (ValueError, KeyError, TypeError):
+                msg_from_twitch = response.reason
+            raise TwitchApiException(
+                "Twitch API responded with '{1}' (status code {0}). Expected 200 (OK)."
+                .format(response.status_code, msg_from_twitch)
+            )
+
+        return response.content
+
+    def close(self) -> None:
+        """ Closes all the pooled connections. """
+        self.session.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> TwitchClient:
+    """ Gets the shared default `TwitchClient`, creating it on first use.
+
+        :return: the default client
+    """
+
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = TwitchClient()
+        return _default_client
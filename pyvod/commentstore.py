@@ -0,0 +1,165 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+"""
+
+
+from array import array
+from typing import Generator, Iterable, Union
+
+from .vodcomment import VODSimpleComment
+from .utils import format_posted_at
+
+
+class CommentStore:
+    """ A compact, array-backed store for the comments of a VOD.
+
+        Instead of four separate `str` objects per comment (see VODSimpleComment), the comments are stored in columns:
+
+        - the `posted_at` times as integer seconds (an `array`)
+        - the user names interned in a dictionary-encoded column (every distinct name is only stored once)
+        - the messages and timestamps each in one contiguous UTF-8 buffer
+
+        Indexing and iterating yield VODSimpleComment instances, so a CommentStore can be used wherever
+        the list returned by `VODChat.get_comments()` is used, e.g. for `VODChat.to_file()`.
+
+        If `pyarrow` is installed, the store can be exported via `to_arrow()` and `to_parquet()`.
+    """
+
+    def __init__(self):
+        self._offsets = array("q")  # posted_at in seconds
+
+        self._name_codes = array("I")  # the index of the name of each comment in _names
+        self._names = list()  # the distinct names
+        self._name_index = dict()  # name -> index in _names
+
+        # the buffers hold the UTF-8 encoded strings back to back, the *_ends where each string starts/ends
+        self._timestamps = bytearray()
+        self._timestamp_ends = array("q", [0])
+        self._messages = bytearray()
+        self._message_ends = array("q", [0])
+
+    def __repr__(self):
+        return "<CommentStore comments={} names={} nbytes={}>".format(len(self), len(self._names), self.nbytes)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __iter__(self) -> Generator:
+        for i in range(len(self)):
+            yield self._get(i)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[VODSimpleComment, list]:
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("CommentStore index out of range")
+        return self._get(index)
+
+    def _get(self, i: int) -> VODSimpleComment:
+        return VODSimpleComment(
+            timestamp=self._timestamps[self._timestamp_ends[i]:self._timestamp_ends[i + 1]].decode("ascii"),
+            posted_at=format_posted_at(self._offsets[i]),
+            name=self._names[self._name_codes[i]],
+            message=self._messages[self._message_ends[i]:self._message_ends[i + 1]].decode("utf-8"),
+        )
+
+    @property
+    def names(self) -> list:
+        """ The distinct user names, in order of their first comment. """
+        return list(self._names)
+
+    @property
+    def offsets(self) -> array:
+        """ The `posted_at` times of the comments in seconds. """
+        return self._offsets
+
+    @property
+    def nbytes(self) -> int:
+        """ The (approximate) amount of bytes the columns take up in memory. """
+
+        arrays = (self._offsets, self._name_codes, self._timestamp_ends, self._message_ends)
+        return (sum(len(a) * a.itemsize for a in arrays) + len(self._timestamps) + len(self._messages)
+                + sum(len(name) for name in self._names))
+
+    def append(self, timestamp: str, offset: int, name: str, message: str) -> None:
+        """ Adds a comment to the store.
+
+            :param timestamp: the timestamp of the comment
+            :param offset: when in the VOD the comment has been posted, in seconds
+            :param name: the name of the user who wrote the comment
+            :param message: the message body
+        """
+
+        self.extend(timestamps=(timestamp,), offsets=(offset,), names=(name,), messages=(message,))
+
+    def extend(self, timestamps: Iterable, offsets: Iterable, names: Iterable, messages: Iterable) -> None:
+        """ Adds a batch of comments to the store, column by column.
+
+            :param timestamps: the timestamps of the comments
+            :param offsets: when in the VOD the comments have been posted, in seconds
+            :param names: the names of the users who wrote the comments
+            :param messages: the message bodies
+        """
+
+        self._offsets.extend(offsets)
+
+        name_index, name_codes = self._name_index, self._name_codes
+        for name in names:
+            code = name_index.get(name)
+            if code is None:
+                code = name_index[name] = len(self._names)
+                self._names.append(name)
+            name_codes.append(code)
+
+        for strings, buffer, ends, encoding in ((timestamps, self._timestamps, self._timestamp_ends, "ascii"),
+                                                (messages, self._messages, self._message_ends, "utf-8")):
+            end = ends[-1]
+            for string in strings:
+                encoded = string.encode(encoding)
+                buffer += encoded
+                end += len(encoded)
+                ends.append(end)
+
+    def to_arrow(self):
+        """ Exports the comments as a `pyarrow.Table` (columns: timestamp, offset, posted_at, name, message).
+
+            :return: the pyarrow.Table
+            :raise ImportError: if `pyarrow` is not installed
+        """
+
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError("Exporting a CommentStore requires the 'pyarrow' package: pip install pyarrow")
+
+        # the buffers are copied, as the table would otherwise prevent the store from growing any further
+        length = len(self)
+        return pyarrow.table({
+            "timestamp": pyarrow.LargeStringArray.from_buffers(length, pyarrow.py_buffer(bytes(self._timestamp_ends)),
+                                                               pyarrow.py_buffer(bytes(self._timestamps))),
+            "offset": pyarrow.array(self._offsets, type=pyarrow.int64()),
+            "posted_at": pyarrow.array([format_posted_at(offset) for offset in self._offsets],
+                                       type=pyarrow.string()),
+            "name": pyarrow.DictionaryArray.from_arrays(pyarrow.array(self._name_codes, type=pyarrow.uint32()),
+                                                        pyarrow.array(self._names, type=pyarrow.string())),
+            "message": pyarrow.LargeStringArray.from_buffers(length, pyarrow.py_buffer(bytes(self._message_ends)),
+                                                             pyarrow.py_buffer(bytes(self._messages))),
+        })
+
+    def to_parquet(self, path: str, **kwargs) -> None:
+        """ Saves the comments as a Parquet file.
+
+            :param path: the path of the .parquet file
+            :param kwargs: passed on to `pyarrow.parquet.write_table()`
+            :raise ImportError: if `pyarrow` is not installed
+        """
+
+        table = self.to_arrow()
+
+        import pyarrow.parquet
+        pyarrow.parquet.write_table(table, str(path), **kwargs)
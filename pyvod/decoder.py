@@ -0,0 +1,119 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+
+Pluggable decoding of the JSON responses of the Twitch API.
+"""
+
+
+import json
+import threading
+
+
+# the available decoders, in order of preference
+DECODERS = ("orjson", "simdjson", "json")
+
+_decoder = None  # the name of the decoder in use, chosen on first use
+_loads = None
+_lean_simdjson = False  # whether or not `loads_lean()` uses simdjson
+_local = threading.local()  # the simdjson parsers are not thread-safe, so every thread gets its own
+
+
+def _import(name: str):
+    try:
+        if name == "orjson":
+            import orjson
+            return orjson
+        if name == "simdjson":
+            import simdjson
+            return simdjson
+    except ImportError:
+        return None
+    return json
+
+
+def set_json_decoder(name: str = None) -> str:
+    """ Sets the decoder used for the responses of the Twitch API.
+
+        :param name: "orjson", "simdjson" (the `pysimdjson` package) or "json" (the standard library).
+                     Pass `None` to use the fastest one installed, i.e. orjson for whole pages
+                     and simdjson for lean pages (see `loads_lean()`)
+        :return: the name of the decoder in use
+        :raise ValueError: if the decoder is unknown
+        :raise ImportError: if the decoder is not installed
+    """
+
+    global _decoder, _loads, _lean_simdjson
+
+    if name is None:
+        lean_simdjson = _import("simdjson") is not None
+        name = next(decoder for decoder in DECODERS if _import(decoder) is not None)
+    else:
+        lean_simdjson = name == "simdjson"
+    if name not in DECODERS:
+        raise ValueError("Unknown JSON decoder '{}'. Use one of: {}.".format(name, list(DECODERS)))
+
+    module = _import(name)
+    if module is None:
+        raise ImportError("The '{0}' JSON decoder requires the '{1}' package: pip install {1}"
+                          .format(name, "pysimdjson" if name == "simdjson" else name))
+
+    # only changed once the decoder is known to work, so a failed call keeps the previous decoder
+    _decoder, _loads, _lean_simdjson = name, module.loads, lean_simdjson
+    return name
+
+
+def get_json_decoder() -> str:
+    """ :return: the name of the decoder in use """
+
+    if _decoder is None:
+        set_json_decoder()
+    return _decoder
+
+
+def loads(data: bytes):
+    """ Decodes a JSON response.
+
+        :param data: the response body
+        :return: the decoded JSON
+    """
+
+    if _loads is None:
+        set_json_decoder()
+    return _loads(data)
+
+
+def loads_lean(data: bytes) -> dict:
+    """ Decodes a page of comments, but only the fields needed for the VODSimpleComment, i.e. `_id`, `created_at`,
+        `content_offset_seconds`, `commenter.display_name` and `message.body` (and `_next`).
+
+        This needs simdjson, which only decodes the fields which are accessed. With the other decoders,
+        the whole page is decoded (which is still faster than decoding and then throwing away most of it).
+
+        :param data: the response body
+        :return: the decoded page
+    """
+
+    if _loads is None:
+        set_json_decoder()
+    if not _lean_simdjson:
+        return _loads(data)
+
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        import simdjson
+        parser = _local.parser = simdjson.Parser()
+
+    document = parser.parse(data)
+    page = {"comments": [{
+        "_id": comment["_id"],
+        "created_at": comment["created_at"],
+        "content_offset_seconds": comment["content_offset_seconds"],
+        "commenter": {"display_name": comment["commenter"]["display_name"]},
+        "message": {"body": comment["message"]["body"]},
+    } for comment in document.get("comments") or ()]}
+    if "_next" in document:
+        page["_next"] = document["_next"]
+    del document  # the parser can only be reused once the document is gone
+    return page
@@ -0,0 +1,253 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+
+Metrics of the download pipeline (requests, pages, comments and the time spent in every stage), disabled by default.
+"""
+
+
+import json
+import threading
+import time
+
+
+# the CPU time of the current thread, so stages running in parallel threads are not counted twice
+# (time.thread_time() is only available from Python 3.7 on)
+_cpu_time = getattr(time, "thread_time", time.process_time)
+
+# the currently collecting Metrics, None if disabled
+active = None
+
+
+class _Stage:
+    """ Measures the wall-clock and CPU time of a stage, see `Metrics.stage()`. """
+
+    __slots__ = ("metrics", "name", "start", "start_cpu")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.start_cpu = _cpu_time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.metrics.record_stage(self.name, seconds=time.perf_counter() - self.start,
+                                  cpu_seconds=_cpu_time() - self.start_cpu)
+
+
+class _NoStage:
+    """ Does nothing, used while the metrics are disabled. """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+class Metrics:
+    """ Collects the metrics of the download pipeline, see `enable_metrics()`.
+
+        - `requests`: the amount of HTTP requests made (every retry is a request of its own), by status code
+        - `request_seconds` / `request_bytes`: the total latency and size of the responses,
+          with a histogram of the latency (`LATENCY_BUCKETS`)
+        - `retries`: the amount of retried requests
+        - `pages` / `comments`: the amount of pages and comments processed
+        - the wall-clock and CPU time spent in every stage of the pipeline:
+            - "metadata": getting the VOD information (`VOD._get_basic_data()`)
+            - "request": the HTTP requests
+            - "decode": decoding the JSON of the responses
+            - "clean": extracting the comment data out of the pages
+            - "write": writing the output files
+            - "get_comments" / "to_file": the whole `VODChat.get_comments()` / `VODChat.to_file()` calls
+
+          The stages overlap, e.g. "get_comments" includes the "request", "decode" and "clean" stages.
+
+        Hooks are called with every event as it happens: `hook(event, data)`, where `event` is either "request"
+        (url, status, seconds, bytes), "retry" (url, retry, status), "page" (vod_id, comments)
+        or "stage" (stage, seconds, cpu_seconds).
+    """
+
+    LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hooks = list()
+        self.reset()
+
+    def __repr__(self):
+        return "<Metrics requests={0} retries={1.retries!r} pages={1.pages!r} comments={1.comments!r}>"\
+            .format(sum(self.requests.values()), self)
+
+    def reset(self) -> None:
+        """ Sets every metric back to 0. """
+
+        with self._lock:
+            self.requests = dict()  # status code -> amount of requests
+            self.request_seconds = 0.0
+            self.request_bytes = 0
+            self.latency_buckets = [0] * len(self.LATENCY_BUCKETS)
+            self.retries = 0
+            self.pages = 0
+            self.comments = 0
+            self.stage_seconds = dict()
+            self.stage_cpu_seconds = dict()
+            self.stage_calls = dict()
+
+    def add_hook(self, hook) -> None:
+        """ Adds a callback, which is called with every event: `hook(event, data)`.
+
+            :param hook: the callback
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook) -> None:
+        self._hooks.remove(hook)
+
+    def _emit(self, event: str, data: dict) -> None:
+        for hook in self._hooks:
+            hook(event, data)
+
+    def stage(self, name: str) -> _Stage:
+        """ :return: a context manager measuring the time spent in the stage `name` """
+        return _Stage(self, name)
+
+    def record_request(self, url: str, status, seconds: float, nbytes: int) -> None:
+        with self._lock:
+            self.requests[status] = self.requests.get(status, 0) + 1
+            self.request_seconds += seconds
+            self.request_bytes += nbytes
+            for i, bound in enumerate(self.LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self.latency_buckets[i] += 1
+                    break
+        if self._hooks:
+            self._emit("request", dict(url=url, status=status, seconds=seconds, bytes=nbytes))
+
+    def record_retry(self, url: str, retry: int, status=None) -> None:
+        with self._lock:
+            self.retries += 1
+        if self._hooks:
+            self._emit("retry", dict(url=url, retry=retry, status=status))
+
+    def record_page(self, vod_id: str, comments: int) -> None:
+        with self._lock:
+            self.pages += 1
+            self.comments += comments
+        if self._hooks:
+            self._emit("page", dict(vod_id=vod_id, comments=comments))
+
+    def record_stage(self, name: str, seconds: float, cpu_seconds: float) -> None:
+        with self._lock:
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+            self.stage_cpu_seconds[name] = self.stage_cpu_seconds.get(name, 0.0) + cpu_seconds
+            self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+        if self._hooks:
+            self._emit("stage", dict(stage=name, seconds=seconds, cpu_seconds=cpu_seconds))
+
+    def to_dict(self) -> dict:
+        """ :return: every metric as a dict """
+
+        with self._lock:
+            requests = sum(self.requests.values())
+            return {
+                "requests": requests,
+                "requests_by_status": {str(status): amount for status, amount in self.requests.items()},
+                "request_seconds": self.request_seconds,
+                "request_seconds_avg": self.request_seconds / requests if requests else 0.0,
+                "request_bytes": self.request_bytes,
+                "retries": self.retries,
+                "pages": self.pages,
+                "comments": self.comments,
+                "stages": {name: {"seconds": self.stage_seconds[name], "cpu_seconds": self.stage_cpu_seconds[name],
+                                  "calls": self.stage_calls[name]} for name in self.stage_seconds},
+            }
+
+    def to_json(self, indent: int = 4) -> str:
+        """ :return: every metric as JSON """
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self, prefix: str = "pyvod") -> str:
+        """ :return: every metric in the Prometheus text exposition format """
+
+        lines = list()
+
+        def metric(name: str, kind: str, help_text: str, samples: list) -> None:
+            lines.append("# HELP {}_{} {}".format(prefix, name, help_text))
+            lines.append("# TYPE {}_{} {}".format(prefix, name, kind))
+            for suffix, labels, value in samples:
+                labels = "{" + ",".join('{}="{}"'.format(*label) for label in labels) + "}" if labels else ""
+                lines.append("{}_{}{}{} {}".format(prefix, name, suffix, labels, value))
+
+        with self._lock:
+            metric("requests_total", "counter", "HTTP requests made, by status code.",
+                   [("", [("status", status)], amount) for status, amount in sorted(self.requests.items(), key=str)])
+
+            cumulative, buckets = 0, list()
+            for bound, amount in zip(self.LATENCY_BUCKETS, self.latency_buckets):
+                cumulative += amount
+                buckets.append(("_bucket", [("le", bound)], cumulative))
+            buckets.append(("_bucket", [("le", "+Inf")], sum(self.requests.values())))
+            metric("request_duration_seconds", "histogram", "Latency of the HTTP requests.",
+                   buckets + [("_sum", [], self.request_seconds), ("_count", [], sum(self.requests.values()))])
+
+            metric("response_bytes_total", "counter", "Bytes received in HTTP responses.",
+                   [("", [], self.request_bytes)])
+            metric("retries_total", "counter", "Retried HTTP requests.", [("", [], self.retries)])
+            metric("pages_total", "counter", "Pages of comments processed.", [("", [], self.pages)])
+            metric("comments_total", "counter", "Comments processed.", [("", [], self.comments)])
+            metric("stage_seconds_total", "counter", "Wall-clock time spent per stage.",
+                   [("", [("stage", name)], seconds) for name, seconds in sorted(self.stage_seconds.items())])
+            metric("stage_cpu_seconds_total", "counter", "CPU time spent per stage.",
+                   [("", [("stage", name)], seconds) for name, seconds in sorted(self.stage_cpu_seconds.items())])
+
+        return "\n".join(lines) + "\n"
+
+    def save(self, path: str) -> None:
+        """ Saves the metrics, in the Prometheus text format if `path` ends with ".prom", otherwise as JSON.
+
+            :param path: the path of the file
+        """
+
+        with open(str(path), mode="w", encoding="utf-8") as file:
+            file.write(self.to_prometheus() if str(path).endswith(".prom") else self.to_json())
+
+
+def enable_metrics(metrics: Metrics = None) -> Metrics:
+    """ Starts collecting metrics of every download.
+
+        :param metrics: the Metrics to collect into. Pass `None` to create a new one
+        :return: the collecting Metrics
+    """
+
+    global active
+    active = metrics if metrics is not None else Metrics()
+    return active
+
+
+def disable_metrics() -> None:
+    """ Stops collecting metrics. """
+
+    global active
+    active = None
+
+
+def get_metrics() -> Metrics:
+    """ :return: the currently collecting Metrics, None if disabled """
+    return active
+
+
+def stage(name: str):
+    """ :return: a context manager measuring the time spent in the stage `name`, which does nothing if disabled """
+
+    metrics = active
+    return _NO_STAGE if metrics is None else _Stage(metrics, name)
@@ -0,0 +1,330 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+"""
+
+
+import json
+import mmap
+import os
+import pathlib
+import re
+import struct
+import sys
+from array import array
+from itertools import accumulate, chain
+from typing import Generator, Union
+
+from .vodcomment import VODSimpleComment
+from .utils import format_posted_at, get_offsets, get_strptime, parse_offset
+
+
+# the header of the index file: magic (incl. the byte order of the offsets), size and mtime of the indexed file,
+# the bucket size, the amount of comments and the amount of buckets
+_MAGIC = b"PYVODIX" + (b"L" if sys.byteorder == "little" else b"B")
+_HEADER = struct.Struct("=8sQqQQQ")
+
+# how much of the file is scanned at once when building the index
+_CHUNK_SIZE = 4 * 1024 * 1024
+
+# the "posted_at" of comments 10 hours or more into the VOD ("10:01:0", see `format_posted_at()`)
+# and of comments a day or more into the VOD ("1 day, ")
+_TRUNCATED = re.compile(r"(\d+):(\d\d):(\d)$")
+_DAYS = re.compile(r"(-?\d+) days?,")
+
+
+def _posted_at_seconds(posted_at: str) -> int:
+    """ Parses the "posted_at" of a comment back into seconds.
+
+        Offsets of 10 hours or more are only accurate to 10 seconds (a day or more: to the day),
+        as `format_posted_at()` cuts them off.
+    """
+
+    match = _TRUNCATED.match(posted_at)
+    if match:
+        return int(match.group(1)) * 3600 + int(match.group(2)) * 60 + int(match.group(3)) * 10
+    match = _DAYS.match(posted_at)
+    if match:
+        return int(match.group(1)) * 86400
+    hours, minutes, seconds = posted_at.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def _parse_chat_line(line: str) -> VODSimpleComment:
+    """ Parses a comment line of a .txt file written by `ChatTextWriter`, i.e. "{:<30} {:<10} {:<30} {}". """
+
+    end = line.index(" ")
+    timestamp = line[:end]
+    position = max(end, 30) + 1
+    posted_at = line[position:position + 10].rstrip(" ")  # may contain spaces itself ("1 day, ")
+    position += 11
+    end = line.index(" ", position)
+    name = line[position:end]
+    message = line[max(end, position + 30) + 1:]
+    if message.endswith("\r"):  # written on Windows
+        message = message[:-1]
+
+    if ":" not in posted_at and "day" not in posted_at:
+        raise ValueError("Not a comment: {!r}".format(line))
+    return VODSimpleComment(timestamp=timestamp, posted_at=posted_at, name=name, message=message)
+
+
+class ChatReader:
+    """ Reads the comments of a previously exported chat, i.e. the .txt or .jsonl file written by
+        `VODChat.to_file()`, without reading the whole file into memory.
+
+        The file is memory-mapped, together with a small index next to it (`<file>.idx`), which holds the
+        byte offset of every comment and the first comment of every `bucket_size` seconds of the VOD.
+        The index is built on first use and rebuilt whenever the file has changed since.
+        With it, comments can be accessed by their index (`reader[1000]`, `reader[1000:1100]`) or by time
+        (`between()`), and iterated lazily - every comment is only parsed once it is accessed.
+
+        The comments are yielded as VODSimpleComment instances. The time-based lookups expect the comments
+        to be in order of their `posted_at`, as written by `to_file()`.
+
+        Usage:
+
+            with ChatReader("VOD_111111111_CHAT.txt") as reader:
+                print(len(reader), reader[-1])
+                for comment in reader.between("1:30:00", "1:35:00"):
+                    print(comment)
+
+        :param path: the path of the uncompressed .txt or .jsonl file
+        :param bucket_size: the size of the time buckets of the index in seconds
+        :param created_at: only for .jsonl files, the `created_at` of the VOD (e.g. `VOD.vod_date`).
+                           If given, the `posted_at` of the comments is computed the same way as for the download,
+                           otherwise from their `content_offset_seconds`
+        :param rebuild: whether or not to rebuild the index, even if it is up-to-date
+        :raise ValueError: if the file is compressed, a .json or a .csv/.tsv file
+    """
+
+    def __init__(self, path: Union[pathlib.Path, str], bucket_size: int = 60, created_at: str = None,
+                 rebuild: bool = False):
+        self.path = pathlib.Path(path)
+        self.bucket_size = max(1, int(bucket_size))
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+
+        suffix = self.path.suffix.lower()
+        if suffix in (".gz", ".zst"):
+            raise ValueError("'{}' is compressed and can not be memory-mapped. Decompress it first.".format(path))
+        if suffix in (".csv", ".tsv"):
+            raise ValueError("'{}' is a .csv/.tsv file. Only .txt files (with the default columns) and .jsonl files "
+                             "are supported.".format(path))
+        if suffix == ".json":
+            raise ValueError("'{}' is a .json file, which can not be read comment by comment. "
+                             "Use the .jsonl raw format (to_file(raw_format='jsonl')) instead.".format(path))
+        self._jsonl = suffix == ".jsonl"
+        self._vod_datetime = get_strptime(datetime_string=created_at) if created_at else None
+
+        self._file = open(str(self.path), mode="rb")
+        stat = os.fstat(self._file.fileno())
+        self._source = (stat.st_size, stat.st_mtime_ns)
+        # mmap can not map empty files
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+
+        self._index_file = None
+        self._index_mm = None
+        if rebuild or not self._load_index():
+            self._build_index()
+
+    def __repr__(self):
+        return "<ChatReader path={0.path!r} comments={1}>".format(self, len(self))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        """ Unmaps and closes the file and its index. """
+
+        self._offsets = self._buckets = array("Q")
+        if self._index_mm is not None:
+            self._index_view.release()
+            self._index_mm.close()
+            self._index_file.close()
+            self._index_mm = None
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def _load_index(self) -> bool:
+        """ Memory-maps the index, if it exists and belongs to the current version of the file.
+
+            :return: whether or not the index has been loaded
+        """
+
+        try:
+            index_file = open(str(self.index_path), mode="rb")
+        except OSError:
+            return False
+
+        size = os.fstat(index_file.fileno()).st_size
+        header = index_file.read(_HEADER.size)
+        if len(header) == _HEADER.size:
+            magic, source_size, source_mtime, bucket_size, amount, buckets = _HEADER.unpack(header)
+            if (magic == _MAGIC and (source_size, source_mtime) == self._source and bucket_size == self.bucket_size
+                    and size == _HEADER.size + (amount + 1 + buckets) * 8):
+                self._index_file = index_file
+                self._index_mm = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._index_view = memoryview(self._index_mm)[_HEADER.size:].cast("Q")
+                self._offsets = self._index_view[:amount + 1]
+                self._buckets = self._index_view[amount + 1:]
+                return True
+
+        index_file.close()
+        return False
+
+    def _build_index(self) -> None:
+        """ Scans the file for the comments, finds the first comment of every bucket and saves the index.
+            If the index can not be saved (e.g. a read-only directory), it is only kept in memory.
+        """
+
+        mm = self._mm
+        if self._jsonl:
+            start = 0
+        else:
+            start = mm.find(b"\n") + 1 if len(mm) else 0  # the column names
+        self._offsets = offsets = self._scan_lines(start, stop_at_blank_line=not self._jsonl)
+
+        # the .txt file of a VOD without comments holds a note instead
+        if not self._jsonl and len(offsets) > 1:
+            try:
+                self._get(0)
+            except ValueError:
+                self._offsets = offsets = array("Q", offsets[:1])
+
+        buckets = array("Q")
+        amount = len(offsets) - 1
+        if amount:
+            last_bucket = max(0, self._time_of(amount - 1)) // self.bucket_size
+            index = 0
+            for bucket in range(last_bucket + 1):
+                index = self._search(bucket * self.bucket_size, index, amount)
+                buckets.append(index)
+        self._buckets = buckets
+
+        temp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            with open(str(temp_path), mode="wb") as file:
+                file.write(_HEADER.pack(_MAGIC, self._source[0], self._source[1], self.bucket_size, amount,
+                                        len(buckets)))
+                offsets.tofile(file)
+                buckets.tofile(file)
+            os.replace(str(temp_path), str(self.index_path))
+        except OSError:
+            return
+        self._load_index()
+
+    def _scan_lines(self, position: int, stop_at_blank_line: bool) -> array:
+        """ :return: the byte offsets of the lines from `position` on (and the end of the last one),
+                     up to the first blank line (the footer of a .txt file) if `stop_at_blank_line`.
+                     A last line without a line break (i.e. still being written) is left out.
+        """
+
+        mm, size = self._mm, len(self._mm)
+        offsets = array("Q")
+        chunk_size = _CHUNK_SIZE
+        while position < size:
+            chunk = mm[position:position + chunk_size]
+            if stop_at_blank_line:
+                if chunk[:1] in (b"\n", b"\r"):
+                    break
+                blank = min((found for found in (chunk.find(b"\n\n"), chunk.find(b"\n\r\n")) if found != -1),
+                            default=-1)
+                if blank != -1:
+                    chunk = chunk[:blank + 1]
+            end = chunk.rfind(b"\n")
+            if end == -1:
+                if position + chunk_size >= size:
+                    break
+                chunk_size *= 2  # a line longer than the chunk
+                continue
+
+            lines = chunk[:end].split(b"\n")
+            offsets.extend(accumulate(chain((position,), map((1).__add__, map(len, lines)))))
+            position = offsets.pop()
+            if stop_at_blank_line and blank != -1:
+                break
+        offsets.append(position)
+        return offsets
+
+    def _line(self, index: int) -> bytes:
+        return self._mm[self._offsets[index]:self._offsets[index + 1] - 1]
+
+    def _get(self, index: int) -> VODSimpleComment:
+        line = self._line(index)
+        if not self._jsonl:
+            return _parse_chat_line(line.decode("utf-8"))
+
+        comment = json.loads(line)
+        return VODSimpleComment(timestamp=comment["created_at"], posted_at=format_posted_at(self._time_of(index)),
+                                name=comment["commenter"]["display_name"], message=comment["message"]["body"])
+
+    def _time_of(self, index: int) -> int:
+        """ :return: the `posted_at` of a comment in seconds """
+
+        if not self._jsonl:
+            return _posted_at_seconds(self._get(index).posted_at)
+
+        comment = json.loads(self._line(index))
+        if self._vod_datetime is not None:
+            return get_offsets([comment["created_at"]], vod_datetime=self._vod_datetime)[0]
+        return int(comment["content_offset_seconds"])
+
+    def _search(self, seconds: float, low: int, high: int) -> int:
+        """ :return: the index of the first comment between `low` and `high` posted at or after `seconds` """
+
+        while low < high:
+            middle = (low + high) // 2
+            if self._time_of(middle) < seconds:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def __len__(self):
+        return len(self._offsets) - 1 if len(self._offsets) else 0
+
+    def __iter__(self) -> Generator:
+        for i in range(len(self)):
+            yield self._get(i)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[VODSimpleComment, list]:
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ChatReader index out of range")
+        return self._get(index)
+
+    def index_at(self, offset) -> int:
+        """ Looks up where in the chat a point in time of the VOD is, via the time buckets of the index.
+
+            :param offset: the time into the VOD, in seconds or as "[hours:]minutes:seconds"
+            :return: the index of the first comment posted at or after `offset` (`len(reader)` if there is none)
+        """
+
+        seconds = parse_offset(offset)
+        bucket = int(seconds // self.bucket_size)
+        if bucket >= len(self._buckets):
+            return len(self)
+        high = self._buckets[bucket + 1] if bucket + 1 < len(self._buckets) else len(self)
+        return self._search(seconds, self._buckets[bucket], high)
+
+    def between(self, start=None, end=None) -> Generator:
+        """ Lazily iterates over the comments of a time range of the VOD.
+
+            :param start: only the comments posted at or after `start` (seconds or "[hours:]minutes:seconds")
+            :param end: only the comments posted before `end` (seconds or "[hours:]minutes:seconds")
+            :return: a generator of VODSimpleComment instances
+        """
+
+        first = self.index_at(start) if start is not None else 0
+        last = self.index_at(end) if end is not None else len(self)
+        for i in range(first, last):
+            yield self._get(i)
@@ -0,0 +1,266 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+"""
+
+
+import hashlib
+import json
+import os
+import pathlib
+import time
+from typing import List, NamedTuple, Union
+
+from . import vod as _vod_module
+from .vod import VOD, _get_headers, _parse_basic_data
+from .client import TwitchClient, get_client
+from .writers import CHAT_WRITERS, COMPRESSIONS, RAW_WRITERS
+from .utils import validate_path
+
+
+class SyncResult(NamedTuple):
+    """ The result of a `ChannelSync.sync()`. """
+
+    listed: int  # the amount of VODs of the channel looked at
+    downloaded: list  # the VOD IDs downloaded
+    skipped: int  # the amount of VODs already archived
+    failed: dict  # VOD ID -> error of the VODs which failed
+
+
+def file_checksum(path: Union[pathlib.Path, str]) -> str:
+    """ :return: the SHA-256 checksum of a file, read in chunks """
+
+    checksum = hashlib.sha256()
+    with open(str(path), mode="rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+class ChannelSync:
+    """ Mirrors the chat of every VOD of a channel into a directory, incrementally.
+
+        A manifest (`CHANNEL_{channel_id}_MANIFEST.json`) keeps track of the archived VODs: their comment counts and
+        the size and SHA-256 checksum of every output file. A sync lists the VODs of the channel (newest first)
+        and only downloads the ones which are new or incomplete, i.e. not in the manifest, interrupted, still being
+        broadcast when they were downloaded, or with missing/changed files.
+
+        The listing stops at the first page with a VOD which has already been archived, so a sync without any
+        new VODs costs a single request. The information of the VODs (see `VOD`) is taken from the listing as well.
+
+        Usage:
+
+            sync = ChannelSync(channel_id="12826", dirpath="archive/")  # or ChannelSync.from_vod(VOD(vod_id), ...)
+            result = sync.sync()
+            print(result.downloaded, sync.manifest["vods"])
+
+        :param channel_id: the channel ID, see `VOD.channel_id`
+        :param dirpath: the path pointing to a directory in which the files (and the manifest) are saved
+        :param raw_format: the format of the raw data, see `VODChat.to_file()`
+        :param compression: the compression of the files, see `VODChat.to_file()`
+        :param chat_format: the format of the cleaned comments, see `VODChat.to_file()`
+        :param broadcast_type: the types of videos to sync: "archive" (past broadcasts), "highlight", "upload",
+                               or several of them separated by commas
+        :param client: the `TwitchClient` used for the requests. Defaults to the shared client (see `get_client()`)
+
+        :raises DirectoryDoesNotExistError | DirectoryIsAFileError: if either the path does not exist,
+                                                                    or the path points to a file
+    """
+
+    # the amount of VODs per request of the listing (the maximum of the API)
+    page_size = 100
+
+    def __init__(self, channel_id: str, dirpath: Union[pathlib.Path, str], raw_format: str = "json",
+                 compression: str = None, broadcast_type: str = "archive", client: TwitchClient = None,
+                 chat_format: str = "txt"):
+        if raw_format not in RAW_WRITERS:
+            raise ValueError("Unsupported raw_format '{}'. Use one of: {}.".format(raw_format, list(RAW_WRITERS)))
+        if chat_format not in CHAT_WRITERS:
+            raise ValueError("Unsupported chat_format '{}'. Use one of: {}.".format(chat_format, list(CHAT_WRITERS)))
+        if compression not in COMPRESSIONS:
+            raise ValueError("Unsupported compression '{}'. Use one of: {}.".format(compression, list(COMPRESSIONS)))
+
+        self.channel_id = str(channel_id)
+        self.dirpath = validate_path(provided_path=dirpath)
+        self.raw_format = raw_format
+        self.chat_format = chat_format
+        self.compression = compression
+        self.broadcast_type = broadcast_type
+        self.manifest_path = self.dirpath / "CHANNEL_{}_MANIFEST.json".format(self.channel_id)
+
+        self._client = client if client else get_client()
+        self.manifest = self._load_manifest()
+
+    @classmethod
+    def from_vod(cls, vod: VOD, dirpath: Union[pathlib.Path, str], **kwargs) -> "ChannelSync":
+        """ :return: the ChannelSync of the channel the VOD belongs to """
+        return cls(channel_id=vod.channel_id, dirpath=dirpath, client=vod._client, **kwargs)
+
+    def __repr__(self):
+        return "<ChannelSync channel_id={0.channel_id!r} dirpath={0.dirpath!r} vods={1}>"\
+            .format(self, len(self.manifest["vods"]))
+
+    def _load_manifest(self) -> dict:
+        if self.manifest_path.exists():
+            with self.manifest_path.open(mode="r", encoding="utf-8") as file:
+                return json.load(file)
+        return {"channel_id": self.channel_id, "vods": dict()}
+
+    def _save_manifest(self) -> None:
+        """ Saves the manifest, via a temporary file, so an interrupted sync never leaves a broken manifest. """
+
+        temp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with temp_path.open(mode="w", encoding="utf-8") as file:
+            json.dump(self.manifest, file, indent=4)
+        os.replace(str(temp_path), str(self.manifest_path))
+
+    def _file_names(self, vod_id: str) -> list:
+        """ :return: the names of the output files of a VOD, the same as `VODChat.to_file()` writes """
+
+        extension = COMPRESSIONS[self.compression]
+        return ["VOD_{}_CHAT.{}{}".format(vod_id, CHAT_WRITERS[self.chat_format][1], extension),
+                "VOD_{}_RAW.{}{}".format(vod_id, RAW_WRITERS[self.raw_format][1], extension)]
+
+    def is_complete(self, vod_id: str, verify: bool = False) -> bool:
+        """ Checks whether or not a VOD has been archived completely, i.e. it is in the manifest as complete,
+            and its files are still there with the same size (and the same checksum, if `verify` is set).
+
+            :param vod_id: the VOD ID
+            :param verify: whether or not to compare the checksums of the files, which reads them completely
+            :return: whether or not the VOD has been archived completely
+        """
+
+        entry = self.manifest["vods"].get(str(vod_id))
+        if not entry or entry.get("status") != "complete":
+            return False
+
+        for name, info in entry["files"].items():
+            path = self.dirpath / name
+            if not path.exists() or path.stat().st_size != info["size"]:
+                return False
+            if verify and file_checksum(path) != info["sha256"]:
+                return False
+        return True
+
+    def list_videos(self, full: bool = False) -> List[dict]:
+        """ Lists the VODs of the channel, newest first.
+
+            :param full: whether or not to list every VOD of the channel. Otherwise the listing stops
+                         at the first page containing a VOD which has already been archived completely
+            :return: the videos, as returned by the Twitch API
+            :raise TwitchApiException: if the Twitch API does not respond with status code 200
+        """
+
+        headers = _get_headers()
+        url = _vod_module.channel_videos_url.format(channel_id=self.channel_id)
+
+        videos = list()
+        offset = 0
+        while True:
+            response_body = self._client.get_json(url=url, headers=headers,
+                                                  params={"limit": self.page_size, "offset": offset,
+                                                          "broadcast_type": self.broadcast_type, "sort": "time"})
+            page = response_body.get("videos") or []
+            videos.extend(page)
+            offset += len(page)
+
+            if len(page) < self.page_size or offset >= response_body.get("_total", offset + 1):
+                break
+            if not full and any(self.is_complete(_video_id(video)) for video in page):
+                break
+
+        return videos
+
+    def pending(self, full: bool = False, verify: bool = False) -> List[dict]:
+        """ :return: the videos which are new or incomplete, oldest first (see `list_videos()` and `is_complete()`) """
+        return self._pending(self.list_videos(full=full), verify=verify)
+
+    def _pending(self, videos: List[dict], verify: bool) -> List[dict]:
+        return [video for video in reversed(videos) if not self.is_complete(_video_id(video), verify=verify)]
+
+    def sync(self, full: bool = False, verify: bool = False, limit: int = None, **to_file) -> SyncResult:
+        """ Downloads the VODs of the channel which are new or incomplete, oldest first,
+            and records them in the manifest.
+
+            A VOD which is still being broadcast is downloaded as far as it goes, but kept as incomplete,
+            so the next sync downloads it again. VODs which are (or were) still being broadcast are always
+            downloaded without the `ResponseCache` of the client.
+
+            :param full: whether or not to look at every VOD of the channel (see `list_videos()`), e.g. to
+                         re-download VODs whose files have been deleted
+            :param verify: whether or not to compare the checksums of the files of the archived VODs
+            :param limit: the maximum amount of VODs to download
+            :param to_file: any further arguments of `VODChat.to_file()`, e.g. `buffer_size` or `processes`
+            :return: the result of the sync
+            :raise TwitchApiException: if the listing of the VODs fails
+        """
+
+        videos = self.list_videos(full=full)
+        pending = self._pending(videos, verify=verify)
+        skipped = len(videos) - len(pending)
+        if limit is not None:
+            pending = pending[:limit]
+
+        downloaded, failed = list(), dict()
+        for video in pending:
+            vod_id = _video_id(video)
+            try:
+                self.download(video, **to_file)
+                downloaded.append(vod_id)
+            except Exception as e:  # one failing VOD should not stop the whole sync
+                failed[vod_id] = "{}: {}".format(type(e).__name__, e)
+
+        return SyncResult(listed=len(videos), downloaded=downloaded, skipped=skipped, failed=failed)
+
+    def download(self, video: Union[dict, str], **to_file) -> dict:
+        """ Downloads a VOD into the directory and records it in the manifest.
+
+            :param video: the video as returned by `list_videos()`, or a VOD ID
+            :param to_file: any further arguments of `VODChat.to_file()`
+            :return: the manifest entry of the VOD
+        """
+
+        vod = VOD(vod_id=_video_id(video) if isinstance(video, dict) else video, client=self._client)
+        if isinstance(video, dict):
+            try:  # saves the request of the VOD information
+                vod._set_basic_data(_parse_basic_data(video))
+            except (KeyError, TypeError, ValueError):
+                pass
+
+        # recorded as incomplete first, in case the sync is interrupted
+        entries = self.manifest["vods"]
+        previous = entries.get(vod.vod_id)
+        entries[vod.vod_id] = dict(previous or {}, status="incomplete")
+        self._save_manifest()
+
+        live = isinstance(video, dict) and video.get("status") == "recording"
+        vod_chat = vod.get_vodchat()
+        if live or (previous and previous.get("status") == "incomplete"):
+            vod_chat._cached = False  # the cached pages might be from while the VOD was still being broadcast
+
+        amount = vod_chat.to_file(dirpath=self.dirpath, stream=True, chat_format=self.chat_format,
+                                  raw_format=self.raw_format, compression=self.compression, **to_file)
+
+        files = dict()
+        for name in self._file_names(vod.vod_id):
+            path = self.dirpath / name
+            files[name] = {"size": path.stat().st_size, "sha256": file_checksum(path)}
+
+        entries[vod.vod_id] = {
+            "status": "incomplete" if live else "complete",
+            "comments": amount,
+            "title": vod.vod_title,
+            "created_at": vod.vod_date,
+            "length": vod.vod_length,
+            "files": files,
+            "synced_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        self._save_manifest()
+
+        return entries[vod.vod_id]
+
+
+def _video_id(video: dict) -> str:
+    """ :return: the VOD ID of a video of the listing (the v5 API prefixes them with a "v") """
+    return str(video["_id"]).lstrip("v")
@@ -6,7 +6,8 @@ Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
 
 
 import pathlib
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache
 
 from .exceptions import DirectoryDoesNotExistError, DirectoryIsAFileError
 
@@ -49,3 +50,125 @@ def get_strptime(datetime_string: str) -> datetime:
         return datetime.strptime(datetime_string, "%Y-%m-%dT%H:%M:%S.%fZ")
     else:
         return datetime.strptime(datetime_string, "%Y-%m-%dT%H:%M:%SZ")
+
+
+# the reference point for the (naive) datetimes, so we can do plain integer arithmetic on them
+_EPOCH = datetime(1970, 1, 1)
+
+# "YYYY-MM-DDTHH:MM" -> seconds since _EPOCH, as the comments of a VOD only span a few distinct minutes
+_minute_cache = dict()
+
+
+def _minute_seconds(minute_prefix: str) -> int:
+    """ Helper function which gets the seconds since _EPOCH for a "YYYY-MM-DDTHH:MM" timestamp prefix (cached). """
+
+    seconds = _minute_cache.get(minute_prefix)
+    if seconds is None:
+        if len(_minute_cache) > 65536:
+            _minute_cache.clear()
+        delta = datetime(int(minute_prefix[0:4]), int(minute_prefix[5:7]), int(minute_prefix[8:10]),
+                         int(minute_prefix[11:13]), int(minute_prefix[14:16])) - _EPOCH
+        seconds = _minute_cache[minute_prefix] = delta.days * 86400 + delta.seconds
+    return seconds
+
+
+def get_epoch_microseconds(datetime_string: str) -> int:
+    """ Helper function which parses a timestamp in Twitch's fixed ISO format ("YYYY-MM-DDTHH:MM:SS[.ffffff...]Z")
+        directly into microseconds since 1970-01-01, without going through `datetime.strptime`.
+
+        Timestamps not in the expected format are handed to `get_strptime()`.
+
+        :param datetime_string: the string to parse
+        :return: the microseconds since 1970-01-01
+    """
+
+    try:
+        if datetime_string[19] == "Z":
+            microsecond = 0
+        elif datetime_string[19] == "." and datetime_string[-1] == "Z":
+            # only the first 6 digits are relevant, the same as for `get_strptime()`
+            microsecond = int(datetime_string[20:26].ljust(6, "0"))
+        else:
+            raise ValueError(datetime_string)
+        return (_minute_seconds(datetime_string[:16]) + int(datetime_string[17:19])) * 1000000 + microsecond
+    except (IndexError, ValueError):
+        delta = get_strptime(datetime_string=datetime_string) - _EPOCH
+        return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def get_offsets(datetime_strings: list, vod_datetime: datetime) -> list:
+    """ Helper function which gets the offsets of a whole batch of timestamps in relation to the start of the VOD.
+
+        The offsets are the full seconds (rounded down) between the start of the VOD and each timestamp,
+        the same as `(get_strptime(datetime_string) - vod_datetime)` would result in (minus the microseconds).
+
+        :param datetime_strings: the timestamps, e.g. the "created_at" of every comment of a page
+        :param vod_datetime: the time when the livestream happened
+        :return: the offsets in seconds
+    """
+
+    delta = vod_datetime - _EPOCH
+    vod_seconds, vod_microsecond = delta.days * 86400 + delta.seconds, delta.microseconds
+
+    offsets = []
+    append = offsets.append
+    minute_cache = _minute_cache
+    for datetime_string in datetime_strings:
+        seconds = minute_cache.get(datetime_string[:16])
+        if seconds is not None and len(datetime_string) >= 20:
+            # fast path for the most common case: a known minute and either no or up to 6 microsecond digits
+            if datetime_string[19] == "Z":
+                microsecond = 0
+            elif datetime_string[19] == "." and datetime_string[-1] == "Z":
+                fraction = datetime_string[20:26].rstrip("Z")
+                microsecond = int(fraction) * 10 ** (6 - len(fraction)) if fraction else -1
+            else:
+                microsecond = -1
+            if microsecond >= 0:
+                seconds += int(datetime_string[17:19]) - vod_seconds
+                append(seconds if microsecond >= vod_microsecond else seconds - 1)
+                continue
+
+        append((get_epoch_microseconds(datetime_string) - vod_seconds * 1000000 - vod_microsecond) // 1000000)
+
+    return offsets
+
+
+@lru_cache(maxsize=65536)
+def format_posted_at(seconds: int) -> str:
+    """ Helper function which formats a offset in seconds into the "posted_at" format of a comment.
+
+        The result is the same as `str(timedelta)[:7]`, i.e. "hours:minutes:seconds" for offsets below 10 hours.
+
+        :param seconds: the offset in seconds
+        :return: the formatted offset
+    """
+
+    if 0 <= seconds < 36000:
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return "{}:{:02}:{:02}".format(hours, minutes, seconds)
+    return str(timedelta(seconds=seconds))[:7]
+
+
+def parse_offset(offset) -> float:
+    """ Helper function which parses a offset into the VOD, given either in seconds or as "[hours:]minutes:seconds".
+
+        :param offset: the offset, e.g. 5520, "92:00" or "1:32:00"
+        :return: the offset in seconds
+        :raise ValueError: if the offset is negative or not in one of the above formats
+    """
+
+    if isinstance(offset, str):
+        parts = offset.strip().split(":")
+        if len(parts) > 3 or not all(part.strip() for part in parts):
+            raise ValueError("Invalid offset '{}'. Use seconds or '[hours:]minutes:seconds'.".format(offset))
+        seconds = 0.0
+        for part in parts:
+            seconds = seconds * 60 + float(part)
+    else:
+        seconds = float(offset)
+
+    if seconds < 0:
+        raise ValueError("Invalid offset '{}'. The offset can not be negative.".format(offset))
+    return seconds
@@ -6,27 +6,116 @@ Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
 
 
 import os
+import threading
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List
 
-import requests
-import dotenv
-
+from . import vodchat as _vodchat_module
 from .vodchat import VODChat
-from .exceptions import TwitchApiException
-
+from .client import TwitchClient, get_client
+from . import metrics as _metrics
 
-# check for a .env file and get the "twitch-client-id" which we need to identify the application for use with the API
-# this is NOT the same as the Client-Secret, which we do not need here
-# if there is no such Client-ID or it is empty, we use a default Client-ID
-dotenv.load_dotenv()
-_client_id = os.getenv("twitch-client-id")
-_client_id = _client_id if _client_id else "r52h1i1phlvyxs0sdi3ooam1b3w62g"
 
-# needed request headers
-_headers = {"client-id": _client_id, "accept": "application/vnd.twitchtv.v5+json"}
+# needed request headers, see `_get_headers()`
+_client_id = None
+_headers = None
 
 # additional API url
 vod_url = "https://api.twitch.tv/v5/videos/{vod_id}"
+channel_videos_url = "https://api.twitch.tv/v5/channels/{channel_id}/videos"
+_api_base_url_set = False  # whether or not `set_api_base_url()` has been called
+
+# the threads fetching the basic information of VODs in the background, see `VOD.prefetch()`
+_prefetch_workers = 10
+_executor = None
+_lock = threading.Lock()
+
+
+def _get_headers() -> dict:
+    """ Gets the needed request headers. The .env file is only loaded on first use, not when importing pyvod.
+
+        :return: the request headers
+    """
+
+    global _client_id, _headers
+    with _lock:
+        if _headers is None:
+            # check for a .env file and get the "twitch-client-id" which we need to identify the application
+            # for use with the API. This is NOT the same as the Client-Secret, which we do not need here
+            # if there is no such Client-ID or it is empty, we use a default Client-ID
+            import dotenv
+            dotenv.load_dotenv()
+            _client_id = os.getenv("twitch-client-id")
+            _client_id = _client_id if _client_id else "r52h1i1phlvyxs0sdi3ooam1b3w62g"
+
+            if os.getenv("twitch-api-base-url") and not _api_base_url_set:
+                set_api_base_url(os.getenv("twitch-api-base-url"))
+
+            _headers = {"client-id": _client_id, "accept": "application/vnd.twitchtv.v5+json"}
+        return _headers
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_prefetch_workers)
+        return _executor
+
+
+def set_api_base_url(url: str) -> None:
+    """ Changes the base url of the Twitch API used for all requests, e.g. to point pyvod at a local mock server.
+
+        Can also be set via the "twitch-api-base-url" env-variable (or inside the .env file).
+        Only affects VODs created afterwards.
+
+        :param url: the base url, defaults to "https://api.twitch.tv/v5"
+    """
+
+    global vod_url, channel_videos_url, _api_base_url_set
+    _api_base_url_set = True
+    url = url.rstrip("/")
+    vod_url = url + "/videos/{vod_id}"
+    channel_videos_url = url + "/channels/{channel_id}/videos"
+    _vodchat_module.base_url = url + "/videos/{}/comments"
+
+
+# basic information in regards to the VOD and the channel associated with the VOD
+BasicData = namedtuple("BasicData", "title views created_at game vod_length "
+                                    "channel_name channel_id channel_date "
+                                    "channel_views channel_followers channel_type"
+                       )
+
+
+def _parse_basic_data(response_body: dict) -> BasicData:
+    """ Parses the needed basic information out of the response of the videos endpoint.
+
+        :param response_body: the request response .json()
+        :return: the basic data as a `namedtuple`
+    """
+
+    data = BasicData(
+        response_body["title"],                       # VOD title
+        response_body["views"],                       # VOD views
+        response_body["created_at"],                  # VOD stream date
+        response_body["game"],                        # what game has been streamed
+        response_body["length"],                      # VOD length in seconds (seconds / 3600 = hours)
+        response_body["channel"]["display_name"],     # channel name (streamer name)
+        response_body["channel"]["_id"],              # channel ID
+        response_body["channel"]["created_at"],       # channel creation date
+        response_body["channel"]["views"],            # total channel views
+        response_body["channel"]["followers"],        # total channel followers
+        response_body["channel"]["broadcaster_type"]  # broadcaster type (i.e. partner or affiliate, etc.)
+    )
+    data = data._replace(vod_length=round(float(data.vod_length) / 3600, 2))
+
+    return data
+
+
+def _basic_data_attribute(field: str) -> property:
+    """ :return: a read-only attribute of the VOD, returning the `field` of its basic data """
+    return property(lambda self: getattr(self._basic_data, field))
 
 
 class VOD:
@@ -35,6 +124,9 @@ class VOD:
         The main entry point, responsible for getting the VODChat via `get_videochat()`
         as well as some basic information about the VOD itself and the channel the VOD belongs to (see below).
 
+        Creating a instance does not make any requests. The basic information is fetched on first access
+        of any of the attributes below (or in the background, see `prefetch()` and `get_vodchat()`).
+
         Additional Class Attributes
         -----
 
@@ -60,23 +152,69 @@ class VOD:
                 whether the channel is partnered or a affiliate
 
         :param vod_id: the VOD ID to fetch the information for
+        :param client: the `TwitchClient` used for the requests. Defaults to the shared client (see `get_client()`)
     """
 
-    def __init__(self, vod_id):
+    vod_title = _basic_data_attribute("title")
+    vod_length = _basic_data_attribute("vod_length")
+    vod_date = _basic_data_attribute("created_at")
+    vod_game = _basic_data_attribute("game")
+    vod_views = _basic_data_attribute("views")
+    channel = _basic_data_attribute("channel_name")
+    channel_id = _basic_data_attribute("channel_id")
+    channel_views = _basic_data_attribute("channel_views")
+    channel_followers = _basic_data_attribute("channel_followers")
+    channel_broadcaster_type = _basic_data_attribute("channel_type")
+
+    def __init__(self, vod_id, client: TwitchClient = None):
         self.vod_id = str(vod_id)
 
-        self._basic_data = self._get_basic_data()
+        self._client = client if client else get_client()
+
+        self._data = None  # the basic data, None until fetched
+        self._pending = None  # the Future of the basic data while it is fetched in the background
+
+    @classmethod
+    def prefetch(cls, vod_ids: Iterable, client: TwitchClient = None) -> List["VOD"]:
+        """ Creates a VOD for every VOD ID and fetches their basic information concurrently in the background,
+            instead of one after another on first access.
+
+            Accessing the attributes of a VOD waits for its basic information (if still being fetched)
+            and raises the exception of the request, if it failed.
+
+            :param vod_ids: the VOD IDs
+            :param client: the `TwitchClient` used for the requests
+            :return: the VODs, in the order of `vod_ids`
+        """
+
+        vods = [cls(vod_id=vod_id, client=client) for vod_id in vod_ids]
+        for vod in vods:
+            vod._fetch_in_background()
 
-        self.vod_title = self._basic_data.title
-        self.vod_length = self._basic_data.vod_length
-        self.vod_date = self._basic_data.created_at
-        self.vod_game = self._basic_data.game
-        self.vod_views = self._basic_data.views
-        self.channel = self._basic_data.channel_name
-        self.channel_id = self._basic_data.channel_id
-        self.channel_views = self._basic_data.channel_views
-        self.channel_followers = self._basic_data.channel_followers
-        self.channel_broadcaster_type = self._basic_data.channel_type
+        return vods
+
+    def _fetch_in_background(self) -> None:
+        """ Starts fetching the basic data on a background thread, if not already fetched (or being fetched). """
+
+        if self._data is None and self._pending is None:
+            self._pending = _get_executor().submit(self._get_basic_data)
+
+    @property
+    def _basic_data(self) -> BasicData:
+        """ The basic information about the VOD and its channel, fetched on first access. """
+
+        if self._data is None:
+            pending = self._pending
+            self._set_basic_data(pending.result() if pending is not None else self._get_basic_data())
+        return self._data
+
+    def _set_basic_data(self, data: BasicData) -> None:
+        """ Sets the basic information about the VOD and its channel.
+
+            :param data: the basic data as returned by `_get_basic_data()`
+        """
+
+        self._data = data
 
     def __repr__(self):
         return "<VOD vod_title={0.vod_title!r} vod_length={0.vod_length!r} vod_date={0.vod_date!r} " \
@@ -85,48 +223,32 @@ class VOD:
                "channel_followers={0.channel_followers!r} channel_broadcaster_type={0.channel_broadcaster_type!r}>"\
             .format(self)
 
-    def _get_basic_data(self) -> namedtuple:
+    def _get_basic_data(self) -> BasicData:
         """ Gets some basic information in regards to the VOD and the channel associated with the VOD.
 
             :return: the basic data as a `namedtuple`
+            :raise TwitchApiException: if the Twitch API does not respond with status code 200
         """
 
-        response = requests.get(url=vod_url.format(vod_id=self.vod_id), headers=_headers)
-        response_body = response.json()
-
-        if response.status_code != 200:
-            msg_from_twitch = response_body["message"]
-            raise TwitchApiException(
-                "Twitch API responded with '{1}' (status code {0}). Expected 200 (OK)."
-                .format(response.status_code, msg_from_twitch)
-            )
-
-        BasicData = namedtuple("BasicData", "title views created_at game vod_length "
-                                            "channel_name channel_id channel_date "
-                                            "channel_views channel_followers channel_type"
-                               )
-        data = BasicData(
-            response_body["title"],                       # VOD title
-            response_body["views"],                       # VOD views
-            response_body["created_at"],                  # VOD stream date
-            response_body["game"],                        # what game has been streamed
-            response_body["length"],                      # VOD length in seconds (seconds / 3600 = hours)
-            response_body["channel"]["display_name"],     # channel name (streamer name)
-            response_body["channel"]["_id"],              # channel ID
-            response_body["channel"]["created_at"],       # channel creation date
-            response_body["channel"]["views"],            # total channel views
-            response_body["channel"]["followers"],        # total channel followers
-            response_body["channel"]["broadcaster_type"]  # broadcaster type (i.e. partner or affiliate, etc.)
-        )
-        data = data._replace(vod_length=round(float(data.vod_length) / 3600, 2))
-
-        return data
+        with _metrics.stage("metadata"):
+            headers = _get_headers()
+            response_body = self._client.get_json(url=vod_url.format(vod_id=self.vod_id), headers=headers,
+                                                  cache_key=("videos", self.vod_id, ""))
+
+            return _parse_basic_data(response_body)
 
     def get_vodchat(self) -> VODChat:
         """ Gets the VODChat associated with the `vod_id`.
 
+            Does not wait for the basic information of the VOD. If not fetched yet, it is fetched in the background,
+            while the VODChat already requests the first comments.
+
             :return: the VODChat
         """
-        vod_chat = VODChat(vod_id=self.vod_id, _basic_vod_data=self._basic_data, _headers=_headers)
+
+        headers = _get_headers()
+        self._fetch_in_background()
+        vod_chat = VODChat(vod_id=self.vod_id, _basic_vod_data=self._data if self._data is not None else self._pending,
+                           _headers=headers, _client=self._client)
 
         return vod_chat
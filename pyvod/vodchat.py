@@ -6,20 +6,76 @@ Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
 
 
 import os
-from typing import Generator, Union
-import json
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Generator, Sequence, Union
 
-import requests
 import pathlib
 
 from .vodcomment import VODSimpleComment
-from .utils import validate_path, get_strptime
-from .exceptions import TwitchApiException
+from .commentstore import CommentStore
+from .checkpoint import Checkpoint
+from .utils import validate_path, get_strptime, get_offsets, format_posted_at, parse_offset
+from .client import TwitchClient, get_client
+from .writers import CHAT_WRITERS, RAW_WRITERS, COMPRESSIONS, DEFAULT_BUFFER_SIZE
+from . import metrics as _metrics
+from . import decoder
 
 
 # request base url
 base_url = "https://api.twitch.tv/v5/videos/{}/comments"  # videos/979245105/comments for example
 
+# the value of the "_next" key, i.e. the cursor, see `_find_cursor()`
+_next_value = re.compile(rb'\s*:\s*"([^"\\]*)"')
+
+
+def _find_cursor(content: bytes) -> Union[str, None]:
+    """ Finds the `_next` cursor in a page of comments, without decoding the JSON.
+
+        :param content: the response body
+        :return: the cursor, or None if it is the last page
+    """
+
+    end = len(content)
+    while True:
+        index = content.rfind(b'"_next"', 0, end)
+        if index < 0:
+            return None
+        match = _next_value.match(content, index + len(b'"_next"'))
+        if match and content[index - 1:index] != b"\\":  # and not part of a message, where the quotes are escaped
+            return match.group(1).decode("utf-8") or None
+        end = index
+
+
+def _clean_in_process(page: Union[bytes, dict], vod_datetime: datetime, clean, lean: bool, keep_page: bool,
+                      start: float = None, end: float = None) -> tuple:
+    """ Decodes and cleans a page of comments in a worker process, see `VODChat._iter_pipelined_pages()`.
+
+        :param page: the response body, or the already decoded page (e.g. from the `ResponseCache`)
+        :param vod_datetime: the time when the livestream happened
+        :param clean: the function used to clean the page, i.e. `VODChat._clean_page` or `VODChat._page_columns`
+        :param lean: whether or not only the fields needed for the cleaned comments should be decoded
+        :param keep_page: whether or not the decoded page is sent back as well
+        :param start: the offset (in seconds into the VOD) the time window starts at
+        :param end: the offset (in seconds into the VOD) the time window ends at (exclusive)
+        :return: the decoded page (None if not `keep_page`), the amount of comments in it, the cleaned comments
+                 and whether or not the page already reached past the end of the window
+    """
+
+    _json_body = page if isinstance(page, dict) else decoder.loads_lean(page) if lean else decoder.loads(page)
+
+    outside_window = False
+    if start or end is not None:
+        _json_body, outside_window = VODChat._filter_window(_json_body, start=start, end=end)
+
+    return (_json_body if keep_page else None, len(_json_body["comments"]),
+            clean(_json_body, vod_datetime=vod_datetime), outside_window)
+
 
 class VODChat:
     """ A class which represents the VOD stream chat. We store here both the 'raw comment' data (i.e. the JSON)
@@ -38,16 +94,23 @@ class VODChat:
                 the raw comments in JSON
         - `url`:
                 the base url for the VOD requests
+        - `pages_fetched` / `comments_fetched`:
+                how many pages and comments have been fetched so far
 
         :param vod_id: the VOD ID to fetch the information for
     """
 
-    def __init__(self, vod_id: str, _basic_vod_data, _headers):
+    # how many pages every shard of a sharded download fetches ahead of the merged pages, see `_iter_sharded_pages()`
+    shard_buffer = 50
+
+    def __init__(self, vod_id: str, _basic_vod_data, _headers, _client: TwitchClient = None):
         self.vod_id = vod_id
 
-        self._basic_data = _basic_vod_data
+        # the basic data of the VOD, or the Future of it while it is still being fetched (see `VOD.get_vodchat()`)
+        self._basic_vod_data = _basic_vod_data
 
         self._headers = _headers
+        self._client = _client if _client else get_client()
 
         self.vod_comments = list()  # the cleaned comments
         self.raw_comments = dict()  # the comments in still raw form (JSON)
@@ -58,9 +121,30 @@ class VODChat:
         # a flag we set if the first request response contains an empty "comments" list value
         self._no_first_comments_response = False
 
+        # whether or not only the fields needed for the cleaned comments are decoded, see `_extract_comments()`
+        self._lean = False
+
+        # whether or not the responses may come from the `ResponseCache` (if the client has one)
+        self._cached = True
+
+        # set to stop following a live broadcast, see `stop_following()`
+        self._stop_following = threading.Event()
+
+        # the progress of the download, e.g. for progress reports while the download is running
+        self.pages_fetched = 0
+        self.comments_fetched = 0
+
     def __repr__(self):
         return "<VODChat vod_id={0.vod_id!r} vod_comments={0.vod_comments!r} url={0.url!r}>".format(self)
 
+    @property
+    def _basic_data(self):
+        """ The basic data of the VOD, waiting for it if it is still being fetched. """
+
+        if isinstance(self._basic_vod_data, Future):
+            self._basic_vod_data = self._basic_vod_data.result()
+        return self._basic_vod_data
+
     @property
     def comments(self) -> list:
         return self.vod_comments
@@ -69,165 +153,737 @@ class VODChat:
     def raw(self) -> dict:
         return self.raw_comments
 
-    def _extract_comments(self) -> Generator:
+    def _request_page(self, params: dict, cached: bool = True) -> dict:
+        """ Makes a single request against the comments endpoint of the VOD.
+
+            :param params: the request parameters, i.e. either the `cursor` or the `content_offset_seconds`
+            :param cached: whether or not the response may come from the `ResponseCache` (if the client has one)
+            :return: the request response .json()
+            :raise TwitchApiException: if the Twitch API does not respond with status code 200
+        """
+
+        return self._client.get_json(url=self.url, headers=self._headers, params=params, lean=self._lean,
+                                     cache_key=self._cache_key(params) if cached and self._cached else None)
+
+    def _cache_key(self, params: dict) -> tuple:
+        """ Gets the key of a comment page for the `ResponseCache`, i.e. (endpoint, vod_id, cursor). """
+
+        if "cursor" in params:
+            return "comments", self.vod_id, params["cursor"]
+        return "comments", self.vod_id, "offset:{}".format(params["content_offset_seconds"])
+
+    @staticmethod
+    def _filter_window(_json_body: dict, start: float = None, end: float = None) -> tuple:
+        """ Drops every comment of a page which is not inside the given time window.
+
+            :param _json_body: the request response .json()
+            :param start: the offset (in seconds into the VOD) the window starts at
+            :param end: the offset (in seconds into the VOD) the window ends at (exclusive)
+            :return: the (shallow) copied page with the remaining comments,
+                     and whether or not the page already reached past the end of the window
+        """
+
+        comments = _json_body["comments"]
+        kept = [comment for comment in comments
+                if (not start or comment["content_offset_seconds"] >= start)
+                and (end is None or comment["content_offset_seconds"] < end)]
+        outside_window = end is not None and bool(comments) and comments[-1]["content_offset_seconds"] >= end
+        if len(kept) != len(comments):
+            _json_body = dict(_json_body, comments=kept)
+
+        return _json_body, outside_window
+
+    def _iter_pages(self, start: float = None, end: float = None, cursor: str = "") -> Generator:
+        """ Paginates through the comments of the VOD, page by page, via the `_next` cursor.
+
+            If `start` is given, the first request is seeded with the `content_offset_seconds` parameter instead of
+            a cursor, and every comment posted before `start` is dropped.
+            If `end` is given, the pagination stops as soon as a comment posted at or after `end` is returned.
+            Pages which had comments dropped are yielded as a (shallow) copy of the response with the remaining ones.
+
+            :param start: the offset (in seconds into the VOD) to start from
+            :param end: the offset (in seconds into the VOD) to stop at (exclusive)
+            :param cursor: the `_next` cursor to continue from, e.g. when resuming a download
+            :return: Generator: yields the request responses .json()
+        """
+
+        # for our first request, we don't have a _next cursor, so we either seed it with the offset or an empty string
+        params = {"content_offset_seconds": start} if start else {"cursor": cursor}
+        while True:
+            _json_body = self._request_page(params=params)
+
+            _next = _json_body.get("_next", 0)  # get the key, if not found default to 0
+
+            if start or end is not None:
+                _json_body, outside_window = self._filter_window(_json_body, start=start, end=end)
+                if outside_window:
+                    _next = 0  # everything after this page is outside of the window
+                if not _json_body["comments"] and _next != 0:
+                    # nothing of this page is inside the window, but the following pages might be
+                    params = {"cursor": _next}
+                    continue
+
+            yield _json_body
+
+            if _next == 0:  # if there are no more chat comments to fetch, we are done
+                break
+
+            # make new request with the _next cursor, so we can get the next comments payload
+            params = {"cursor": _next}
+
+    def _iter_live_pages(self, interval: float, timeout: float = None, start: float = None,
+                         end: float = None) -> Generator:
+        """ Paginates through the comments of a VOD of a broadcast which is still live, and keeps on polling for new ones.
+
+            Once the last page is reached, the same page (i.e. the last cursor, or offset) is requested again every
+            `interval` seconds. Comments of it which have already been yielded (by their `_id`) are dropped,
+            and as soon as the page is full, the pagination continues with the `_next` cursor.
+            Pages without new comments are not yielded. The responses are never taken from the `ResponseCache`.
+
+            :param interval: the time in seconds between two polls
+            :param timeout: stop once no new comments have been returned for this many seconds.
+                            None means the polling goes on until the generator is closed (or `stop_following()`)
+            :param start: the offset (in seconds into the VOD) to start from
+            :param end: the offset (in seconds into the VOD) to stop at (exclusive)
+            :return: Generator: yields the request responses .json() with the new comments only
+        """
+
+        params = {"content_offset_seconds": start} if start else {"cursor": ""}
+        seen = set()  # the _ids of the comments of the current page which have already been yielded
+        last_comment = time.monotonic()
+        while True:
+            _json_body = self._request_page(params=params, cached=False)
+            _next = _json_body.get("_next")
+
+            comments = [comment for comment in _json_body["comments"] if comment["_id"] not in seen]
+            seen.update(comment["_id"] for comment in comments)
+            if len(comments) != len(_json_body["comments"]):
+                _json_body = dict(_json_body, comments=comments)
+
+            outside_window = False
+            if start or end is not None:
+                _json_body, outside_window = self._filter_window(_json_body, start=start, end=end)
+
+            if _json_body["comments"]:
+                last_comment = time.monotonic()
+                yield _json_body
+            if outside_window:  # everything after this page is outside of the window
+                return
+
+            if _next:
+                params = {"cursor": _next}
+                seen = set()
+                continue
+
+            # we are at the end of what has been broadcast so far, so we poll the same page again
+            if timeout is not None and time.monotonic() - last_comment >= timeout:
+                return
+            if self._stop_following.wait(interval):
+                self._stop_following.clear()
+                return
+
+    def _iter_sharded_pages(self, shards: int, start: float = None, end: float = None,
+                            buffer: int = None) -> Generator:
+        """ Splits the VOD length into `shards` time windows and paginates every window on its own worker thread.
+
+            The pages of every window are handed over through a bounded queue, and merged back in order,
+            so the result is the same as paginating the VOD from start to end. Comments which are returned
+            by two neighbouring windows are only yielded once (by their `_id`).
+
+            :param shards: the amount of time windows (and worker threads) to use
+            :param start: only split the part of the VOD from `start` seconds on
+            :param end: only split the part of the VOD up to `end` seconds
+            :param buffer: how many pages every window fetches ahead of the merged pages, so the memory usage
+                           stays flat (defaults to `shard_buffer`). 0 means unbounded, i.e. every window is fetched
+                           as fast as possible, no matter how far the merged pages are behind
+            :return: Generator: yields the request responses .json()
+        """
+
+        first = start or 0
+        last = end if end is not None else float(self._basic_data.vod_length) * 3600  # vod_length is in hours
+        bounds = [first + (last - first) * i / shards for i in range(shards)]
+        bounds.append(end)  # the last window is open ended, unless a end is given
+        windows = list(zip(bounds[:-1], bounds[1:]))
+
+        buffer = self.shard_buffer if buffer is None else buffer
+        queues = [queue.Queue(maxsize=buffer) for _ in windows]
+        stop = threading.Event()
+
+        def put(pages: queue.Queue, item) -> None:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def fetch(window: tuple, pages: queue.Queue) -> None:
+            try:
+                for _json_body in self._iter_pages(*window):
+                    put(pages, _json_body)
+                    if stop.is_set():  # the generator has been closed
+                        return
+            except BaseException as e:  # raised again in the generator
+                put(pages, e)
+            put(pages, None)
+
+        with ThreadPoolExecutor(max_workers=shards) as executor:
+            for window, pages in zip(windows, queues):
+                executor.submit(fetch, window, pages)
+
+            try:
+                found = False
+                empty_page = None
+                previous_ids = set()  # the _ids of the last page of the previous window
+                for pages in queues:
+                    last_ids = previous_ids
+                    for _json_body in iter(pages.get, None):
+                        if isinstance(_json_body, BaseException):
+                            raise _json_body
+
+                        comments = _json_body["comments"]
+                        if previous_ids:
+                            comments = [comment for comment in comments if comment["_id"] not in previous_ids]
+                        if comments:
+                            last_ids = {comment["_id"] for comment in comments}
+
+                        if not comments:
+                            empty_page = empty_page or _json_body
+                            continue
+                        if len(comments) != len(_json_body["comments"]):
+                            _json_body = dict(_json_body, comments=comments)
+
+                        found = True
+                        yield _json_body
+                    previous_ids = last_ids
+            finally:
+                stop.set()
+
+            # no window returned any comments, so let the caller know just like a empty first response would
+            if not found:
+                yield empty_page
+
+    def _extract_comments(self, shards: int = 1, keep_raw: bool = True, checkpoint: Checkpoint = None,
+                          start: float = None, end: float = None, lean: bool = False, follow: bool = False,
+                          interval: float = 30.0, timeout: float = None, shard_buffer: int = None) -> Generator:
         """ Gets the raw comments from the VOD. 'raw comments', because all the other 'junk' the request response gives
             us, has yet to be properly cleaned and only the relevant information extracted.
 
             For this cleaning and processing, see the class method :meth:`get_comments()`.
 
+            :param shards: the amount of time windows to download in parallel (1 means a serial download)
+            :param keep_raw: whether or not the pages should be stored in the raw_comments
+            :param checkpoint: the checkpoint to resume from and to save the progress to
+            :param start: only get the comments posted at or after `start` seconds into the VOD
+            :param end: only get the comments posted before `end` seconds into the VOD
+            :param lean: whether or not only the fields needed for the cleaned comments should be decoded,
+                         i.e. the raw JSON is not needed. Not used with a checkpoint, as it has to keep whole pages
+            :param follow: whether or not to keep on polling for new comments once the last page is reached,
+                           see `_iter_live_pages()`
+            :param interval: if `follow` is set: the time in seconds between two polls
+            :param timeout: if `follow` is set: stop once no new comments have been returned for this many seconds
+            :param shard_buffer: if `shards` is set: how many pages every shard fetches ahead,
+                                 see `_iter_sharded_pages()`
             :return: Generator: yields the request responses .json()
         """
 
-        counter = 1
-        _next = ""  # for our first request, we don't have a _next cursor, so we simply use an empty string
-        while True:
+        self._lean = lean and checkpoint is None and not keep_raw
 
-            # make new request with the _next cursor, so we can get the next comments payload
-            _request_response = requests.get(url=self.url, headers=self._headers, params={"cursor": _next})
-            _json_body = _request_response.json()
+        if follow:
+            if shards > 1 or checkpoint is not None:
+                raise ValueError("Following a live broadcast does not support shards or checkpoints.")
+            pages = self._iter_live_pages(interval=interval, timeout=timeout, start=start, end=end)
+        elif checkpoint is not None:
+            if start or end is not None:
+                raise ValueError("Checkpoints are only supported for downloads of the whole VOD (no start or end).")
+            pages = self._iter_checkpointed_pages(checkpoint=checkpoint, shards=shards)
+        elif shards > 1:
+            pages = self._iter_sharded_pages(shards=shards, start=start, end=end, buffer=shard_buffer)
+        else:
+            pages = self._iter_pages(start=start, end=end)
 
-            if _request_response.status_code != 200:
-                msg_from_twitch = _json_body["message"]
-                raise TwitchApiException(
-                    "Twitch API responded with '{1}' (status code {0}). Expected 200 (OK)."
-                    .format(_request_response.status_code, msg_from_twitch)
-                )
+        for counter, _json_body in enumerate(pages, start=1):
+            self._record_page(counter=counter, _json_body=_json_body, keep_raw=keep_raw)
 
-            # if the first response contains a empty list of "comments",
-            # we set our flag to let the program know to stop trying to extract more comments
-            if counter == 1 and not _json_body["comments"]:
-                self._no_first_comments_response = True
+            yield _json_body
 
-            _next = _json_body.get("_next", 0)  # get the key, if not found default to 0
+    def _iter_checkpointed_pages(self, checkpoint: Checkpoint, shards: int = 1) -> Generator:
+        """ Yields the pages of a previous (failed) download from the checkpoint first,
+            and then continues the download from the `_next` cursor of the last of these pages.
 
-            # add the next/new batch of comments to the raw_comments, which we can later clean
+            Every newly fetched page is added to the checkpoint. Once the download is complete,
+            the checkpoint file is removed.
+
+            :param checkpoint: the checkpoint to resume from and to save the progress to
+            :param shards: has to be 1, as only a serial download has a single cursor which can be resumed
+            :return: Generator: yields the request responses .json()
+        """
+
+        if shards > 1:
+            raise ValueError("Checkpoints are only supported for serial downloads (shards=1).")
+
+        done = checkpoint.load()
+        yield from done
+
+        if done and not done[-1].get("_next"):  # the previous download already fetched every page
+            checkpoint.remove()
+            return
+
+        try:
+            for _json_body in self._iter_pages(cursor=done[-1]["_next"] if done else ""):
+                checkpoint.add(_json_body)
+                yield _json_body
+        except BaseException:  # also if the generator is not consumed until the end
+            checkpoint.flush()
+            raise
+
+        checkpoint.remove()
+
+    @staticmethod
+    def _parse_window(start, end) -> dict:
+        """ Parses the time window of a download.
+
+            :param start: the offset the window starts at, in seconds or as "[hours:]minutes:seconds"
+            :param end: the offset the window ends at (exclusive), in seconds or as "[hours:]minutes:seconds"
+            :return: the `start` and `end` in seconds, to be passed on to `_extract_comments()`
+            :raise ValueError: if a offset is invalid, or `end` is not after `start`
+        """
+
+        start = parse_offset(start) if start is not None else None
+        end = parse_offset(end) if end is not None else None
+        if end is not None and end <= (start or 0):
+            raise ValueError("The end ({}) of the time window has to be after its start ({}).".format(end, start or 0))
+        return dict(start=start, end=end)
+
+    def _make_checkpoint(self, checkpoint: Union[pathlib.Path, str, None], interval: int) -> Union[Checkpoint, None]:
+        return Checkpoint(vod_id=self.vod_id, dirpath=checkpoint, interval=interval) if checkpoint else None
+
+    def _record_page(self, counter: int, _json_body: dict, keep_raw: bool = True, amount: int = None) -> None:
+        """ Stores a page of raw comments as "Batch {counter}" in the raw_comments.
+
+            :param counter: the number of the page (starting at 1)
+            :param _json_body: the request response .json()
+            :param keep_raw: whether or not the page should be stored in the raw_comments
+            :param amount: the amount of comments in the page, if the page itself is not at hand (`_json_body` is None)
+        """
+
+        amount = len(_json_body["comments"]) if amount is None else amount
+
+        # if the first response contains a empty list of "comments",
+        # we set our flag to let the program know to stop trying to extract more comments
+        if counter == 1 and not amount:
+            self._no_first_comments_response = True
+
+        self.pages_fetched += 1
+        self.comments_fetched += amount
+        if _metrics.active is not None:
+            _metrics.active.record_page(self.vod_id, comments=amount)
+
+        # add the next/new batch of comments to the raw_comments, which we can later clean
+        if keep_raw:
             self.raw_comments["Batch {}".format(counter)] = _json_body
 
-            counter += 1
+    @staticmethod
+    def _page_columns(_json_body: dict, vod_datetime: datetime) -> tuple:
+        """ Extracts only the needed comment data out of a page of raw comments, column by column.
 
-            yield _json_body
+            :param _json_body: the request response .json()
+            :param vod_datetime: the time when the livestream happened
+            :return: the timestamps, the offsets (when in the VOD the comments have been posted, in seconds),
+                     the user names and the message bodies of every comment in the page
+        """
 
-            if _next == 0:  # if there are no more chat comments to fetch, we are done
-                break
+        comments = _json_body["comments"]  # list of dicts in the overall comment_dict
+
+        timestamps = [comment["created_at"] for comment in comments]
+        names = [comment["commenter"]["display_name"] for comment in comments]  # or "name" key value
+        messages = [comment["message"]["body"] for comment in comments]
 
-    def get_comments(self) -> list:
+        # get the time the comments have been posted at (in relation to the start of the VOD), for the whole page
+        # added in v0.2.0
+        offsets = get_offsets(timestamps, vod_datetime=vod_datetime)
+
+        return timestamps, offsets, names, messages
+
+    @staticmethod
+    def _clean_page(_json_body: dict, vod_datetime: datetime) -> list:
+        """ Extracts only the needed comment data out of a page of raw comments.
+
+            :param _json_body: the request response .json()
+            :param vod_datetime: the time when the livestream happened
+            :return: the VODSimpleComment of every comment in the page
         """
-        Cleans the raw_comments. Here we go through the JSON and extract only the needed comment data.
 
-        Meaning: user name, when it was posted, and the body/text of the chat comment.
+        timestamps, offsets, names, messages = VODChat._page_columns(_json_body, vod_datetime=vod_datetime)
 
-        If the raw data is wanted (JSON),
-        simply call the class instance attribute `raw_comments` or its property `raw`.
+        # we now have the needed comment data, which we store in a tuple VODSimpleComment
+        return [VODSimpleComment(timestamp, format_posted_at(offset), name, message)  # posted_at: hours:minutes:seconds
+                for timestamp, offset, name, message in zip(timestamps, offsets, names, messages)]
 
-        :return: the extracted comments from the raw data - these are VODCleanedComment instances (tuples)
-                 with additional property attributes (name, timestamp, message)
+    def _iter_pages_with(self, clean, processes: int = None, **download) -> Generator:
+        """ Cleans the raw comments page by page, as they arrive.
+
+            :param clean: the function used to clean a page, i.e. `_clean_page` or `_page_columns`
+            :param processes: the amount of worker processes for a pipelined download, see `_iter_pipelined_pages()`.
+                              None means the pages are cleaned right here, one after another
+            :param download: passed on to `_extract_comments()`, i.e. `shards`, `keep_raw` and `checkpoint`
+            :return: Generator: yields the request response .json() together with its cleaned comments
         """
 
-        _raw_comments = self._extract_comments()  # Generator with the raw comments (batch for batch)
+        if processes:
+            yield from self._iter_pipelined_pages(clean, processes=processes, **download)
+            return
 
-        # time when the livestream happened as a datetime.datetime object
-        _vod_datetime = get_strptime(datetime_string=self._basic_data.created_at)
+        _vod_datetime = None
 
-        for comment_dict in _raw_comments:  # for each dict (i.e. yield) we have in our generator
+        for _json_body in self._extract_comments(**download):
+            if _vod_datetime is None:
+                # time when the livestream happened as a datetime.datetime object
+                # only needed once the first page is there, so the basic data can still be fetched in the meantime
+                _vod_datetime = get_strptime(datetime_string=self._basic_data.created_at)
             if self._no_first_comments_response:  # if True, no comment data is available
-                self.vod_comments = None
-                return self.comments
-            for comment_data_list_of_dicts in comment_dict["comments"]:  # list of dicts in the overall comment_dict
+                yield _json_body, clean(dict(_json_body, comments=[]), vod_datetime=_vod_datetime)
+                return
+            with _metrics.stage("clean"):
+                cleaned = clean(_json_body, vod_datetime=_vod_datetime)
+            yield _json_body, cleaned
+
+    def _iter_pipelined_pages(self, clean, processes: int, shards: int = 1, keep_raw: bool = True,
+                              checkpoint: Checkpoint = None, start: float = None, end: float = None,
+                              lean: bool = False, follow: bool = False, interval: float = None,
+                              timeout: float = None, shard_buffer: int = None) -> Generator:
+        """ The pipelined counterpart to `_iter_pages_with()`, for very large VODs.
+
+            A background thread fetches the pages ahead (only decoding the `_next` cursor of every page),
+            while the JSON decoding and the cleaning run on a pool of `processes` worker processes.
+            How far the fetching runs ahead is bounded, so the memory usage stays flat.
+            The cleaned pages are yielded in cursor order, i.e. the result is the same as with `_iter_pages_with()`.
+
+            :param clean: the function used to clean a page, i.e. `_clean_page` or `_page_columns`
+            :param processes: the amount of worker processes
+            :param shards: has to be 1, as the cursor of a serial download is what the pages are fetched ahead by
+            :param keep_raw: whether or not the pages should be stored in the raw_comments
+            :param checkpoint: has to be None, checkpoints are not supported
+            :param start: only get the comments posted at or after `start` seconds into the VOD
+            :param end: only get the comments posted before `end` seconds into the VOD
+            :param lean: whether or not only the fields needed for the cleaned comments should be decoded,
+                         in which case the yielded pages are None
+            :param follow: has to be False, following a live broadcast is not supported (nor are `interval`,
+                           `timeout` and `shard_buffer` used)
+            :return: Generator: yields the request response .json() together with its cleaned comments
+        """
+
+        if shards > 1 or checkpoint is not None or follow:
+            raise ValueError("Pipelined downloads (processes) do not support shards, checkpoints or following.")
+
+        lean = lean and not keep_raw
+        pending = queue.Queue(maxsize=4 * processes)  # the cleaning pages (Futures) with their cursors, in order
+        stop = threading.Event()
+
+        def put(item) -> None:
+            while not stop.is_set():
+                try:
+                    pending.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def fetch(executor: ProcessPoolExecutor) -> None:
+            try:
+                _vod_datetime = None
+                params = {"content_offset_seconds": start} if start else {"cursor": ""}
+                while not stop.is_set():
+                    if self._client.cache is not None and self._cached:  # the cache keeps decoded pages
+                        page = self._client.get_json(url=self.url, headers=self._headers, params=params,
+                                                     cache_key=self._cache_key(params))
+                        cursor = page.get("_next") or None
+                    else:
+                        page = self._client.get_content(url=self.url, headers=self._headers, params=params)
+                        cursor = _find_cursor(page)
+
+                    if _vod_datetime is None:  # see `_iter_pages_with()`
+                        _vod_datetime = get_strptime(datetime_string=self._basic_data.created_at)
+
+                    put((executor.submit(_clean_in_process, page, _vod_datetime, clean, lean=lean, keep_page=not lean,
+                                         start=start, end=end), cursor))
+                    if cursor is None:
+                        break
+                    params = {"cursor": cursor}
+            except BaseException as e:  # raised again in the generator
+                put(e)
+            put(None)
+
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            thread = threading.Thread(target=fetch, args=(executor,), daemon=True)
+            thread.start()
+            try:
+                counter = 1
+                while True:
+                    item = pending.get()
+                    if item is None:
+                        break
+                    if isinstance(item, BaseException):
+                        raise item
+
+                    future, cursor = item
+                    _json_body, amount, cleaned, outside_window = future.result()
+
+                    if outside_window:
+                        cursor = None  # everything after this page is outside of the window
+                    if not amount and cursor is not None and (start or end is not None):
+                        continue  # nothing of this page is inside the window, but the following pages might be
+
+                    self._record_page(counter=counter, _json_body=_json_body, keep_raw=keep_raw, amount=amount)
+                    counter += 1
+
+                    yield _json_body, cleaned
+
+                    if cursor is None or self._no_first_comments_response:
+                        break
+            finally:
+                stop.set()
+                thread.join()
+                while not pending.empty():  # do not clean the pages fetched ahead if we stopped early
+                    item = pending.get()
+                    if isinstance(item, tuple):
+                        item[0].cancel()
+
+    def _iter_cleaned_pages(self, **download) -> Generator:
+        """ Cleans the raw comments page by page, as they arrive.
+
+            :param download: passed on to `_extract_comments()`, i.e. `shards`, `keep_raw` and `checkpoint`
+            :return: Generator: yields the request response .json() together with the list of its cleaned comments
+        """
+
+        return self._iter_pages_with(self._clean_page, **download)
+
+    def iter_comments(self, shards: int = 1, keep_raw: bool = False, checkpoint: Union[pathlib.Path, str] = None,
+                      checkpoint_interval: int = 50, start: Union[float, str] = None,
+                      end: Union[float, str] = None, processes: int = None) -> Generator:
+        """
+        Yields the cleaned comments page by page, as they arrive.
+
+        Unlike `get_comments()`, the comments are not stored in the `vod_comments`,
+        and the raw JSON is only stored in the `raw_comments` if `keep_raw` is set.
+        This way the memory usage stays flat, no matter how many comments the VOD has.
+        With `shards`, every shard only fetches `shard_buffer` pages ahead of the yielded comments.
+
+        :param shards: the amount of time windows the VOD is split into, which are then downloaded in parallel
+        :param keep_raw: whether or not the raw JSON should be stored in the `raw_comments`
+        :param checkpoint: the path pointing to a directory in which a checkpoint of the download is saved,
+                           see `get_comments()`
+        :param checkpoint_interval: after how many fetched pages the checkpoint is saved
+        :param start: only get the comments posted from this point in the VOD on, see `get_comments()`
+        :param end: only get the comments posted before this point in the VOD, see `get_comments()`
+        :param processes: the amount of worker processes for a pipelined download, see `get_comments()`
+        :return: Generator: yields VODSimpleComment instances
+        """
+
+        window = self._parse_window(start, end)
+        checkpoint = self._make_checkpoint(checkpoint, interval=checkpoint_interval)
+        for _json_body, comments in self._iter_cleaned_pages(shards=shards, keep_raw=keep_raw, checkpoint=checkpoint,
+                                                             lean=not keep_raw, processes=processes, **window):
+            yield from comments
+
+    def follow(self, interval: float = 30.0, timeout: float = None, keep_raw: bool = False,
+               start: Union[float, str] = None, end: Union[float, str] = None) -> Generator:
+        """
+        Follows the chat of a broadcast which is still live: yields the comments posted so far,
+        and then keeps on polling for new comments every `interval` seconds, yielding only the new ones.
+
+        Once the last page is reached, its cursor is requested again, and the comments which have already been
+        yielded (by their `_id`) are dropped. So no comment is yielded twice, and nothing is downloaded again.
+
+        :param interval: the time in seconds between two polls
+        :param timeout: stop once no new comments have been posted for this many seconds.
+                        None means the following goes on until the generator is closed (e.g. by a `break`)
+                        or `stop_following()` is called
+        :param keep_raw: whether or not the raw JSON should be stored in the `raw_comments`
+        :param start: only get the comments posted from this point in the VOD on, see `get_comments()`
+        :param end: stop once the comments pass this point in the VOD, see `get_comments()`
+        :return: Generator: yields VODSimpleComment instances
+        """
 
-                created_at = comment_data_list_of_dicts["created_at"]
-                commenter = comment_data_list_of_dicts["commenter"]["display_name"]  # or "name" key value
-                message = comment_data_list_of_dicts["message"]["body"]
+        window = self._parse_window(start, end)
+        for _json_body, comments in self._iter_cleaned_pages(keep_raw=keep_raw, lean=not keep_raw, follow=True,
+                                                             interval=interval, timeout=timeout, **window):
+            yield from comments
 
-                # get the time the comment has been posted at
-                # added in v0.2.0
+    def stop_following(self) -> None:
+        """ Stops `follow()` (or `to_file(follow=True)`) once it has caught up with the comments posted so far,
+            instead of polling again. Can be called from any thread.
+        """
+        self._stop_following.set()
+
+    def get_comments(self, shards: int = 1, compact: bool = False, keep_raw: bool = True,
+                     checkpoint: Union[pathlib.Path, str] = None, checkpoint_interval: int = 50,
+                     start: Union[float, str] = None, end: Union[float, str] = None,
+                     processes: int = None) -> Union[list, CommentStore]:
+        """
+        Cleans the raw_comments. Here we go through the JSON and extract only the needed comment data.
 
-                # time when the comment has been posted as a datetime.datetime object
-                _comment_datetime = get_strptime(datetime_string=created_at)
+        Meaning: user name, when it was posted, and the body/text of the chat comment.
+
+        If the raw data is wanted (JSON),
+        simply call the class instance attribute `raw_comments` or its property `raw`.
 
-                # subtract the the two datetime objects and
-                # now we have the exact time the comment was posted in the chat
-                posted_at = (_comment_datetime - _vod_datetime).__str__()[:7]  # only get the hours:minutes:seconds
+        :param shards: the amount of time windows the VOD is split into, which are then downloaded in parallel.
+                       Defaults to 1, i.e. paginating through the whole VOD one request at a time
+        :param compact: whether or not the comments should be stored in a compact, array-backed `CommentStore`
+                        instead of a list. Both yield VODSimpleComment instances when indexed or iterated
+        :param keep_raw: whether or not the raw JSON should be stored in the `raw_comments`
+        :param checkpoint: the path pointing to a directory in which a checkpoint of the download is saved
+                           (VOD_{vod_id}_CHECKPOINT.jsonl). If the download fails, calling this method again
+                           with the same directory continues where the last download stopped.
+                           Once the download is complete, the checkpoint is removed.
+                           Only supported for serial downloads (shards=1) of the whole VOD
+        :param checkpoint_interval: after how many fetched pages the checkpoint is saved
+        :param start: only get the comments posted from this point in the VOD on,
+                      in seconds or as "[hours:]minutes:seconds" (e.g. "1:32:00"). The download jumps straight there,
+                      instead of paginating from the start of the VOD
+        :param end: only get the comments posted before this point in the VOD (same format as `start`).
+                    The download stops as soon as the comments pass it
+        :param processes: the amount of worker processes decoding and cleaning the pages, while the pages are fetched
+                          ahead on a background thread - a pipelined download for very large VODs.
+                          Not supported together with `shards` or `checkpoint`
+        :return: the extracted comments from the raw data - these are VODCleanedComment instances (tuples)
+                 with additional property attributes (name, timestamp, message)
+        """
 
-                # we now have the needed comment data, which we store in a tuple VODSimpleComment,
-                # which is itself stored in the 'vod_comments' class instance variable, which holds all the comments
-                comment_data = VODSimpleComment(timestamp=created_at, posted_at=posted_at, name=commenter, message=message)
-                self.vod_comments.append(comment_data)
+        # every comment is kept anyway, so the shards do not have to wait for each other
+        download = dict(shards=shards, keep_raw=keep_raw, lean=not keep_raw, processes=processes, shard_buffer=0,
+                        checkpoint=self._make_checkpoint(checkpoint, interval=checkpoint_interval),
+                        **self._parse_window(start, end))
+
+        # the cleaned comments are stored in the 'vod_comments' class instance variable, which holds all the comments
+        with _metrics.stage("get_comments"):
+            if compact:
+                self.vod_comments = CommentStore()
+                for _json_body, columns in self._iter_pages_with(self._page_columns, **download):
+                    self.vod_comments.extend(*columns)
+            else:
+                self.vod_comments = list()
+                for _json_body, comments in self._iter_cleaned_pages(**download):
+                    self.vod_comments.extend(comments)
+
+        if self._no_first_comments_response:  # if True, no comment data is available
+            self.vod_comments = None
 
         return self.comments
 
-    def to_file(self, dirpath: Union[pathlib.Path, str] = None, save_json: bool = True) -> None:
+    def to_file(self, dirpath: Union[pathlib.Path, str] = None, save_json: bool = True, stream: bool = False,
+                raw_format: str = "json", compression: str = None, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                checkpoint: Union[pathlib.Path, str] = None, checkpoint_interval: int = 50,
+                start: Union[float, str] = None, end: Union[float, str] = None, processes: int = None,
+                follow: bool = False, interval: float = 30.0, timeout: float = None, chat_format: str = "txt",
+                columns: Sequence = None) -> int:
         """
         Saves the cleaned vod comment data in a plain .txt file.
         The raw JSON data can additionally be saved in a separate .json file, if `save_json` is set (default behavior).
 
         Only a valid directory path pointing to a folder is allowed.
 
+        If `stream` is set, the comments are not taken from a previous `get_comments()` call, but are downloaded
+        and written to the file(s) page by page as they arrive (via `iter_comments()`), without keeping them in memory.
+        The output is the same.
+
+        The files are written under a temporary name (e.g. VOD_{id}_CHAT.txt.part) and only renamed once they are
+        complete. If the download fails, they are removed again.
+
         :param dirpath: the path pointing to a directory in which the file(s) are to be saved.
                         Defaults to the current working directory as returned by `os.getcwd()`
         :param save_json: whether or not a separate .json file containing the raw JSON data should be created
+        :param stream: whether or not the comments should be downloaded and written while they arrive
+        :param raw_format: "json" for one (indented) JSON object containing every batch (VOD_{id}_RAW.json),
+                           or "jsonl" for JSON Lines, i.e. one compact raw comment per line (VOD_{id}_RAW.jsonl)
+        :param compression: None, "gzip" (adds .gz to the file names) or "zstd" (adds .zst, requires `zstandard`)
+        :param buffer_size: the size of the write buffer of the files in bytes
+        :param checkpoint: only if `stream` is set: the path pointing to a directory in which a checkpoint of the
+                           download is saved, see `get_comments()`
+        :param checkpoint_interval: after how many fetched pages the checkpoint is saved
+        :param start: only if `stream` is set: only write the comments from this point in the VOD on,
+                      see `get_comments()`
+        :param end: only if `stream` is set: only write the comments before this point in the VOD
+        :param processes: only if `stream` is set: the amount of worker processes for a pipelined download,
+                          see `get_comments()`
+        :param follow: whether or not to follow a broadcast which is still live (see `follow()`), i.e. the new comments
+                       are appended to the file(s) as they are posted. Implies `stream`. The (.part) files are flushed
+                       after every page and finalized once the following stops, also if stopped via Ctrl+C
+        :param interval: only if `follow` is set: the time in seconds between two polls
+        :param timeout: only if `follow` is set: stop once no new comments have been posted for this many seconds.
+                        None means the following goes on until stopped via Ctrl+C or `stop_following()`
+        :param chat_format: "txt" for the .txt file (VOD_{id}_CHAT.txt), or "csv" / "tsv" for a .csv / .tsv file
+                            of the comments only (VOD_{id}_CHAT.csv / .tsv)
+        :param columns: the columns of the comments, in order: the fields of the VODSimpleComment ("timestamp",
+                        "posted_at", "name", "message") or (field, width) tuples for the .txt file.
+                        Defaults to every field, with the widths of the .txt file as it has always been
+        :return: the amount of comments written
 
         :raises DirectoryDoesNotExistError | DirectoryIsAFileError: if either the path does not exist,
                                                                     or the path points to a file
         """
 
+        if raw_format not in RAW_WRITERS:
+            raise ValueError("Unsupported raw_format '{}'. Use one of: {}.".format(raw_format, list(RAW_WRITERS)))
+        if chat_format not in CHAT_WRITERS:
+            raise ValueError("Unsupported chat_format '{}'. Use one of: {}.".format(chat_format, list(CHAT_WRITERS)))
+
         # base file name which we use for our output files
-        file_name = "VOD_{}_{}.{}"  # 1. vod_id, 2. CHAT or RAW, 3. file extension
+        file_name = "VOD_{}_{}.{}{}"  # 1. vod_id, 2. CHAT or RAW, 3. file extension, 4. compression extension
 
         # handle the supplied directory path, if needed
         directory_path = validate_path(provided_path=dirpath) if dirpath else pathlib.Path(os.getcwd())
 
-        chat_filepath = directory_path / file_name.format(self.vod_id, "CHAT", "txt")
-        with chat_filepath.open(mode="w", encoding="utf-8") as c_file:
-
-            # added in v0.2.0
-            c_file.write("{:<30} {:<10} {:<30} {}\n".format("Created at", "Posted at", "User", "Message"))
-
-            if self.vod_comments:  # if there are comments
-                for created_at, posted_at, commenter, message in self.vod_comments:
-                    c_file.write("{:<30} {:<10} {:<30} {}\n".format(created_at, posted_at, commenter, message))
-            elif self.vod_comments is None:  # if we set vod_comments to None during extraction (no comments available)
-                c_file.write("No comments available for this VOD.")
-            else:  # if to_file() has been called before comments have been tried to be extracted from the VOD
-                c_file.write("No comments have yet been extracted. Try `vodchat.get_comments()` first.")
-
-            # additional data which might be of interest
-            date_of_stream, channel_id = self._basic_data.created_at[:10], self._basic_data.channel_id
-            name, views, followers, broadcaster_type = (self._basic_data.channel_name,
-                                                        self._basic_data.channel_views,
-                                                        self._basic_data.channel_followers,
-                                                        self._basic_data.channel_type)
-            amt_of_comments = len(self.vod_comments) if self.vod_comments else 0
-
-            # now we add some additional data at the end of the .txt file
-            # (i.e. VOD ID, date of stream, streamer name, etc.)
-            c_file.write("\n\n\n\n"
-                         "Date of Stream: {date} - {title} ({game})\n"
-                         "\tStream length: {length} hours\n"
-                         "Streamer: {name}\n"
-                         "\tChannel ID: {channel_id}\n"
-                         "\tChannel views: {views}\n"
-                         "\tFollowers: {followers}\n"
-                         "\tBroadcaster type: {broadcaster_type}\n"
-                         "VOD ID: {vod}\n"
-                         "Amount of comments: {amount}\n"
-                         .format(date=date_of_stream,
-                                 title=self._basic_data.title,
-                                 game=self._basic_data.game,
-                                 length=self._basic_data.vod_length,
-                                 name=name,
-                                 channel_id=channel_id,
-                                 views=views,
-                                 followers=followers,
-                                 broadcaster_type=broadcaster_type,
-                                 vod=self.vod_id,
-                                 amount=amt_of_comments,
-                                 )
-                         )
+        chat_writer_class, chat_extension = CHAT_WRITERS[chat_format]
+        raw_writer_class, raw_extension = RAW_WRITERS[raw_format]
+        chat_filepath = directory_path / file_name.format(self.vod_id, "CHAT", chat_extension,
+                                                          COMPRESSIONS[compression])
+        raw_filepath = directory_path / file_name.format(self.vod_id, "RAW", raw_extension, COMPRESSIONS[compression])
 
         # additionally save the raw comment JSON data we extracted from the Twitch API
         # we also don't care here if we overwrite existing files as well
-        if save_json:
-            json_filepath = directory_path / file_name.format(self.vod_id, "RAW", "json")
-            json.dump(obj=self.raw_comments,
-                      fp=json_filepath.open(mode="w"),
-                      indent=4)
+        with ExitStack() as stack:
+            stack.enter_context(_metrics.stage("to_file"))
+            c_writer = stack.enter_context(chat_writer_class(chat_filepath, vod_id=self.vod_id,
+                                                             basic_data=lambda: self._basic_data,
+                                                             compression=compression, buffer_size=buffer_size,
+                                                             columns=columns))
+            r_writer = stack.enter_context(raw_writer_class(raw_filepath, compression=compression,
+                                                            buffer_size=buffer_size)) if save_json else None
+
+            if stream or follow:
+                checkpoint = self._make_checkpoint(checkpoint, interval=checkpoint_interval)
+                pages = self._iter_cleaned_pages(checkpoint=checkpoint, keep_raw=False, lean=not save_json,
+                                                 processes=processes, follow=follow, interval=interval,
+                                                 timeout=timeout, **self._parse_window(start, end))
+                try:
+                    for _json_body, comments in pages:
+                        with _metrics.stage("write"):
+                            c_writer.write_comments(comments)
+                            if r_writer:
+                                r_writer.write_page(_json_body)
+                            if follow:  # so the new comments can be read right away
+                                c_writer.flush()
+                                if r_writer:
+                                    r_writer.flush()
+                except KeyboardInterrupt:
+                    if not follow:
+                        raise
+                    pages.close()  # the usual way to stop following, the files are finalized all the same
+                if self._no_first_comments_response:
+                    self.vod_comments = None
+            else:
+                with _metrics.stage("write"):
+                    if self.vod_comments:  # if there are comments
+                        c_writer.write_comments(self.vod_comments)
+                    if r_writer:
+                        for _json_body in self.raw_comments.values():
+                            r_writer.write_page(_json_body)
+
+            if self.vod_comments is None:  # if we set vod_comments to None during extraction (no comments available)
+                c_writer.write_note("No comments available for this VOD.")
+            elif not self.vod_comments and not (stream or follow):
+                # if to_file() has been called before comments have been tried to be extracted from the VOD
+                c_writer.write_note("No comments have yet been extracted. Try `vodchat.get_comments()` first.")
+
+        return c_writer.amount
@@ -0,0 +1,341 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+"""
+
+
+import os
+import pathlib
+import threading
+import time
+from typing import Iterable, NamedTuple, Union
+
+
+class Job(NamedTuple):
+    """ A VOD claimed from the `WorkQueue` by a worker, which holds the lease on it until `lease_expires`. """
+
+    vod_id: str
+    worker: str
+    attempts: int
+    lease_expires: float
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    vod_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    added_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    comments INTEGER,
+    error TEXT,
+    not_before REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires);
+"""
+
+# the statuses of a job
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# the error of a VOD given up on because the lease of its last attempt ran out
+_LEASE_EXPIRED = "the lease ran out"
+
+
+def default_worker_id() -> str:
+    """ :return: a worker ID unique to this host, process and thread """
+
+    import socket
+    return "{}-{}-{}".format(socket.gethostname(), os.getpid(), threading.get_ident())
+
+
+class _KeepAlive:
+    """ Renews the lease of a job in the background, see `WorkQueue.keep_alive()`. """
+
+    def __init__(self, queue: "WorkQueue", job: Job, interval: float):
+        self.queue = queue
+        self.job = job
+        self.interval = interval
+        self.lost = False  # whether or not the lease has been lost (e.g. taken over after a long pause)
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.job):
+                    self.lost = True
+                    return
+            except Exception:  # e.g. the database is locked for too long, the next heartbeat tries again
+                pass
+
+
+class _Transaction:
+    """ A write transaction, which takes the database lock right away ("BEGIN IMMEDIATE"),
+        so two workers can never claim the same VOD.
+    """
+
+    def __init__(self, connection, lock: threading.Lock):
+        self.connection = connection
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            self.connection.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.connection.cursor()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        finally:
+            self.lock.release()
+
+
+class WorkQueue:
+    """ A work queue of VOD IDs in a SQLite database, so any amount of workers - threads, processes or machines
+        sharing the database file (e.g. on a shared filesystem) - can archive a backlog of VODs together,
+        without downloading a VOD twice.
+
+        A worker claims a VOD (`claim()`) and gets a lease on it for `lease` seconds, which it renews
+        (`heartbeat()`, or `keep_alive()` in the background) while downloading. Once done, it records
+        the result (`complete()` / `fail()`). If a worker dies, its lease runs out and the VOD is claimed
+        by the next worker. Failed VODs are queued again, up to `max_attempts` attempts, but can only be claimed
+        after `retry_delay` seconds (doubled with every further attempt). VODs which have been tried less often
+        are claimed first.
+
+        The leases use the wall-clock time of the machines, so their clocks have to be roughly in sync.
+        The filesystem has to support file locking (some network filesystems do not).
+
+        Usage:
+
+            with WorkQueue("queue.db") as queue:
+                queue.add(["111111111", "222222222"])
+                job = queue.claim()
+                while job is not None:
+                    with queue.keep_alive(job):
+                        comments = VOD(vod_id=job.vod_id).get_vodchat().get_comments()
+                    queue.complete(job, comments=len(comments or ()))
+                    job = queue.claim()
+
+        :param path: the path of the database file (created if needed)
+        :param lease: for how many seconds a claimed VOD belongs to its worker without a heartbeat
+        :param max_attempts: how often a VOD is tried before it is given up on
+        :param timeout: how long to wait (in seconds) for other workers to release the database lock
+        :param retry_delay: how long (in seconds) a failed VOD waits before it can be claimed again
+    """
+
+    def __init__(self, path: Union[pathlib.Path, str], lease: float = 300.0, max_attempts: int = 3,
+                 timeout: float = 60.0, retry_delay: float = 30.0):
+        self.path = pathlib.Path(path)
+        self.lease = lease
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+
+        import sqlite3  # only imported once a queue is opened, to keep importing pyvod fast
+
+        # autocommit mode, the transactions are started explicitly with "BEGIN IMMEDIATE" (see _transaction()),
+        # and no WAL, as it does not work across machines
+        self._connection = sqlite3.connect(str(self.path), timeout=timeout, isolation_level=None,
+                                           check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.executescript(_SCHEMA)
+
+    def __repr__(self):
+        return "<WorkQueue path={0.path!r} lease={0.lease!r}>".format(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        """ Closes the database connection. """
+        self._connection.close()
+
+    def _transaction(self):
+        return _Transaction(self._connection, self._lock)
+
+    def add(self, vod_ids: Iterable[str]) -> int:
+        """ Queues VODs. VODs which are already in the queue (in any status) are not added again.
+
+            :param vod_ids: the VOD IDs
+            :return: the amount of VODs added
+        """
+
+        now = time.time()
+        with self._transaction() as cursor:
+            before = cursor.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            cursor.executemany("INSERT OR IGNORE INTO jobs (vod_id, added_at) VALUES (?, ?)",
+                               ((str(vod_id), now) for vod_id in vod_ids))
+            return cursor.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] - before
+
+    def claim(self, worker: str = None) -> Union[Job, None]:
+        """ Claims the next queued VOD (whose retry delay, if any, has passed),
+            or a VOD whose worker's lease has run out (i.e. the worker died).
+            A VOD whose lease ran out on its `max_attempts`-th attempt is given up on instead.
+
+            :param worker: the ID of the worker, defaults to `default_worker_id()`
+            :return: the claimed job, None if there is no VOD to claim (right now)
+        """
+
+        worker = worker or default_worker_id()
+        now = time.time()
+        with self._transaction() as cursor:
+            while True:
+                row = cursor.execute("SELECT vod_id, status, attempts FROM jobs "
+                                     "WHERE (status = ? AND (not_before IS NULL OR not_before <= ?)) "
+                                     "OR (status = ? AND lease_expires < ?) ORDER BY attempts, rowid LIMIT 1",
+                                     (QUEUED, now, RUNNING, now)).fetchone()
+                if row is None:
+                    return None
+
+                vod_id, status, attempts = row
+                if status == QUEUED or attempts < self.max_attempts:
+                    break
+                cursor.execute("UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, finished_at = ?, "
+                               "error = ? WHERE vod_id = ?", (FAILED, now, _LEASE_EXPIRED, vod_id))
+
+            job = Job(vod_id=vod_id, worker=worker, attempts=attempts + 1, lease_expires=now + self.lease)
+            cursor.execute("UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = ?, started_at = ?, "
+                           "error = NULL, not_before = NULL WHERE vod_id = ?",
+                           (RUNNING, worker, job.lease_expires, job.attempts, now, vod_id))
+        return job
+
+    def heartbeat(self, job: Job) -> bool:
+        """ Renews the lease of a claimed VOD.
+
+            :param job: the claimed job
+            :return: whether or not the worker still holds the lease (False if it ran out and the VOD has
+                     been claimed by another worker since)
+        """
+
+        with self._transaction() as cursor:
+            cursor.execute("UPDATE jobs SET lease_expires = ? WHERE vod_id = ? AND worker = ? AND status = ?",
+                           (time.time() + self.lease, job.vod_id, job.worker, RUNNING))
+            return cursor.rowcount == 1
+
+    def keep_alive(self, job: Job, interval: float = None) -> _KeepAlive:
+        """ :return: a context manager renewing the lease of `job` in the background (every `interval` seconds,
+                     a third of the lease by default) while the VOD is being downloaded
+        """
+        return _KeepAlive(self, job, interval=interval if interval is not None else self.lease / 3)
+
+    def complete(self, job: Job, comments: int = None) -> bool:
+        """ Records a VOD as done.
+
+            :param job: the claimed job
+            :param comments: the amount of comments downloaded
+            :return: whether or not the worker still held the lease
+        """
+
+        with self._transaction() as cursor:
+            cursor.execute("UPDATE jobs SET status = ?, lease_expires = NULL, finished_at = ?, comments = ? "
+                           "WHERE vod_id = ? AND worker = ? AND status = ?",
+                           (DONE, time.time(), comments, job.vod_id, job.worker, RUNNING))
+            return cursor.rowcount == 1
+
+    def fail(self, job: Job, error: str = None) -> bool:
+        """ Records a failed attempt. The VOD is queued again (to be claimed after the retry delay),
+            unless it has been tried `max_attempts` times.
+
+            :param job: the claimed job
+            :param error: the reason of the failure
+            :return: whether or not the worker still held the lease
+        """
+
+        now = time.time()
+        status = FAILED if job.attempts >= self.max_attempts else QUEUED
+        not_before = now + self.retry_delay * 2 ** (max(1, job.attempts) - 1) if status == QUEUED else None
+        with self._transaction() as cursor:
+            cursor.execute("UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, finished_at = ?, "
+                           "error = ?, not_before = ? WHERE vod_id = ? AND worker = ? AND status = ?",
+                           (status, now, error, not_before, job.vod_id, job.worker, RUNNING))
+            return cursor.rowcount == 1
+
+    def requeue_expired(self) -> int:
+        """ Queues the VODs whose worker's lease has run out again (`claim()` does so as well),
+            unless they have been tried `max_attempts` times.
+
+            :return: the amount of VODs queued again
+        """
+
+        now = time.time()
+        with self._transaction() as cursor:
+            cursor.execute("UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, finished_at = ?, "
+                           "error = ? WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                           (FAILED, now, _LEASE_EXPIRED, RUNNING, now, self.max_attempts))
+            cursor.execute("UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL "
+                           "WHERE status = ? AND lease_expires < ?", (QUEUED, RUNNING, now))
+            return cursor.rowcount
+
+    def retry_failed(self) -> int:
+        """ Queues the VODs which have been given up on again, with their attempts reset.
+
+            :return: the amount of VODs queued again
+        """
+
+        with self._transaction() as cursor:
+            cursor.execute("UPDATE jobs SET status = ?, attempts = 0, not_before = NULL WHERE status = ?",
+                           (QUEUED, FAILED))
+            return cursor.rowcount
+
+    def next_claim(self, ignore_workers: str = None) -> Union[float, None]:
+        """ Checks when the next VOD can be claimed, i.e. how long a worker without a VOD should wait.
+
+            :param ignore_workers: the prefix of the worker IDs whose running VODs are not waited for,
+                                   e.g. the other threads of this process (which finish or retry them themselves)
+            :return: in how many seconds the next VOD can be claimed (0 if right away), or None if there is
+                     nothing left to wait for, i.e. no VOD queued and none running (on the other workers)
+        """
+
+        query = "SELECT MIN(lease_expires) FROM jobs WHERE status = ?"
+        params = (RUNNING,)
+        if ignore_workers:
+            query += " AND substr(worker, 1, ?) != ?"
+            params += (len(ignore_workers), ignore_workers)
+        with self._lock:
+            queued = self._connection.execute("SELECT MIN(COALESCE(not_before, 0)) FROM jobs WHERE status = ?",
+                                              (QUEUED,)).fetchone()[0]
+            running = self._connection.execute(query, params).fetchone()[0]
+
+        times = [at for at in (queued, running) if at is not None]
+        return max(0.0, min(times) - time.time()) if times else None
+
+    def counts(self) -> dict:
+        """ :return: the amount of VODs per status ("queued", "running", "done" and "failed") """
+
+        with self._lock:
+            rows = self._connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict({QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}, **dict(rows))
+
+    def jobs(self, status: str = None) -> list:
+        """ :return: every VOD of the queue (or only the ones of a status) as dicts, in the order they were added """
+
+        query = "SELECT vod_id, status, worker, lease_expires, attempts, added_at, started_at, finished_at, " \
+                "comments, error, not_before FROM jobs"
+        params = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            cursor = self._connection.execute(query + " ORDER BY rowid", params)
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
@@ -0,0 +1,376 @@
+"""
+pyvod-chat - a simple tool to download a past Twitch.tv broadcasts (VOD) chat comments!
+
+Available on GitHub (+ documentation): https://github.com/sixP-NaraKa/pyvod-chat
+"""
+
+
+import gzip
+import io
+import json
+import os
+import pathlib
+from itertools import islice
+from operator import itemgetter
+from typing import Iterable, Sequence, TextIO, Union
+
+
+# the size of the write buffer of the output files
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+# the supported compressions and their file extensions
+COMPRESSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+# the columns of the comment files: field of the VODSimpleComment -> (column name, width in the .txt file)
+COLUMNS = {"timestamp": ("Created at", 30), "posted_at": ("Posted at", 10), "name": ("User", 30),
+           "message": ("Message", 0)}
+DEFAULT_COLUMNS = ("timestamp", "posted_at", "name", "message")
+
+# how many comments are formatted at once and handed to the file in one write
+# (larger batches are slower again, as one non-ASCII comment makes the whole joined batch a wider string)
+_BATCH_SIZE = 1000
+
+
+def open_text(path: Union[pathlib.Path, str], mode: str = "w", compression: str = None,
+              buffer_size: int = DEFAULT_BUFFER_SIZE, encoding: str = "utf-8", newline: str = None) -> TextIO:
+    """ Opens a (optionally compressed) text file with a large write buffer.
+
+        :param path: the path of the file
+        :param mode: either "w" (overwrite) or "a" (append)
+        :param compression: None, "gzip" or "zstd" (requires the `zstandard` package)
+        :param buffer_size: the size of the write buffer in bytes
+        :param encoding: the encoding of the text
+        :param newline: how line breaks are written, see `open()`
+        :return: the opened text file
+        :raise ValueError: if the compression is not supported
+        :raise ImportError: if "zstd" is used, but the `zstandard` package is not installed
+    """
+
+    if compression not in COMPRESSIONS:
+        raise ValueError("Unsupported compression '{}'. Use one of: {}.".format(compression, list(COMPRESSIONS)))
+
+    if compression is None:
+        return open(str(path), mode=mode, encoding=encoding, buffering=buffer_size, newline=newline)
+
+    if compression == "gzip":
+        binary = gzip.open(str(path), mode=mode + "b")
+    else:
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("The 'zstd' compression requires the 'zstandard' package: pip install zstandard")
+        binary = zstandard.ZstdCompressor().stream_writer(open(str(path), mode=mode + "b"), closefd=True)
+
+    return io.TextIOWrapper(io.BufferedWriter(binary, buffer_size=buffer_size), encoding=encoding, newline=newline)
+
+
+def _column_layout(columns: Sequence = None) -> tuple:
+    """ Resolves a column layout of the comment files.
+
+        :param columns: the columns, in order: either the field names of the VODSimpleComment
+                        ("timestamp", "posted_at", "name", "message") or (field, width) tuples.
+                        Defaults to `DEFAULT_COLUMNS`
+        :return: a function getting the values of the columns of a comment as a tuple (None for the default layout,
+                 in which the comment itself is that tuple), the column names and their widths
+        :raise ValueError: if a column is unknown
+    """
+
+    fields, names, widths = list(), list(), list()
+    for column in columns or DEFAULT_COLUMNS:
+        field, width = (column, None) if isinstance(column, str) else column
+        if field not in COLUMNS:
+            raise ValueError("Unknown column '{}'. Use one of: {}.".format(field, list(COLUMNS)))
+        fields.append(field)
+        names.append(COLUMNS[field][0])
+        widths.append(COLUMNS[field][1] if width is None else width)
+
+    if tuple(fields) == DEFAULT_COLUMNS:
+        return None, names, widths
+    indexes = [DEFAULT_COLUMNS.index(field) for field in fields]
+    if len(indexes) == 1:
+        return (lambda comment: (comment[indexes[0]],)), names, widths
+    return itemgetter(*indexes), names, widths
+
+
+def _batches(comments: Iterable) -> Iterable:
+    """ :return: the comments in lists of up to `_BATCH_SIZE` comments """
+
+    comments = iter(comments)
+    batch = list(islice(comments, _BATCH_SIZE))
+    while batch:
+        yield batch
+        batch = list(islice(comments, _BATCH_SIZE))
+
+
+def format_chat_footer(vod_id: str, basic_data, amt_of_comments: int) -> str:
+    """ Formats some additional data which might be of interest for the end of the .txt file.
+
+        :param vod_id: the VOD ID
+        :param basic_data: the basic data of the VOD (see `VOD._get_basic_data()`)
+        :param amt_of_comments: the amount of comments written
+        :return: the formatted footer
+    """
+
+    # additional data which might be of interest
+    date_of_stream, channel_id = basic_data.created_at[:10], basic_data.channel_id
+    name, views, followers, broadcaster_type = (basic_data.channel_name,
+                                                basic_data.channel_views,
+                                                basic_data.channel_followers,
+                                                basic_data.channel_type)
+
+    # (i.e. VOD ID, date of stream, streamer name, etc.)
+    return ("\n\n\n\n"
+            "Date of Stream: {date} - {title} ({game})\n"
+            "\tStream length: {length} hours\n"
+            "Streamer: {name}\n"
+            "\tChannel ID: {channel_id}\n"
+            "\tChannel views: {views}\n"
+            "\tFollowers: {followers}\n"
+            "\tBroadcaster type: {broadcaster_type}\n"
+            "VOD ID: {vod}\n"
+            "Amount of comments: {amount}\n"
+            .format(date=date_of_stream,
+                    title=basic_data.title,
+                    game=basic_data.game,
+                    length=basic_data.vod_length,
+                    name=name,
+                    channel_id=channel_id,
+                    views=views,
+                    followers=followers,
+                    broadcaster_type=broadcaster_type,
+                    vod=vod_id,
+                    amount=amt_of_comments,
+                    )
+            )
+
+
+class _Writer:
+    """ The base class of the writers. A writer is a context manager, which closes its file on exit.
+
+        The file is written under a temporary name (`path` + ".part"), which is only renamed to `path` once the file
+        is complete. An incomplete file (e.g. of a failed download) is removed, so it can not be mistaken for a complete
+        one, and a previous complete file at `path` is kept.
+    """
+
+    def __init__(self, path: Union[pathlib.Path, str], compression: str = None, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 newline: str = None):
+        self.path = pathlib.Path(path)
+        self.part_path = self.path.with_name(self.path.name + ".part")
+        self._file = open_text(self.part_path, compression=compression, buffer_size=buffer_size, newline=newline)
+
+    def __repr__(self):
+        return "<{0.__class__.__name__} path={0.path!r}>".format(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(complete=exc_type is None)
+
+    def flush(self) -> None:
+        """ Writes everything buffered so far to the file, so it can already be read from `part_path`
+            (also if compressed).
+        """
+
+        self._file.flush()
+        # the compressors keep the data in their own buffers until flushed: a sync flush point for gzip
+        # (`zlib.Z_SYNC_FLUSH`, the default of `GzipFile.flush()`), a finished block for zstd
+        self._file.buffer.raw.flush()
+
+    def close(self, complete: bool = True) -> None:
+        """ Closes the file.
+
+            :param complete: whether or not everything has been written, i.e. if the file should be finalized
+                             and renamed to `path`. Otherwise it is removed
+        """
+
+        if self._file.closed:
+            return
+        self._file.close()
+        if complete:
+            os.replace(str(self.part_path), str(self.path))
+        else:
+            self.part_path.unlink()
+
+
+class ChatTextWriter(_Writer):
+    """ Writes the cleaned comments into the .txt file, in the format of `VODChat.to_file()`.
+
+        The column names are written when opening, the additional VOD/channel information when closing the writer.
+        The comments are formatted in batches, every batch is handed to the file in one write.
+
+        :param path: the path of the .txt file
+        :param vod_id: the VOD ID
+        :param basic_data: the basic data of the VOD (see `VOD._get_basic_data()`),
+                           or a function returning it, which is only called when the footer is written
+        :param compression: None, "gzip" or "zstd"
+        :param buffer_size: the size of the write buffer in bytes
+        :param columns: the column layout, see `_column_layout()`. Every column is padded to its width,
+                        except for the last one. The default layout is the one of `VODChat.to_file()`
+    """
+
+    def __init__(self, path: Union[pathlib.Path, str], vod_id: str, basic_data, compression: str = None,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE, columns: Sequence = None):
+        super().__init__(path, compression=compression, buffer_size=buffer_size)
+        self.vod_id = vod_id
+        self._basic_data = basic_data
+
+        self.amount = 0  # the amount of comments written
+
+        # e.g. "%-30s %-10s %-30s %s\n" - the same as "{:<30} {:<10} {:<30} {}\n", but faster
+        self._get_columns, names, widths = _column_layout(columns)
+        self._row_format = " ".join(["%-{}s".format(width) if width else "%s" for width in widths[:-1]]
+                                    + ["%s"]) + "\n"
+
+        # added in v0.2.0
+        self._file.write(self._row_format % tuple(names))
+
+    def write_comments(self, comments: Iterable) -> None:
+        """ Writes the given comments.
+
+            :param comments: the VODSimpleComment instances to write
+        """
+
+        format_row, get_columns = self._row_format.__mod__, self._get_columns
+        for batch in _batches(comments):
+            rows = batch if get_columns is None else map(get_columns, batch)
+            self._file.write("".join(map(format_row, rows)))
+            self.amount += len(batch)
+
+    def write_note(self, note: str) -> None:
+        """ Writes a note instead of the comments, e.g. if no comments are available.
+
+            :param note: the note to write
+        """
+
+        self._file.write(note)
+
+    def close(self, complete: bool = True) -> None:
+        if complete and not self._file.closed:
+            try:
+                basic_data = self._basic_data() if callable(self._basic_data) else self._basic_data
+                self._file.write(format_chat_footer(vod_id=self.vod_id, basic_data=basic_data,
+                                                    amt_of_comments=self.amount))
+            except BaseException:
+                super().close(complete=False)
+                raise
+        super().close(complete=complete)
+
+
+class ChatCSVWriter(_Writer):
+    """ Writes the cleaned comments into a .csv file: the column names, then one row per comment.
+        Unlike the .txt file, there is no additional VOD/channel information and no note if there are no comments.
+
+        :param path: the path of the .csv file
+        :param vod_id: the VOD ID
+        :param basic_data: not used, for the same signature as ChatTextWriter
+        :param compression: None, "gzip" or "zstd"
+        :param buffer_size: the size of the write buffer in bytes
+        :param columns: the column layout, see `_column_layout()` (the widths are not used)
+        :param delimiter: the delimiter of the columns
+    """
+
+    delimiter = ","
+
+    def __init__(self, path: Union[pathlib.Path, str], vod_id: str = None, basic_data=None, compression: str = None,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE, columns: Sequence = None, delimiter: str = None):
+        super().__init__(path, compression=compression, buffer_size=buffer_size, newline="")
+        self.vod_id = vod_id
+
+        self.amount = 0  # the amount of comments written
+
+        import csv
+
+        # the rows of a batch are written into a buffer first, so the file gets one write per batch
+        self._buffer = io.StringIO()
+        self._get_columns, names, _ = _column_layout(columns)
+        self._writer = csv.writer(self._buffer, delimiter=delimiter or self.delimiter, lineterminator="\n")
+        self._writer.writerow(names)
+        self._flush_buffer()
+
+    def _flush_buffer(self) -> None:
+        self._file.write(self._buffer.getvalue())
+        self._buffer.seek(0)
+        self._buffer.truncate()
+
+    def write_comments(self, comments: Iterable) -> None:
+        """ Writes the given comments.
+
+            :param comments: the VODSimpleComment instances to write
+        """
+
+        get_columns = self._get_columns
+        for batch in _batches(comments):
+            self._writer.writerows(batch if get_columns is None else map(get_columns, batch))
+            self._flush_buffer()
+            self.amount += len(batch)
+
+    def write_note(self, note: str) -> None:
+        """ Does nothing, the file only holds the comments. """
+
+
+class ChatTSVWriter(ChatCSVWriter):
+    """ Writes the cleaned comments into a .tsv file, i.e. a ChatCSVWriter with tabs as the delimiter. """
+
+    delimiter = "\t"
+
+
+class RawJSONWriter(_Writer):
+    """ Writes the raw comments page by page as one JSON object ("Batch 1", "Batch 2", ...),
+        the same way `json.dump(raw_comments, indent=4)` would.
+
+        :param path: the path of the .json file
+        :param compression: None, "gzip" or "zstd"
+        :param buffer_size: the size of the write buffer in bytes
+    """
+
+    def __init__(self, path: Union[pathlib.Path, str], compression: str = None,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE):
+        super().__init__(path, compression=compression, buffer_size=buffer_size)
+        self._counter = 0
+
+    def write_page(self, _json_body: dict) -> None:
+        """ Writes a page of raw comments as the next batch.
+
+            :param _json_body: the request response .json()
+        """
+
+        self._counter += 1
+        self._file.write("{}\n    {}: {}".format("{" if self._counter == 1 else ",",
+                                                 json.dumps("Batch {}".format(self._counter)),
+                                                 json.dumps(_json_body, indent=4).replace("\n", "\n    ")))
+
+    def close(self, complete: bool = True) -> None:
+        if complete and not self._file.closed:
+            self._file.write("\n}" if self._counter else "{}")
+        super().close(complete=complete)
+
+
+class JSONLinesWriter(_Writer):
+    """ Writes the raw comments as JSON Lines, i.e. one compact JSON object per comment and line.
+
+        :param path: the path of the .jsonl file
+        :param compression: None, "gzip" or "zstd"
+        :param buffer_size: the size of the write buffer in bytes
+    """
+
+    def __init__(self, path: Union[pathlib.Path, str], compression: str = None,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE):
+        super().__init__(path, compression=compression, buffer_size=buffer_size)
+        self._encode = json.JSONEncoder(separators=(",", ":")).encode
+
+    def write_page(self, _json_body: dict) -> None:
+        """ Writes every comment of a page of raw comments as its own line.
+
+            :param _json_body: the request response .json()
+        """
+
+        encode = self._encode
+        self._file.write("".join([encode(comment) + "\n" for comment in _json_body["comments"]]))
+
+
+# the output formats of the cleaned comments and their file extensions
+CHAT_WRITERS = {"txt": (ChatTextWriter, "txt"), "csv": (ChatCSVWriter, "csv"), "tsv": (ChatTSVWriter, "tsv")}
+
+# the raw output formats and their file extensions
+RAW_WRITERS = {"json": (RawJSONWriter, "json"), "jsonl": (JSONLinesWriter, "jsonl")}
@@ -0,0 +1,35 @@
+"""
+Shared fixtures of the tests: a local mock Twitch API (see `benchmarks.mock_twitch`), which pyvod is pointed at.
+
+Run the tests from the root directory via 'python -m pytest'.
+"""
+
+
+import pytest
+
+import pyvod
+from benchmarks.mock_twitch import MockTwitchServer, SyntheticChat
+
+
+@pytest.fixture(scope="session")
+def mock_twitch():
+    """ A mock Twitch API serving a synthetic chat of 1500 comments (25 pages) for every VOD ID. """
+
+    with MockTwitchServer(SyntheticChat(1500, length=3600), page_size=60) as server:
+        pyvod.set_api_base_url(server.url)
+        yield server
+
+
+@pytest.fixture
+def client(mock_twitch):
+    """ A fresh `TwitchClient` (without a cache) for the mock Twitch API. """
+
+    client = pyvod.TwitchClient()
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def reference(mock_twitch, client):
+    """ The comments of the mock VOD, as downloaded serially. """
+    return pyvod.VOD("1", client=client).get_vodchat().get_comments()
@@ -0,0 +1,30 @@
+import random
+
+import pytest
+
+from pyvod.analytics import ChatAnalytics
+
+
+def test_numpy_and_pure_python_are_identical():
+    pytest.importorskip("numpy")
+
+    rnd = random.Random(3)
+    offsets = [int(rnd.random() ** 3 * 14400) for _ in range(100000)] + [7200 + rnd.randrange(40) for _ in range(3000)]
+    names = ["user{}".format(rnd.randrange(900)) for _ in offsets]
+
+    results = list()
+    for use_numpy in (True, False):
+        analytics = ChatAnalytics(use_numpy=use_numpy, batch_size=10000)
+        analytics.add(offsets, names)
+        results.append((analytics.per_minute(), analytics.top_chatters(5), analytics.bursts(threshold=2.0)))
+
+    assert results[0][2]  # there are bursts to compare
+    assert results[0] == results[1]  # exactly, the burst scores included
+
+
+def test_from_vodchat(client, reference):
+    import pyvod
+
+    analytics = ChatAnalytics.from_vodchat(pyvod.VOD("1", client=client).get_vodchat(), shards=2)
+    assert analytics.total == len(reference)
+    assert analytics.unique_chatters == len({comment.name for comment in reference})
@@ -0,0 +1,87 @@
+import pytest
+
+import pyvod
+from pyvod import SQLiteArchive
+from pyvod.utils import parse_offset
+
+
+def _vodchat(client):
+    return pyvod.VOD("1", client=client).get_vodchat()
+
+
+@pytest.fixture
+def archive(tmp_path):
+    with SQLiteArchive(tmp_path / "archive.db", batch_size=100) as archive:
+        yield archive
+
+
+def _comments(archived: list) -> list:
+    return [(comment.timestamp, comment.posted_at, comment.name, comment.message) for comment in archived]
+
+
+def test_add_vodchat(client, reference, archive):
+    assert archive.add_vodchat(_vodchat(client)) == len(reference)  # downloaded page by page
+    assert archive.count() == archive.count("1") == len(reference)
+    assert _comments(archive.get_comments(vod_id="1")) == [tuple(comment) for comment in reference]
+
+    vod = archive.vods()["1"]
+    assert (vod.title, vod.channel_name) == ("Mock VOD 1", "MockChannel")
+
+
+def test_adding_a_vod_again_replaces_its_comments(client, reference, archive):
+    archive.add_vodchat(_vodchat(client))
+
+    vodchat = _vodchat(client)
+    vodchat.get_comments()  # archived from the raw comments this time
+    assert archive.add_vodchat(vodchat) == len(reference)
+    assert archive.count() == len(reference)
+    assert list(archive.vods()) == ["1"]
+
+
+def test_failed_download_keeps_the_archived_comments(client, reference, archive):
+    archive.add_vodchat(_vodchat(client))
+
+    def rows():
+        yield "2021-04-20T12:00:00Z", 0, "user", "the first comment of the new download"
+        raise pyvod.TwitchApiException("the download failed")
+
+    with pytest.raises(pyvod.TwitchApiException):
+        archive.add_comments("1", rows=rows())
+    assert _comments(archive.get_comments(vod_id="1")) == [tuple(comment) for comment in reference]
+    assert archive.search("download") == []
+
+
+def test_get_comments_in_a_time_window(client, reference, archive):
+    archive.add_vodchat(_vodchat(client))
+
+    expected = [tuple(comment) for comment in reference if 600 <= parse_offset(comment.posted_at) < 1200]
+    assert expected and _comments(archive.get_comments(vod_id="1", start=600, end=1200)) == expected
+    assert _comments(archive.get_comments(start=600, end=1200, limit=5)) == expected[:5]
+    assert archive.get_comments(vod_id="2") == []
+
+
+def test_search(client, reference, archive):
+    archive.add_vodchat(_vodchat(client))
+
+    found = archive.search("pogchamp", limit=None)
+    assert found and len(found) == sum("PogChamp" in comment.message for comment in reference)
+
+    name = reference[0].name
+    assert all(comment.name == name and "gg" in comment.message.split()
+               for comment in archive.search("gg", name=name, limit=None))
+    assert all(600 <= parse_offset(comment.posted_at) < 1200 for comment in archive.search("gg", start=600, end=1200))
+    assert len(archive.search("gg", limit=3)) == 3
+
+
+def test_search_with_fts5(client, reference, archive):
+    if not archive.fts:
+        pytest.skip("SQLite has been compiled without FTS5")
+    archive.add_vodchat(_vodchat(client))
+
+    assert all("no way" in comment.message for comment in archive.search('"no way"', limit=None))
+    assert len(archive.search("hello NOT world", limit=None)) == sum(
+        "hello" in comment.message.split() and "world" not in comment.message.split() for comment in reference)
+    assert archive.search("pog*", limit=None) == archive.search("pogchamp", limit=None)
+
+    with pytest.raises(ValueError, match="'\"no way'"):
+        archive.search('"no way')
@@ -0,0 +1,47 @@
+import asyncio
+
+import pyvod
+from pyvod.analytics import ChatAnalytics
+
+
+def _run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+def test_get_comments_equals_serial(client, reference):
+    async def download():
+        vod = await pyvod.AsyncVOD.create("1", client=client)
+        return await vod.get_vodchat().get_comments()
+
+    assert _run(download()) == reference
+
+
+def test_iter_comments_and_window(client, reference):
+    async def download():
+        vod = await pyvod.AsyncVOD.create("1", client=client)
+        vodchat = vod.get_vodchat()
+        comments = [comment async for comment in vodchat]
+        window = [comment async for comment in vodchat.iter_comments(start="10:00", end="20:00")]
+        return vodchat, comments, window
+
+    vodchat, comments, window = _run(download())
+    assert comments == reference
+    assert not vodchat.raw_comments  # like VODChat.iter_comments(), the raw JSON is not kept by default
+    sync_window = pyvod.VOD("1", client=client).get_vodchat().get_comments(start="10:00", end="20:00")
+    assert window == sync_window and 0 < len(window) < len(reference)
+
+
+def test_get_comments_compact(client, reference):
+    async def download():
+        vod = await pyvod.AsyncVOD.create("1", client=client)
+        return await vod.get_vodchat().get_comments(compact=True, keep_raw=False)
+
+    assert list(_run(download())) == reference
+
+
+def test_inherited_sync_methods(client, reference, tmp_path):
+    vod = _run(pyvod.AsyncVOD.create("1", client=client))
+
+    assert vod.get_vodchat().to_file(dirpath=tmp_path, stream=True) == len(reference)
+    assert len(list(vod.get_vodchat().follow(interval=0.01, timeout=0.05))) == len(reference)
+    assert ChatAnalytics.from_vodchat(vod.get_vodchat()).total == len(reference)
@@ -0,0 +1,67 @@
+import time
+
+import pyvod
+from pyvod import ResponseCache, TwitchClient
+
+
+def _page(cursor: str = None, size: int = 10) -> dict:
+    page = {"comments": [{"_id": "x" * size}]}
+    if cursor:
+        page["_next"] = cursor
+    return page
+
+
+def test_second_download_hits_the_cache(mock_twitch, reference, tmp_path):
+    client = TwitchClient(cache=ResponseCache(tmp_path))
+    try:
+        assert pyvod.VOD("1", client=client).get_vodchat().get_comments() == reference
+        assert len(client.cache) == 1 + 24  # the VOD information and every page of comments but the last one
+
+        requests = mock_twitch.requests
+        assert pyvod.VOD("1", client=client).get_vodchat().get_comments() == reference
+        assert mock_twitch.requests - requests == 1  # only the last page
+    finally:
+        client.close()
+
+
+def test_last_page_is_never_cached(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.put(("comments", "1", "Mg=="), _page())
+    assert len(cache) == 0 and cache.get(("comments", "1", "Mg==")) is None
+
+    cache.put(("comments", "1", ""), _page(cursor="Mg=="))
+    assert cache.get(("comments", "1", "")) == _page(cursor="Mg==")
+
+    # the VOD information has no cursor at all
+    cache.put(("videos", "1", ""), {"title": "VOD"})
+    assert cache.get(("videos", "1", "")) == {"title": "VOD"}
+
+
+def test_entries_expire(tmp_path):
+    cache = ResponseCache(tmp_path, metadata_ttl=0.1)
+    cache.put(("videos", "1", ""), {"title": "VOD"})
+    cache.put(("comments", "1", ""), _page(cursor="Mg=="))
+    time.sleep(0.15)
+
+    assert cache.get(("videos", "1", "")) is None
+    assert cache.get(("comments", "1", "")) is not None  # the comment pages have their own, long TTL
+    assert len(cache) == 1 and len(list(tmp_path.glob("*.json"))) == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(tmp_path)
+    for cursor in "abcd":
+        cache.put(("comments", "1", cursor), _page(cursor="next", size=1000))
+        time.sleep(0.01)
+    size = cache.size // 4
+
+    cache.max_size = size * 4
+    cache.get(("comments", "1", "a"))  # "a" is now the most recently used one
+    time.sleep(0.01)
+    cache.put(("comments", "1", "e"), _page(cursor="next", size=1000))
+
+    assert cache.size <= cache.max_size
+    assert [cache.get(("comments", "1", cursor)) is not None for cursor in "abcde"] == [True, False, False, True, True]
+
+    # the index is rebuilt from the files
+    assert ResponseCache(tmp_path).size == cache.size
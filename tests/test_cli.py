@@ -0,0 +1,53 @@
+import io
+import json
+
+import pytest
+
+from pyvod import cli
+
+
+def _main(tmp_path, *args) -> int:
+    return cli.main(["-d", str(tmp_path), "-progress-interval", "0"] + list(args))
+
+
+def test_read_vod_ids_from_file(tmp_path):
+    path = tmp_path / "vods.txt"
+    path.write_text("# the VODs of last week\n222\n\n  333  \n111\n", encoding="utf-8")
+    assert cli.read_vod_ids([["111", "222"], ["444"]], file=str(path)) == ["111", "222", "444", "333"]
+
+
+def test_read_vod_ids_from_stdin(monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("111\n# not a VOD\n222\n"))
+    assert cli.read_vod_ids([], file="-") == ["111", "222"]
+
+
+def test_summary_report(mock_twitch, tmp_path):
+    assert _main(tmp_path, "-vod", "1", "-stream") == 0
+
+    summary = json.loads((tmp_path / "pyvod_summary.json").read_text(encoding="utf-8"))
+    assert (summary["vods"], summary["failed"], summary["interrupted"]) == (1, 0, False)
+    assert summary["comments"] == 1500 and summary["pages"] == 25
+    result, = summary["results"]
+    assert (result["vod_id"], result["status"], result["comments"], result["pages"]) == ("1", "ok", 1500, 25)
+    assert (tmp_path / "VOD_1_CHAT.txt").exists() and (tmp_path / "VOD_1_RAW.json").exists()
+
+
+def test_exit_code_when_a_vod_fails(mock_twitch, tmp_path, capsys):
+    summary_path = tmp_path / "summary.json"
+    assert _main(tmp_path, "-vod", "0", "1", "-w", "2", "-summary", str(summary_path)) == 1
+
+    summary = json.loads(summary_path.read_text(encoding="utf-8"))
+    assert (summary["vods"], summary["failed"]) == (2, 1)
+    failed = next(result for result in summary["results"] if result["vod_id"] == "0")
+    assert failed["status"] == "failed" and "404" in failed["error"]
+    assert "- 0: TwitchApiException" in capsys.readouterr().out
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["VOD_1_CHAT.txt", "VOD_1_RAW.json", "summary.json"]
+
+
+def test_follow_interval(capsys):
+    assert cli._parse_args(["-vod", "1", "-follow"]).follow == 30.0
+    assert cli._parse_args(["-vod", "1", "-follow", "0.5"]).follow == 0.5
+    for interval in ("0", "-1"):
+        with pytest.raises(SystemExit):
+            cli._parse_args(["-vod", "1", "-follow", interval])
+    assert "-follow INTERVAL has to be greater than 0" in capsys.readouterr().err
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+import pyvod
+from pyvod import TwitchApiException, TwitchClient
+from pyvod.client import TokenBucket
+
+
+@pytest.fixture
+def make_client(mock_twitch):
+    """ Creates `TwitchClient`s for the mock Twitch API, which are closed after the test. """
+
+    clients = list()
+
+    def make(**kwargs) -> TwitchClient:
+        clients.append(TwitchClient(**kwargs))
+        return clients[-1]
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def _vod_url(mock_twitch) -> str:
+    return mock_twitch.url + "/videos/1"
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_transient_errors(mock_twitch, make_client, status):
+    client = make_client(max_retries=3, backoff_factor=0.01)
+    mock_twitch.fail_next(status, times=2)
+    requests = mock_twitch.requests
+    assert client.get_json(_vod_url(mock_twitch))["title"] == "Mock VOD 1"
+    assert mock_twitch.requests - requests == 3
+
+
+def test_honours_retry_after(mock_twitch, make_client):
+    client = make_client(max_retries=1, backoff_factor=0)  # without the header, there would be no delay
+    mock_twitch.fail_next(429, retry_after=0.3)
+    start = time.monotonic()
+    client.get_json(_vod_url(mock_twitch))
+    assert time.monotonic() - start >= 0.3
+
+
+def test_gives_up_after_max_retries(mock_twitch, make_client):
+    client = make_client(max_retries=2, backoff_factor=0.01)
+    mock_twitch.fail_next(503, times=3)
+    requests = mock_twitch.requests
+    with pytest.raises(TwitchApiException, match="503"):
+        client.get_json(_vod_url(mock_twitch))
+    assert mock_twitch.requests - requests == 3  # the request and its 2 retries
+
+
+def test_does_not_retry_client_errors(mock_twitch, make_client):
+    client = make_client(max_retries=3, backoff_factor=0.01)
+    requests = mock_twitch.requests
+    with pytest.raises(TwitchApiException, match="404"):
+        client.get_json(mock_twitch.url + "/videos/0")
+    assert mock_twitch.requests - requests == 1
+
+
+def test_token_bucket_follows_the_ratelimit_headers():
+    bucket = TokenBucket(capacity=800)
+    bucket.update({"Ratelimit-Limit": "100", "Ratelimit-Remaining": "2", "Ratelimit-Reset": "0"})
+    assert bucket.capacity == 100
+    assert bucket._tokens <= 2
+
+    # a depleted bucket waits until the reset
+    bucket.update({"Ratelimit-Limit": "100", "Ratelimit-Remaining": "0",
+                   "Ratelimit-Reset": str(time.time() + 0.3)})
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.25
+
+    # incomplete or invalid headers are ignored
+    bucket.update({"Ratelimit-Limit": "5"})
+    bucket.update({"Ratelimit-Limit": "x", "Ratelimit-Remaining": "1"})
+    assert bucket.capacity == 100
+
+
+def test_client_syncs_its_bucket_with_the_responses(mock_twitch, make_client):
+    client = make_client(rate_limiter=TokenBucket(capacity=10))
+    pyvod.VOD("1", client=client).vod_title
+    assert client.rate_limiter.capacity == mock_twitch.rate_limit
@@ -0,0 +1,58 @@
+import json
+import sys
+
+import pytest
+
+from pyvod import decoder
+
+
+PAGE = {"comments": [{"_id": "1", "created_at": "2021-04-20T12:00:00Z", "content_offset_seconds": 1.5,
+                      "commenter": {"display_name": "User", "name": "user", "bio": None},
+                      "message": {"body": "hello äöü", "fragments": [{"text": "hello"}]}}],
+        "_next": "MQ=="}
+LEAN_PAGE = {"comments": [{"_id": "1", "created_at": "2021-04-20T12:00:00Z", "content_offset_seconds": 1.5,
+                           "commenter": {"display_name": "User"}, "message": {"body": "hello äöü"}}],
+             "_next": "MQ=="}
+DATA = json.dumps(PAGE).encode("utf-8")
+
+
+@pytest.fixture(autouse=True)
+def default_decoder():
+    yield
+    decoder.set_json_decoder()
+
+
+@pytest.fixture
+def without_simdjson(monkeypatch):
+    """ Pretends that pysimdjson is not installed. """
+
+    monkeypatch.setitem(sys.modules, "simdjson", None)  # `import simdjson` raises an ImportError
+    monkeypatch.delattr(decoder._local, "parser", raising=False)
+
+
+@pytest.mark.parametrize("name", decoder.DECODERS)
+def test_decoders(name):
+    if decoder._import(name) is None:
+        pytest.skip("{} is not installed".format(name))
+    assert decoder.set_json_decoder(name) == decoder.get_json_decoder() == name
+    assert decoder.loads(DATA) == PAGE
+
+    lean = decoder.loads_lean(DATA)
+    assert lean == (LEAN_PAGE if name == "simdjson" else PAGE)
+    assert decoder.loads_lean(json.dumps({"comments": []}).encode("utf-8")) == {"comments": []}
+
+
+def test_failed_set_keeps_the_previous_decoder(without_simdjson):
+    decoder.set_json_decoder("json")
+    with pytest.raises(ValueError):
+        decoder.set_json_decoder("yaml")
+    with pytest.raises(ImportError, match="pysimdjson"):
+        decoder.set_json_decoder("simdjson")
+
+    assert decoder.get_json_decoder() == "json"
+    assert decoder.loads(DATA) == decoder.loads_lean(DATA) == PAGE
+
+
+def test_default_without_simdjson(without_simdjson):
+    assert decoder.set_json_decoder() != "simdjson"
+    assert decoder.loads_lean(DATA) == PAGE  # the whole page, as only simdjson can decode a part of it
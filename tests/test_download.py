@@ -0,0 +1,67 @@
+import pytest
+
+import pyvod
+from pyvod import TwitchApiException, TwitchClient
+from pyvod.vodchat import VODChat
+
+
+def _vodchat(client):
+    return pyvod.VOD("1", client=client).get_vodchat()
+
+
+def test_sharded_equals_serial(client, reference):
+    assert _vodchat(client).get_comments(shards=4) == reference
+
+
+def test_sharded_iter_comments_equals_serial(client, reference, monkeypatch):
+    monkeypatch.setattr(VODChat, "shard_buffer", 2)  # the shards have to wait for the merged pages
+    assert list(_vodchat(client).iter_comments(shards=3)) == reference
+
+
+def test_sharded_window_equals_serial(client):
+    serial = _vodchat(client).get_comments(start="5:00", end="40:00")
+    assert _vodchat(client).get_comments(shards=3, start="5:00", end="40:00") == serial
+
+
+def test_processes_equals_serial(client, reference):
+    assert _vodchat(client).get_comments(processes=2) == reference
+    assert list(_vodchat(client).iter_comments(processes=2)) == reference
+
+
+def test_compact_equals_serial(client, reference):
+    assert list(_vodchat(client).get_comments(compact=True, keep_raw=False)) == reference
+
+
+class _FailingClient(TwitchClient):
+    """ Fails every request of a comment page after the first `pages`. """
+
+    def __init__(self, pages: int):
+        super().__init__(max_retries=0)
+        self.pages = pages
+
+    def get_json(self, url: str, headers: dict = None, params: dict = None, **kwargs) -> dict:
+        if url.endswith("/comments"):
+            self.pages -= 1
+            if self.pages < 0:
+                raise TwitchApiException("Twitch API responded with 'boom' (status code 500). Expected 200 (OK).")
+        return super().get_json(url=url, headers=headers, params=params, **kwargs)
+
+
+def test_checkpoint_truncate_and_resume(mock_twitch, client, reference, tmp_path):
+    with pytest.raises(TwitchApiException):
+        _vodchat(_FailingClient(pages=10)).get_comments(checkpoint=tmp_path, checkpoint_interval=4)
+
+    path = tmp_path / "VOD_1_CHECKPOINT.jsonl"
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1 + 10  # the header and every fetched page
+
+    # a page cut off in the middle, as if the process had been killed while writing it
+    with path.open(mode="a", encoding="utf-8") as file:
+        file.write('{"comments": [')
+
+    requests = mock_twitch.requests
+    vodchat = _vodchat(client)
+    assert vodchat.get_comments(checkpoint=tmp_path, checkpoint_interval=4) == reference
+    # continued after the last page of the checkpoint (plus the request of the VOD information)
+    assert mock_twitch.requests - requests == 25 - 10 + 1
+    assert len(vodchat.raw_comments) == 25
+    assert not path.exists()
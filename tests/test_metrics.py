@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+import pyvod
+from pyvod import metrics as _metrics
+
+
+@pytest.fixture
+def metrics():
+    yield pyvod.enable_metrics()
+    pyvod.disable_metrics()
+
+
+def test_counters(mock_twitch, client, metrics, tmp_path):
+    vodchat = pyvod.VOD("1", client=client).get_vodchat()
+    vodchat.get_comments()
+    vodchat.to_file(dirpath=tmp_path)
+
+    assert metrics.requests == {200: 1 + 25}  # the VOD information and the pages of comments
+    assert (metrics.pages, metrics.comments, metrics.retries) == (25, 1500, 0)
+    assert metrics.request_bytes > 0 and metrics.request_seconds > 0
+    assert sum(metrics.latency_buckets) <= 26
+
+    assert metrics.stage_calls["request"] == metrics.stage_calls["decode"] == 26
+    assert metrics.stage_calls["clean"] == 25
+    for name in ("metadata", "get_comments", "to_file", "write"):
+        assert metrics.stage_calls[name] == 1
+        assert metrics.stage_seconds[name] >= 0 and metrics.stage_cpu_seconds[name] >= 0
+    # the stages overlap, the whole download includes the cleaning of its pages
+    assert metrics.stage_seconds["get_comments"] >= metrics.stage_seconds["clean"]
+
+    data = json.loads(metrics.to_json())
+    assert (data["requests"], data["requests_by_status"], data["pages"]) == (26, {"200": 26}, 25)
+    assert data["stages"]["clean"]["calls"] == 25
+
+    metrics.reset()
+    assert (metrics.requests, metrics.pages, metrics.stage_calls) == ({}, 0, {})
+
+
+def test_retries_are_counted(mock_twitch, metrics):
+    client = pyvod.TwitchClient(backoff_factor=0.01)
+    mock_twitch.fail_next(503)
+    pyvod.VOD("1", client=client).vod_title
+    client.close()
+
+    assert metrics.requests == {503: 1, 200: 1}
+    assert metrics.retries == 1
+
+
+def test_hooks(client, metrics):
+    events = list()
+
+    def hook(event: str, data: dict) -> None:
+        events.append((event, data))
+
+    metrics.add_hook(hook)
+    pyvod.VOD("1", client=client).get_vodchat().get_comments()
+
+    kinds = [event for event, _ in events]
+    assert kinds.count("request") == 26 and kinds.count("page") == 25
+    pages = [data for event, data in events if event == "page"]
+    assert sum(data["comments"] for data in pages) == 1500 and pages[0]["vod_id"] == "1"
+    request = next(data for event, data in events if event == "request")
+    assert request["status"] == 200 and request["url"].endswith("/videos/1") and request["bytes"] > 0
+    stage = next(data for event, data in events if event == "stage" and data["stage"] == "get_comments")
+    assert stage["seconds"] > 0 and stage["cpu_seconds"] >= 0
+
+    metrics.remove_hook(hook)
+    amount = len(events)
+    pyvod.VOD("1", client=client).vod_title
+    assert len(events) == amount
+
+
+def test_prometheus_text(client, metrics, tmp_path):
+    pyvod.VOD("1", client=client).get_vodchat().get_comments()
+    text = metrics.to_prometheus()
+
+    samples = dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+    assert samples['pyvod_requests_total{status="200"}'] == "26"
+    assert samples["pyvod_pages_total"] == "25" and samples["pyvod_comments_total"] == "1500"
+    assert samples["pyvod_retries_total"] == "0"
+    assert samples['pyvod_request_duration_seconds_bucket{le="+Inf"}'] == samples[
+        "pyvod_request_duration_seconds_count"] == "26"
+    buckets = [int(samples['pyvod_request_duration_seconds_bucket{{le="{}"}}'.format(bound)])
+               for bound in metrics.LATENCY_BUCKETS]
+    assert buckets == sorted(buckets)  # cumulative
+    assert 'pyvod_stage_seconds_total{stage="clean"}' in samples
+    assert "# TYPE pyvod_request_duration_seconds histogram" in text
+    assert "# TYPE pyvod_requests_total counter" in text
+
+    metrics.save(tmp_path / "metrics.prom")
+    metrics.save(tmp_path / "metrics.json")
+    assert (tmp_path / "metrics.prom").read_text(encoding="utf-8") == text
+    assert json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))["pages"] == 25
+
+
+def test_disabled_by_default(client):
+    assert pyvod.get_metrics() is None
+    assert _metrics.stage("request") is _metrics._NO_STAGE
+
+    metrics = pyvod.enable_metrics()
+    pyvod.disable_metrics()
+    pyvod.VOD("1", client=client).vod_title
+    assert metrics.requests == {}
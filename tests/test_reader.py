@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+import pyvod
+from pyvod import ChatReader
+from pyvod.utils import parse_offset
+
+
+@pytest.fixture
+def exported(client, tmp_path):
+    """ The mock VOD exported via `to_file()`: the .txt file, the raw .jsonl file and the VOD's `created_at`. """
+
+    vodchat = pyvod.VOD("1", client=client).get_vodchat()
+    vodchat.get_comments()
+    vodchat.to_file(dirpath=tmp_path, raw_format="jsonl")
+    return tmp_path / "VOD_1_CHAT.txt", tmp_path / "VOD_1_RAW.jsonl", vodchat._basic_data.created_at
+
+
+def test_reads_the_txt_file(exported, reference):
+    with ChatReader(exported[0]) as reader:
+        assert len(reader) == len(reference)
+        assert list(reader) == reference
+
+
+def test_index_is_saved_and_reloaded(exported, reference, monkeypatch):
+    path = exported[0]
+    with ChatReader(path) as reader:
+        index_path = reader.index_path
+    assert index_path == path.with_name("VOD_1_CHAT.txt.idx") and index_path.exists()
+    built_at = index_path.stat().st_mtime_ns
+
+    def build_index(self):
+        raise AssertionError("the index should have been reloaded")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ChatReader, "_build_index", build_index)
+        with ChatReader(path) as reader:
+            assert reader[-1] == reference[-1]
+    assert index_path.stat().st_mtime_ns == built_at
+
+    # a changed file (or a different bucket size) gets a new index
+    with path.open(mode="a", encoding="utf-8") as file:
+        file.write("\n")
+    with ChatReader(path) as reader:
+        assert list(reader) == reference
+    with ChatReader(path, bucket_size=10) as reader:
+        assert list(reader.between(600, 660)) == [comment for comment in reference
+                                                  if 600 <= parse_offset(comment.posted_at) < 660]
+
+
+def test_between(exported, reference):
+    with ChatReader(exported[0]) as reader:
+        expected = [comment for comment in reference if 300 <= parse_offset(comment.posted_at) < 600]
+        assert expected and list(reader.between("5:00", "10:00")) == expected
+        assert list(reader.between(start=3540)) == [comment for comment in reference
+                                                    if parse_offset(comment.posted_at) >= 3540]
+        assert list(reader.between(end=30)) == [comment for comment in reference
+                                                if parse_offset(comment.posted_at) < 30]
+        assert list(reader.between("2:00:00")) == []
+        assert reader.index_at(0) == 0 and reader.index_at("10:00:00") == len(reader)
+
+
+def test_indexes_and_slices(exported, reference):
+    with ChatReader(exported[0]) as reader:
+        assert reader[0] == reference[0] and reader[-1] == reference[-1]
+        assert reader[-len(reference)] == reference[0]
+        assert reader[10:20] == reference[10:20]
+        assert reader[::100] == reference[::100]
+        assert reader[-5:] == reference[-5:]
+        assert reader[2000:] == []
+        for index in (len(reference), -len(reference) - 1):
+            with pytest.raises(IndexError):
+                reader[index]
+
+
+def test_reads_the_jsonl_file(exported, reference):
+    _, jsonl_path, created_at = exported
+    with ChatReader(jsonl_path, created_at=created_at) as reader:
+        assert list(reader) == reference
+        assert list(reader.between(300, 600)) == [comment for comment in reference
+                                                  if 300 <= parse_offset(comment.posted_at) < 600]
+
+    # without the `created_at` of the VOD, the `posted_at` comes from the `content_offset_seconds`
+    with ChatReader(jsonl_path, rebuild=True) as reader:
+        assert [(comment.name, comment.message) for comment in reader] == [(comment.name, comment.message)
+                                                                           for comment in reference]
+
+
+@pytest.mark.parametrize("name", ["VOD_1_RAW.json", "VOD_1_CHAT.csv", "VOD_1_CHAT.txt.gz"])
+def test_unsupported_files(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"{}")
+    with pytest.raises(ValueError, match=name.rsplit(".", 1)[-1]):
+        ChatReader(path)
+    assert os.listdir(str(tmp_path)) == [name]  # no index
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from benchmarks.mock_twitch import FIRST_VOD_ID, LiveChat
+from pyvod import ChannelSync
+
+
+VOD_IDS = [str(FIRST_VOD_ID + index) for index in range(5)]
+
+
+@pytest.fixture
+def channel(mock_twitch, monkeypatch):
+    """ Lets the channels of the mock Twitch API list 3 VODs, returns a function to change that amount. """
+
+    def set_vods(amount: int) -> None:
+        monkeypatch.setattr(mock_twitch, "vods", amount)
+
+    set_vods(3)
+    return set_vods
+
+
+def test_first_sync(channel, client, tmp_path):
+    sync = ChannelSync(channel_id="12826", dirpath=tmp_path, client=client)
+    result = sync.sync()
+
+    assert result.downloaded == VOD_IDS[:3]  # oldest first
+    assert (result.listed, result.skipped, result.failed) == (3, 0, {})
+
+    manifest = json.loads(sync.manifest_path.read_text(encoding="utf-8"))
+    assert sorted(manifest["vods"]) == VOD_IDS[:3]
+    for vod_id, entry in manifest["vods"].items():
+        assert (entry["status"], entry["comments"], entry["title"]) == ("complete", 1500, "Mock VOD " + vod_id)
+        assert sorted(entry["files"]) == ["VOD_{}_CHAT.txt".format(vod_id), "VOD_{}_RAW.json".format(vod_id)]
+        assert all((tmp_path / name).stat().st_size == info["size"] for name, info in entry["files"].items())
+        assert sync.is_complete(vod_id, verify=True)
+
+
+def test_second_sync_only_skips(channel, mock_twitch, client, tmp_path):
+    ChannelSync(channel_id="12826", dirpath=tmp_path, client=client).sync()
+
+    sync = ChannelSync(channel_id="12826", dirpath=tmp_path, client=client)  # reloads the manifest
+    requests = mock_twitch.requests
+    result = sync.sync()
+    assert (result.listed, result.downloaded, result.skipped, result.failed) == (3, [], 3, {})
+    assert mock_twitch.requests - requests == 1  # the listing
+
+    # a VOD whose files have changed is downloaded again
+    (tmp_path / "VOD_{}_CHAT.txt".format(VOD_IDS[1])).write_text("", encoding="utf-8")
+    assert not sync.is_complete(VOD_IDS[1])
+    assert sync.sync().downloaded == [VOD_IDS[1]]
+    assert sync.is_complete(VOD_IDS[1], verify=True)
+
+
+def test_listing_stops_at_the_archived_vods(channel, mock_twitch, client, tmp_path):
+    sync = ChannelSync(channel_id="12826", dirpath=tmp_path, client=client)
+    sync.sync()
+
+    channel(5)  # two new VODs
+    sync.page_size = 2
+    requests = mock_twitch.requests
+    result = sync.sync()
+    assert result.downloaded == VOD_IDS[3:]
+    assert (result.listed, result.skipped) == (4, 2)  # the second page already has an archived VOD
+    # two pages of the listing and the comments of the new VODs, whose information comes from the listing
+    assert mock_twitch.requests - requests == 2 + 2 * 25
+
+    assert [video["_id"] for video in sync.list_videos(full=True)] == ["v" + vod_id for vod_id in VOD_IDS[::-1]]
+
+
+def test_live_vod_is_downloaded_again(channel, mock_twitch, client, tmp_path, monkeypatch):
+    channel(2)
+    chat = mock_twitch.chat
+    monkeypatch.setattr(mock_twitch, "chat", LiveChat(chat, rate=0, initial=600))  # the newest VOD is still live
+
+    sync = ChannelSync(channel_id="12826", dirpath=tmp_path, client=client)
+    assert sync.sync().downloaded == VOD_IDS[:2]
+    entries = sync.manifest["vods"]
+    assert (entries[VOD_IDS[1]]["status"], entries[VOD_IDS[1]]["comments"]) == ("incomplete", 600)
+    assert entries[VOD_IDS[0]]["status"] == "complete"
+
+    # still live, so it is downloaded again
+    result = sync.sync()
+    assert (result.downloaded, result.skipped) == ([VOD_IDS[1]], 1)
+    assert entries[VOD_IDS[1]]["status"] == "incomplete"
+
+    # the broadcast has ended, the VOD is downloaded completely one last time
+    monkeypatch.setattr(mock_twitch, "chat", chat)
+    result = sync.sync()
+    assert (result.downloaded, result.skipped) == ([VOD_IDS[1]], 1)
+    assert (entries[VOD_IDS[1]]["status"], entries[VOD_IDS[1]]["comments"]) == ("complete", 1500)
+    assert sync.sync().downloaded == []
+
+
+def test_interrupted_vod_is_downloaded_again(channel, client, tmp_path):
+    sync = ChannelSync(channel_id="12826", dirpath=tmp_path, client=client)
+    sync.sync()
+    sync.manifest["vods"][VOD_IDS[0]]["status"] = "incomplete"  # as left behind by an interrupted sync
+    sync._save_manifest()
+
+    sync = ChannelSync(channel_id="12826", dirpath=tmp_path, client=client)
+    result = sync.sync()
+    assert (result.downloaded, result.skipped) == ([VOD_IDS[0]], 2)
+    assert sync.is_complete(VOD_IDS[0], verify=True)
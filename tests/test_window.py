@@ -0,0 +1,48 @@
+import pytest
+
+import pyvod
+
+
+def _vodchat(client):
+    return pyvod.VOD("1", client=client).get_vodchat()
+
+
+@pytest.fixture
+def offsets(client) -> list:
+    """ The `content_offset_seconds` of every comment of the mock VOD, in order. """
+
+    vodchat = _vodchat(client)
+    vodchat.get_comments()
+    return [comment["content_offset_seconds"] for page in vodchat.raw_comments.values()
+            for comment in page["comments"]]
+
+
+def test_window_starting_in_the_middle_of_a_page(mock_twitch, client, reference, offsets):
+    requests = mock_twitch.requests
+    # the pages hold 60 comments each, so the window starts in the middle of the 2nd page
+    assert _vodchat(client).get_comments(start=offsets[90], end=offsets[250]) == reference[90:250]
+    # only the pages of the window are requested (plus the VOD information), not the ones before it
+    assert mock_twitch.requests - requests == 1 + 3
+
+
+def test_window_end_is_exclusive(client, reference, offsets):
+    assert _vodchat(client).get_comments(start=offsets[10], end=offsets[11]) == reference[10:11]
+    assert list(_vodchat(client).iter_comments(end=offsets[3])) == reference[:3]
+
+
+def test_window_as_hours_minutes_seconds(client, reference, offsets):
+    expected = [comment for comment, offset in zip(reference, offsets) if 300 <= offset < 600]
+    assert _vodchat(client).get_comments(start="5:00", end="0:10:00") == expected
+
+
+def test_empty_window_returns_none(client, offsets):
+    vodchat = _vodchat(client)
+    assert vodchat.get_comments(start=offsets[5] + 0.0005, end=offsets[6]) is None
+    assert vodchat.comments is None
+
+
+def test_invalid_window(client):
+    with pytest.raises(ValueError):
+        _vodchat(client).get_comments(start="10:00", end="5:00")
+    with pytest.raises(ValueError):
+        _vodchat(client).get_comments(start="-1")
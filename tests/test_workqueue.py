@@ -0,0 +1,109 @@
+import time
+
+from pyvod import WorkQueue
+
+
+def test_failed_vod_waits_for_the_retry_delay(tmp_path):
+    with WorkQueue(tmp_path / "queue.db", retry_delay=0.2, max_attempts=2) as queue:
+        queue.add(["1", "2"])
+        job = queue.claim(worker="a")
+        assert job.vod_id == "1"
+        queue.fail(job, error="404")
+
+        # not claimed again right away, the other VOD comes first
+        assert queue.claim(worker="a").vod_id == "2"
+        assert queue.claim(worker="a") is None
+        assert 0 < queue.next_claim() <= 0.2
+
+        time.sleep(0.25)
+        job = queue.claim(worker="a")
+        assert (job.vod_id, job.attempts) == ("1", 2)
+        queue.fail(job)
+        assert queue.counts()["failed"] == 1
+
+
+def test_next_claim_ignores_sibling_workers(tmp_path):
+    with WorkQueue(tmp_path / "queue.db", lease=60) as queue:
+        queue.add(["1"])
+        job = queue.claim(worker="host-1-10")
+
+        assert 59 < queue.next_claim() <= 60  # waits for the lease of a worker of another process to run out
+        assert queue.next_claim(ignore_workers="host-1-") is None  # the other thread finishes it itself
+
+        queue.complete(job, comments=5)
+        assert queue.next_claim() is None
+
+
+def test_expired_lease_is_claimed_by_another_worker(tmp_path):
+    with WorkQueue(tmp_path / "queue.db", lease=0.1) as queue:
+        queue.add(["1"])
+        job = queue.claim(worker="a")
+        assert queue.claim(worker="b") is None  # still leased
+
+        time.sleep(0.15)  # worker "a" died, its lease runs out
+        taken = queue.claim(worker="b")
+        assert (taken.vod_id, taken.worker, taken.attempts) == ("1", "b", 2)
+
+        # the first worker has lost its lease, so it can neither renew nor complete the VOD anymore
+        assert not queue.heartbeat(job)
+        assert not queue.complete(job, comments=1)
+        assert queue.complete(taken, comments=2)
+        assert queue.jobs()[0]["comments"] == 2
+
+
+def test_expired_lease_counts_as_an_attempt(tmp_path):
+    with WorkQueue(tmp_path / "queue.db", lease=0.1, max_attempts=2) as queue:
+        queue.add(["1"])
+        assert queue.claim(worker="a").vod_id == "1"
+        time.sleep(0.15)
+        assert queue.claim(worker="b").attempts == 2  # the second and last attempt
+        queue.add(["2"])
+        assert queue.claim(worker="b").vod_id == "2"
+
+        time.sleep(0.15)  # both workers died
+        job = queue.claim(worker="c")
+        assert (job.vod_id, job.attempts) == ("2", 2)  # VOD "1" is given up on instead of getting a third attempt
+        assert queue.claim(worker="c") is None
+        failed = queue.jobs(status="failed")
+        assert [(failed_job["vod_id"], failed_job["attempts"]) for failed_job in failed] == [("1", 2)]
+        assert failed[0]["error"] and failed[0]["worker"] is None
+
+        time.sleep(0.15)
+        assert queue.requeue_expired() == 0
+        assert queue.counts() == {"queued": 0, "running": 0, "done": 0, "failed": 2}
+
+
+def test_heartbeat_keeps_the_lease(tmp_path):
+    with WorkQueue(tmp_path / "queue.db", lease=0.2) as queue:
+        queue.add(["1"])
+        job = queue.claim(worker="a")
+        with queue.keep_alive(job, interval=0.05) as keep_alive:
+            time.sleep(0.4)
+            assert queue.claim(worker="b") is None
+        assert not keep_alive.lost
+        assert queue.complete(job)
+
+
+def test_workers_never_claim_the_same_vod(tmp_path):
+    import threading
+
+    with WorkQueue(tmp_path / "queue.db") as queue:
+        queue.add(str(vod_id) for vod_id in range(40))
+
+    claimed = list()
+
+    def work(worker: str) -> None:
+        with WorkQueue(tmp_path / "queue.db") as own_queue:  # a connection per worker, like separate processes
+            job = own_queue.claim(worker=worker)
+            while job is not None:
+                claimed.append(job.vod_id)
+                own_queue.complete(job)
+                job = own_queue.claim(worker=worker)
+
+    threads = [threading.Thread(target=work, args=(str(worker),)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed, key=int) == [str(vod_id) for vod_id in range(40)]
@@ -0,0 +1,133 @@
+import csv
+import json
+import zlib
+
+import pytest
+
+import pyvod
+from pyvod import TwitchApiException
+from pyvod.vodcomment import VODSimpleComment
+from pyvod.writers import ChatCSVWriter, ChatTextWriter, ChatTSVWriter, JSONLinesWriter, RawJSONWriter, _column_layout
+
+
+COMMENTS = [VODSimpleComment("2021-04-20T12:00:{:02}.000Z".format(i), "0:00:{:02}".format(i), "user{}".format(i),
+                             "message {}".format(i)) for i in range(50)]
+# comments which have to be quoted in a .csv/.tsv file
+SPECIAL_COMMENTS = [VODSimpleComment("2021-04-20T12:01:00.000Z", "0:01:00", "user", 'a, "quoted"\tmessage'),
+                    VODSimpleComment("2021-04-20T12:01:01.000Z", "0:01:01", "üser", "two\nlines")]
+
+
+def test_flush_makes_gzip_readable(tmp_path):
+    path = tmp_path / "VOD_1_CHAT.txt.gz"
+    writer = ChatTextWriter(path, vod_id="1", basic_data=None, compression="gzip")
+    writer.write_comments(COMMENTS)
+    writer.flush()
+
+    # a sync flush point, i.e. everything written so far can be decompressed before the file is closed
+    text = zlib.decompressobj(31).decompress(writer.part_path.read_bytes()).decode("utf-8")
+    assert text.count("\n") == len(COMMENTS) + 1
+    writer.close(complete=False)
+
+
+def test_flush_makes_zstd_readable(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+
+    path = tmp_path / "VOD_1_RAW.jsonl.zst"
+    writer = JSONLinesWriter(path, compression="zstd")
+    writer.write_page({"comments": [{"_id": str(i)} for i in range(50)]})
+    writer.flush()
+
+    reader = zstandard.ZstdDecompressor().decompressobj()
+    assert reader.decompress(writer.part_path.read_bytes()).count(b"\n") == 50
+    writer.close()
+
+
+def test_files_are_renamed_once_complete(tmp_path):
+    path = tmp_path / "VOD_1_RAW.json"
+    with RawJSONWriter(path) as writer:
+        writer.write_page({"comments": [{"_id": "1"}]})
+        assert writer.part_path.exists() and not path.exists()
+    assert json.loads(path.read_text(encoding="utf-8")) == {"Batch 1": {"comments": [{"_id": "1"}]}}
+    assert not writer.part_path.exists()
+
+
+def test_incomplete_files_are_removed(tmp_path):
+    path = tmp_path / "VOD_1_RAW.json"
+    path.write_text("previous", encoding="utf-8")
+    with pytest.raises(RuntimeError):
+        with RawJSONWriter(path) as writer:
+            writer.write_page({"comments": [{"_id": "1"}]})
+            raise RuntimeError("the download failed")
+
+    # no truncated file which looks complete, and the previous complete file is kept
+    assert path.read_text(encoding="utf-8") == "previous"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_failed_stream_download_leaves_no_files(client, tmp_path):
+    vodchat = pyvod.VOD("0", client=client).get_vodchat()  # 404
+    with pytest.raises(TwitchApiException):
+        vodchat.to_file(dirpath=tmp_path, stream=True)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_default_txt_is_unchanged(client, reference, tmp_path):
+    vodchat = pyvod.VOD("1", client=client).get_vodchat()
+    vodchat.get_comments()
+    vodchat.to_file(dirpath=tmp_path, save_json=False)
+
+    # the format of `to_file()` before the writers and the columns were added
+    row = "{:<30} {:<10} {:<30} {}\n"
+    basic_data = vodchat._basic_data
+    expected = row.format("Created at", "Posted at", "User", "Message") + "".join(
+        row.format(*comment) for comment in reference) + (
+        "\n\n\n\nDate of Stream: {} - {} ({})\n\tStream length: {} hours\nStreamer: {}\n\tChannel ID: {}\n"
+        "\tChannel views: {}\n\tFollowers: {}\n\tBroadcaster type: {}\nVOD ID: 1\nAmount of comments: {}\n"
+        .format(basic_data.created_at[:10], basic_data.title, basic_data.game, basic_data.vod_length,
+                basic_data.channel_name, basic_data.channel_id, basic_data.channel_views,
+                basic_data.channel_followers, basic_data.channel_type, len(reference)))
+    assert (tmp_path / "VOD_1_CHAT.txt").read_bytes() == expected.encode("utf-8")
+    assert list(tmp_path.iterdir()) == [tmp_path / "VOD_1_CHAT.txt"]
+
+
+@pytest.mark.parametrize("writer_class, delimiter", [(ChatCSVWriter, ","), (ChatTSVWriter, "\t")])
+def test_csv_and_tsv(tmp_path, writer_class, delimiter):
+    path = tmp_path / "VOD_1_CHAT.csv"
+    with writer_class(path) as writer:
+        writer.write_comments(COMMENTS + SPECIAL_COMMENTS)
+        writer.write_note("not written")
+    assert writer.amount == len(COMMENTS) + 2
+
+    with path.open(mode="r", encoding="utf-8", newline="") as file:
+        rows = list(csv.reader(file, delimiter=delimiter))
+    assert rows == [["Created at", "Posted at", "User", "Message"]] + [list(comment)
+                                                                      for comment in COMMENTS + SPECIAL_COMMENTS]
+    assert path.read_text(encoding="utf-8").splitlines()[1] == delimiter.join(COMMENTS[0])
+
+
+def test_custom_columns(client, reference, tmp_path):
+    vodchat = pyvod.VOD("1", client=client).get_vodchat()
+    vodchat.get_comments()
+    columns = [("name", 8), "message"]
+    vodchat.to_file(dirpath=tmp_path, save_json=False, columns=columns)
+    vodchat.to_file(dirpath=tmp_path, save_json=False, columns=columns, chat_format="csv")
+
+    lines = (tmp_path / "VOD_1_CHAT.txt").read_text(encoding="utf-8").split("\n\n\n\n")[0].splitlines()
+    assert lines == ["User     Message"] + ["{:<8} {}".format(comment.name, comment.message) for comment in reference]
+
+    with (tmp_path / "VOD_1_CHAT.csv").open(mode="r", encoding="utf-8", newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows == [["User", "Message"]] + [[comment.name, comment.message] for comment in reference]
+
+    with pytest.raises(ValueError, match="emotes"):
+        vodchat.to_file(dirpath=tmp_path, save_json=False, columns=["name", "emotes"])
+
+
+def test_column_layout():
+    assert _column_layout(None) == (None, ["Created at", "Posted at", "User", "Message"], [30, 10, 30, 0])
+    get_columns, names, widths = _column_layout(["message", ("name", 8)])
+    assert (get_columns(COMMENTS[1]), names, widths) == (("message 1", "user1"), ["Message", "User"], [0, 8])
+    assert _column_layout(["name"])[0](COMMENTS[1]) == ("user1",)
+
+    with pytest.raises(ValueError, match="emotes"):
+        _column_layout(["name", "emotes"])